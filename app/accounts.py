@@ -0,0 +1,177 @@
+"""Serve several merchant accounts from one process."""
+
+import json
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from app.cache import TTLCache
+from app.client.bybit import get_api, new_session, server_clock
+from app.client.ratelimit import TokenBucket
+from app.config import load_accounts
+from app.settings import Settings
+
+if TYPE_CHECKING:
+    from bybit_p2p import P2P
+
+    from app.client.transport import Transport
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Account:
+    """One merchant account: its own signing client and rate-limit bucket."""
+
+    name: str
+    api: "P2P"
+    limiter: TokenBucket
+
+
+def _cache_key(account: str, method: str, params: dict) -> tuple[str, str, str]:
+    return account, method, json.dumps(params, sort_keys=True, default=str)
+
+
+class AccountManager:
+    """Dispatch API calls for many accounts over one pool of sockets and threads.
+
+    Every account signs with its own credentials and draws from its own
+    :class:`TokenBucket`, while all of them share a single HTTP session and a
+    single worker pool of ``max_workers`` threads and ``pool_size`` sockets
+    (by default one per worker). Read-only responses can be shared for a
+    short while through :meth:`cached_call`. With ``sync_clock`` all accounts
+    on the same host stamp requests from one shared server clock. ``timeout``
+    bounds each HTTP request, in seconds; a ``transport`` (see
+    :mod:`app.client.transport`) replaces the HTTP session altogether.
+    """
+
+    def __init__(
+        self,
+        accounts: dict[str, dict],
+        *,
+        max_workers: int = 8,
+        pool_size: int | None = None,
+        cache_size: int = 1024,
+        cache_ttl: float = 60.0,
+        sync_clock: bool = False,
+        timeout: float | None = None,
+        transport: "Transport | None" = None,
+    ) -> None:
+        from app.client.transport import RequestsTransport
+
+        self.max_workers = max_workers
+        self.pool_size = pool_size
+        self.sync_clock = sync_clock
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.session = new_session(pool_size=pool_size or max_workers)
+        self.transport = transport or RequestsTransport(self.session, timeout=timeout)
+        self.clocks = {}
+        if sync_clock:
+            self.clocks = {
+                testnet: server_clock(testnet=testnet, session=self.session)
+                for testnet in {config["testnet"] for config in accounts.values()}
+            }
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="p2p-account")
+        self.accounts = {
+            name: Account(
+                name=name,
+                api=get_api(
+                    api_key=config["api_key"],
+                    api_secret=config["api_secret"],
+                    testnet=config["testnet"],
+                    recv_window=config["recv_window"],
+                    session=self.session,
+                    clock=self.clocks.get(config["testnet"]),
+                    transport=self.transport,
+                ),
+                limiter=TokenBucket(config["rate_limit"]),
+            )
+            for name, config in accounts.items()
+        }
+
+    @classmethod
+    def from_settings(cls, settings: Settings, **kwargs) -> "AccountManager":
+        """Build a manager sized by ``settings`` for every account of :func:`load_accounts`."""
+        options = {
+            "max_workers": settings.workers,
+            "pool_size": settings.pool_size,
+            "cache_size": settings.cache_size,
+            "cache_ttl": settings.cache_ttl,
+            "sync_clock": settings.sync_clock,
+            "timeout": settings.timeout,
+        }
+        return cls(load_accounts(settings), **options | kwargs)
+
+    @classmethod
+    def from_env(cls, *, profile: str | None = None, **kwargs) -> "AccountManager":
+        """Build a manager from :meth:`Settings.load` with the named ``profile``."""
+        return cls.from_settings(Settings.load(profile=profile), **kwargs)
+
+    def apply_settings(self, settings: Settings) -> None:
+        """Apply reloaded settings: rate limits, request timeout and cache TTL.
+
+        Pool sizes and the clock are fixed when the manager is built; changes
+        to them are logged and take effect after a restart.
+        """
+        for name, config in load_accounts(settings).items():
+            if name in self.accounts:
+                self.accounts[name].limiter.set_rate(config["rate_limit"])
+        if hasattr(self.transport, "timeout"):
+            self.transport.timeout = settings.timeout
+        self.cache.ttl = settings.cache_ttl
+        fixed = {
+            "workers": (settings.workers, self.max_workers),
+            "pool_size": (settings.pool_size, self.pool_size),
+            "sync_clock": (settings.sync_clock, self.sync_clock),
+        }
+        for name, (wanted, current) in fixed.items():
+            if wanted != current:
+                logger.info("%s=%s applies after a restart", name, wanted)
+
+    def __getitem__(self, name: str) -> Account:
+        return self.accounts[name]
+
+    def call(self, account: str, method: str, /, **params) -> dict:
+        """Call ``method`` on ``account`` in the current thread, honouring its rate limit."""
+        target = self.accounts[account]
+        target.limiter.acquire()
+        return getattr(target.api, method)(**params)
+
+    def cached_call(
+        self, account: str, method: str, /, *, ttl: float | None = None, **params
+    ) -> dict:
+        """Like :meth:`call`, reusing an identical call's response for ``ttl`` seconds.
+
+        ``ttl`` defaults to the cache's own. Only use this for read-only methods.
+        """
+        key = _cache_key(account, method, params)
+        response = self.cache.get(key)
+        if response is None:
+            response = self.call(account, method, **params)
+            self.cache.set(key, response, ttl=ttl)
+        return response
+
+    def invalidate(self, account: str, method: str, /, **params) -> None:
+        """Drop the cached response of an identical :meth:`cached_call`, e.g. after a write."""
+        self.cache.pop(_cache_key(account, method, params))
+
+    def submit(self, account: str, method: str, /, **params) -> Future:
+        """Schedule :meth:`call` on the shared worker pool."""
+        return self._executor.submit(self.call, account, method, **params)
+
+    def broadcast(self, method: str, /, **params) -> dict[str, Future]:
+        """Run the same call for every account concurrently."""
+        return {name: self.submit(name, method, **params) for name in self.accounts}
+
+    def close(self) -> None:
+        for clock in self.clocks.values():
+            clock.stop()
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self) -> "AccountManager":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,218 @@
+"""Vectorised order-book analytics over ``get_online_ads`` snapshots."""
+
+from dataclasses import dataclass
+from typing import Iterable, Mapping
+
+import numpy as np
+
+BID = 0  # ``side`` of ads whose makers buy the token; best price is the highest
+ASK = 1  # ``side`` of ads whose makers sell the token; best price is the lowest
+
+
+@dataclass(frozen=True, slots=True)
+class AdBook:
+    """Columnar view of online ads; row ``i`` of every array is the same ad.
+
+    Payment methods are stored as a CSR pair: the payments of ad ``i`` are
+    ``payment_ids[payment_code[payment_ptr[i]:payment_ptr[i + 1]]]``.
+    """
+
+    item_id: np.ndarray  # int64
+    user_id: np.ndarray  # int64
+    side: np.ndarray  # int8
+    price: np.ndarray  # float64
+    last_quantity: np.ndarray  # float64, token units still available
+    min_amount: np.ndarray  # float64, fiat
+    max_amount: np.ndarray  # float64, fiat
+    execute_rate: np.ndarray  # int16, ``recentExecuteRate`` in percent
+    order_num: np.ndarray  # int32
+    nick_name: np.ndarray  # object
+    payment_ptr: np.ndarray  # int64, ``len(self) + 1`` offsets
+    payment_code: np.ndarray  # int32, indices into ``payment_ids``
+    payment_ids: tuple[str, ...]
+
+    def __len__(self) -> int:
+        return len(self.item_id)
+
+    @classmethod
+    def from_items(cls, items: Iterable[Mapping]) -> "AdBook":
+        """Build a book from the ``result.items`` of one or more ad pages."""
+        items = list(items)
+        vocabulary: dict[str, int] = {}
+        counts = np.fromiter((len(it["payments"]) for it in items), np.int64, len(items))
+        codes = [
+            vocabulary.setdefault(payment, len(vocabulary))
+            for it in items
+            for payment in it["payments"]
+        ]
+        ptr = np.zeros(len(items) + 1, np.int64)
+        np.cumsum(counts, out=ptr[1:])
+        return cls(
+            item_id=_column(items, "id", np.int64),
+            user_id=_column(items, "userId", np.int64),
+            side=_column(items, "side", np.int8),
+            price=_column(items, "price", np.float64),
+            last_quantity=_column(items, "lastQuantity", np.float64),
+            min_amount=_column(items, "minAmount", np.float64),
+            max_amount=_column(items, "maxAmount", np.float64),
+            execute_rate=_column(items, "recentExecuteRate", np.int16),
+            order_num=_column(items, "orderNum", np.int32),
+            nick_name=np.array([it["nickName"] for it in items], dtype=object),
+            payment_ptr=ptr,
+            payment_code=np.array(codes, np.int32),
+            payment_ids=tuple(vocabulary),
+        )
+
+    def take(self, rows: np.ndarray) -> "AdBook":
+        """Return the sub-book selected by a boolean mask or index array."""
+        rows = np.flatnonzero(rows) if rows.dtype == np.bool_ else np.asarray(rows, np.int64)
+        starts, stops = self.payment_ptr[rows], self.payment_ptr[rows + 1]
+        counts = stops - starts
+        ptr = np.zeros(len(rows) + 1, np.int64)
+        np.cumsum(counts, out=ptr[1:])
+        # Expand each selected [start, stop) range into flat positions.
+        positions = np.repeat(starts - ptr[:-1], counts) + np.arange(ptr[-1])
+        return AdBook(
+            item_id=self.item_id[rows],
+            user_id=self.user_id[rows],
+            side=self.side[rows],
+            price=self.price[rows],
+            last_quantity=self.last_quantity[rows],
+            min_amount=self.min_amount[rows],
+            max_amount=self.max_amount[rows],
+            execute_rate=self.execute_rate[rows],
+            order_num=self.order_num[rows],
+            nick_name=self.nick_name[rows],
+            payment_ptr=ptr,
+            payment_code=self.payment_code[positions],
+            payment_ids=self.payment_ids,
+        )
+
+    def fiat_capacity(self) -> np.ndarray:
+        """Largest fiat amount a single order against each ad can take."""
+        return np.minimum(self.max_amount, self.last_quantity * self.price)
+
+
+def _column(items: list, key: str, dtype: type) -> np.ndarray:
+    return np.array([it[key] for it in items], dtype=dtype)
+
+
+def select(
+    book: AdBook,
+    *,
+    side: int | None = None,
+    payment_id: str | None = None,
+    min_execute_rate: int | None = None,
+    exclude_user_id: int | None = None,
+) -> np.ndarray:
+    """Return a boolean row mask for ads matching every given filter."""
+    mask = np.ones(len(book), np.bool_)
+    if side is not None:
+        mask &= book.side == side
+    if min_execute_rate is not None:
+        mask &= book.execute_rate >= min_execute_rate
+    if exclude_user_id is not None:
+        mask &= book.user_id != exclude_user_id
+    if payment_id is not None:
+        try:
+            code = book.payment_ids.index(payment_id)
+        except ValueError:
+            return np.zeros(len(book), np.bool_)
+        owners = np.repeat(np.arange(len(book)), np.diff(book.payment_ptr))
+        accepts = np.zeros(len(book), np.bool_)
+        accepts[owners[book.payment_code == code]] = True
+        mask &= accepts
+    return mask
+
+
+def best_first(book: AdBook, side: int) -> np.ndarray:
+    """Indices of ``side`` ads ordered from the best price to the worst."""
+    rows = np.flatnonzero(book.side == side)
+    prices = book.price[rows]
+    order = np.argsort(-prices if side == BID else prices, kind="stable")
+    return rows[order]
+
+
+def best_price(book: AdBook, side: int) -> float:
+    """Best price on ``side``, or ``nan`` when the side is empty."""
+    prices = book.price[book.side == side]
+    if not len(prices):
+        return float("nan")
+    return float(prices.max() if side == BID else prices.min())
+
+
+def spread(book: AdBook) -> float:
+    """Best ask minus best bid; negative when the books overlap."""
+    return best_price(book, ASK) - best_price(book, BID)
+
+
+def depth(book: AdBook, side: int, levels: Iterable[float]) -> np.ndarray:
+    """Token quantity available at each price level or better on ``side``."""
+    rows = book.side == side
+    prices, quantity = book.price[rows], book.last_quantity[rows]
+    order = np.argsort(prices)
+    prices, cumulative = prices[order], np.cumsum(quantity[order])
+    levels = np.asarray(levels, np.float64)
+    if not len(cumulative):
+        return np.zeros(len(levels))
+    total = cumulative[-1]
+    if side == ASK:
+        # Asks priced at or below the level.
+        index = np.searchsorted(prices, levels, side="right")
+        return np.where(index > 0, cumulative[np.maximum(index - 1, 0)], 0.0)
+    # Bids priced at or above the level.
+    index = np.searchsorted(prices, levels, side="left")
+    below = np.where(index > 0, cumulative[np.maximum(index - 1, 0)], 0.0)
+    return total - below
+
+
+def vwap(book: AdBook, side: int, fiat_amount: float) -> float:
+    """Average price paid when sweeping ``fiat_amount`` through ``side`` best-first.
+
+    Per-ad minimum amounts are ignored. Returns ``nan`` when the side cannot
+    absorb the full amount.
+    """
+    rows = best_first(book, side)
+    prices = book.price[rows]
+    capacity = book.fiat_capacity()[rows]
+    cumulative = np.cumsum(capacity)
+    last = int(np.searchsorted(cumulative, fiat_amount, side="left"))
+    if fiat_amount <= 0 or last >= len(rows):
+        return float("nan")
+    filled = cumulative[last - 1] if last else 0.0
+    tokens = np.sum(capacity[:last] / prices[:last]) + (fiat_amount - filled) / prices[last]
+    return float(fiat_amount / tokens)
+
+
+def rank(book: AdBook, side: int, prices: float | Iterable[float]) -> np.ndarray:
+    """1-based position each price would take among ``side`` competitors."""
+    competitors = np.sort(book.price[book.side == side])
+    prices = np.asarray(prices, np.float64)
+    if side == ASK:
+        return np.searchsorted(competitors, prices, side="left") + 1
+    return len(competitors) - np.searchsorted(competitors, prices, side="right") + 1
+
+
+def target_price(
+    book: AdBook,
+    side: int,
+    *,
+    rank: int = 1,
+    step: float = 0.01,
+    exclude_user_id: int | None = None,
+) -> float:
+    """Price one ``step`` better than the competitor now at 1-based ``rank`` on ``side``.
+
+    With fewer competitors than ``rank`` the worst one is used; ``nan`` when
+    there are none.
+    """
+    mask = book.side == side
+    if exclude_user_id is not None:
+        mask &= book.user_id != exclude_user_id
+    prices = np.sort(book.price[mask])
+    if not len(prices):
+        return float("nan")
+    if side == BID:
+        prices = prices[::-1]
+    competitor = float(prices[min(rank, len(prices)) - 1])
+    return competitor - step if side == ASK else competitor + step
@@ -0,0 +1,280 @@
+"""Local balance and ad exposure, kept current from order events and ad changes.
+
+Sizing an ad needs the free balance of its token and how much of it our other
+ads already offer. Instead of calling ``get_current_balance`` and
+``get_ads_list`` every time, :class:`BalanceTracker` applies the effect of
+each order transition and ad update to local state and reconciles with the
+API only every ``interval`` seconds. Reads are plain dictionary lookups.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Mapping
+
+from app.counterparty import STATUS_CANCELLED, STATUS_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+SIDE_BUY = 0
+SIDE_SELL = 1
+AD_ONLINE = 10  # ``get_ads_list`` status; 20 is offline and 30 completed
+
+_FINISHED = (STATUS_CANCELLED, STATUS_COMPLETED)
+
+
+@dataclass(frozen=True, slots=True)
+class Balance:
+    """One coin of the funding account; ``frozen`` is held by open sell orders."""
+
+    available: float = 0.0
+    frozen: float = 0.0
+
+
+@dataclass(frozen=True, slots=True)
+class AdExposure:
+    """What one of our ads still offers: ``quantity`` of ``token`` on ``side``."""
+
+    token: str
+    side: int
+    quantity: float
+    online: bool
+
+
+@dataclass(slots=True)
+class _Order:
+    status: int
+    side: int
+    token: str
+    quantity: float
+    ad_id: str | None
+
+
+def _quantity(order: Mapping) -> float:
+    return float(order.get("notifyTokenQuantity") or order.get("quantity") or 0)
+
+
+class BalanceTracker:
+    """Available and frozen balance per coin and committed quantity per ad.
+
+    ``fetch_balance()`` returns a ``get_current_balance`` response and
+    ``fetch_ads()`` the items of every ``get_ads_list`` page. Between
+    reconciliations, :meth:`apply_order` and :meth:`apply_ad` move quantities
+    the way the exchange does: opening a sell order freezes its quantity and
+    takes it off the ad, cancelling returns both, and completing a buy order
+    credits the token. Orders created before the last snapshot are already
+    part of it and only start being tracked. Differences found by
+    :meth:`reconcile` are kept in ``drift``.
+    """
+
+    def __init__(
+        self,
+        fetch_balance: Callable[[], dict] | None = None,
+        fetch_ads: Callable[[], list[dict]] | None = None,
+        *,
+        interval: float = 300.0,
+    ) -> None:
+        self._fetch_balance = fetch_balance
+        self._fetch_ads = fetch_ads
+        self.interval = interval
+        self.balances: dict[str, Balance] = {}
+        self.ads: dict[str, AdExposure] = {}
+        self.drift: dict[str, float] = {}
+        self.snapshot_ms = 0
+        self._committed: dict[tuple[str, int], float] = {}
+        self._orders: dict[str, _Order] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @classmethod
+    def for_account(
+        cls, manager, account: str, *, account_type: str = "FUND", page_size: int = 50, **kwargs
+    ) -> "BalanceTracker":
+        """Build a tracker reconciling through ``manager`` as ``account``."""
+
+        def fetch_balance() -> dict:
+            return manager.call(account, "get_current_balance", accountType=account_type)
+
+        def fetch_ads() -> list[dict]:
+            items, page = [], 1
+            while True:
+                response = manager.call(
+                    account, "get_ads_list", page=str(page), size=str(page_size)
+                )
+                result = response["result"]
+                items += result["items"]
+                if not result["items"] or len(items) >= int(result["count"]):
+                    return items
+                page += 1
+
+        return cls(fetch_balance, fetch_ads, **kwargs)
+
+    # Reads
+
+    def balance(self, coin: str) -> Balance:
+        return self.balances.get(coin) or Balance()
+
+    def available(self, coin: str) -> float:
+        return self.balance(coin).available
+
+    def frozen(self, coin: str) -> float:
+        return self.balance(coin).frozen
+
+    def committed(self, coin: str, side: int = SIDE_SELL) -> float:
+        """Quantity of ``coin`` still offered by our online ads on ``side``."""
+        return self._committed.get((coin, side), 0.0)
+
+    def ad_committed(self, ad_id: str) -> float:
+        ad = self.ads.get(ad_id)
+        return ad.quantity if ad is not None and ad.online else 0.0
+
+    def headroom(self, coin: str) -> float:
+        """Available ``coin`` not yet offered by an online sell ad."""
+        return self.available(coin) - self.committed(coin, SIDE_SELL)
+
+    # Updates
+
+    def load_balance(self, response: Mapping) -> None:
+        """Replace balances with a ``get_current_balance`` response."""
+        result = response["result"]
+        balances = {}
+        for entry in result.get("balance") or []:
+            available = float(entry.get("transferBalance") or 0)
+            wallet = float(entry.get("walletBalance") or 0)
+            balances[entry["coin"]] = Balance(available, max(0.0, wallet - available))
+        with self._lock:
+            if self.snapshot_ms:
+                self.drift = {
+                    coin: balances.get(coin, Balance()).available - self.available(coin)
+                    for coin in balances.keys() | self.balances.keys()
+                }
+            self.balances = balances
+            self.snapshot_ms = int(response.get("time") or time.time() * 1e3)
+
+    def load_ads(self, items: Iterable[Mapping]) -> None:
+        """Replace ad exposure with the items of ``get_ads_list``."""
+        ads = {str(item["id"]): self._exposure(item) for item in items}
+        committed: dict[tuple[str, int], float] = {}
+        for ad in ads.values():
+            if ad.online:
+                key = (ad.token, ad.side)
+                committed[key] = committed.get(key, 0.0) + ad.quantity
+        with self._lock:
+            self.ads, self._committed = ads, committed
+
+    @staticmethod
+    def _exposure(item: Mapping) -> AdExposure:
+        return AdExposure(
+            token=item["tokenId"],
+            side=int(item["side"]),
+            quantity=float(item.get("lastQuantity") or 0),
+            online=int(item.get("status", AD_ONLINE)) == AD_ONLINE,
+        )
+
+    def _set_ad(self, ad_id: str, ad: AdExposure | None) -> None:
+        """Swap one ad's exposure and adjust the running totals; hold ``_lock``."""
+        previous = self.ads.get(ad_id)
+        if previous is not None and previous.online:
+            key = (previous.token, previous.side)
+            self._committed[key] = self._committed.get(key, 0.0) - previous.quantity
+        if ad is None:
+            self.ads.pop(ad_id, None)
+            return
+        self.ads[ad_id] = ad
+        if ad.online:
+            key = (ad.token, ad.side)
+            self._committed[key] = self._committed.get(key, 0.0) + ad.quantity
+
+    def apply_ad(self, item: Mapping) -> None:
+        """Apply a created or updated ad, e.g. the item returned after ``update_ad``."""
+        with self._lock:
+            self._set_ad(str(item["id"]), self._exposure(item))
+
+    def remove_ad(self, ad_id: str) -> None:
+        with self._lock:
+            self._set_ad(ad_id, None)
+
+    def _move(self, coin: str, *, available: float = 0.0, frozen: float = 0.0) -> None:
+        current = self.balance(coin)
+        self.balances[coin] = Balance(current.available + available, current.frozen + frozen)
+
+    def _ad_delta(self, ad_id: str | None, quantity: float) -> None:
+        ad = self.ads.get(ad_id) if ad_id else None
+        if ad is not None:
+            self._set_ad(ad_id, AdExposure(ad.token, ad.side, ad.quantity + quantity, ad.online))
+
+    def apply_order(self, order: Mapping) -> None:
+        """Apply the current state of an order from ``get_orders``, pending orders or details.
+
+        ``itemId`` (present in ``get_order_details``) ties the order to our
+        ad, whose committed quantity then moves with it.
+        """
+        order_id = str(order["id"])
+        status = int(order["status"])
+        with self._lock:
+            known = self._orders.get(order_id)
+            if known is None:
+                known = _Order(
+                    status=status,
+                    side=int(order["side"]),
+                    token=order.get("tokenId") or order.get("notifyTokenId", ""),
+                    quantity=_quantity(order),
+                    ad_id=order.get("itemId"),
+                )
+                if status in _FINISHED:
+                    return
+                self._orders[order_id] = known
+                if int(order.get("createDate") or 0) <= self.snapshot_ms:
+                    return  # its freeze is already in the snapshot
+                if known.side == SIDE_SELL:
+                    self._move(known.token, available=-known.quantity, frozen=known.quantity)
+                self._ad_delta(known.ad_id, -known.quantity)
+                return
+            known.ad_id = known.ad_id or order.get("itemId")
+            if status == known.status or status not in _FINISHED:
+                known.status = status
+                return
+            del self._orders[order_id]
+            if known.side == SIDE_SELL:
+                returned = known.quantity if status == STATUS_CANCELLED else 0.0
+                self._move(known.token, available=returned, frozen=-known.quantity)
+            elif status == STATUS_COMPLETED:
+                self._move(known.token, available=known.quantity)
+            if status == STATUS_CANCELLED:
+                self._ad_delta(known.ad_id, known.quantity)
+
+    def apply_orders(self, orders: Iterable[Mapping]) -> None:
+        for order in orders:
+            self.apply_order(order)
+
+    def reconcile(self) -> None:
+        """Replace local state with fresh API data."""
+        if self._fetch_balance is not None:
+            self.load_balance(self._fetch_balance())
+        if self._fetch_ads is not None:
+            self.load_ads(self._fetch_ads())
+        if any(self.drift.values()):
+            logger.info("Balance drift at reconcile: %s", self.drift)
+
+    def start(self) -> "BalanceTracker":
+        """Reconcile now and every ``interval`` seconds in a daemon thread."""
+        self.reconcile()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="p2p-balance", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.reconcile()
+            except Exception:
+                logger.warning("Balance reconcile failed", exc_info=True)
@@ -0,0 +1,502 @@
+"""Micro-benchmarks for performance-sensitive paths.
+
+Usage::
+
+    python -m app.bench [name ...]
+"""
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+
+def _timeit(func: Callable[[], object], *, repeat: int = 50) -> float:
+    """Return the best wall time of ``func`` in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e3
+
+
+def _synthetic_ads(n_ads: int, *, seed: int = 0) -> list[dict]:
+    """Online ad items built from a recorded ``get_online_ads`` item."""
+    import json
+    from pathlib import Path
+
+    import numpy as np
+
+    fixture = Path(__file__).resolve().parents[1] / "examples/competitor_ads/BUY/UAH/response.json"
+    template = json.loads(fixture.read_text(encoding="utf-8"))["response"]["result"]["items"][0]
+    rng = np.random.default_rng(seed)
+    return [
+        template
+        | {
+            "id": str(10**18 + i),
+            "userId": str(i),
+            "side": i % 2,
+            "price": f"{rng.uniform(40, 45):.2f}",
+            "lastQuantity": f"{rng.uniform(10, 5000):.4f}",
+            "minAmount": "500.00",
+            "maxAmount": f"{rng.uniform(1000, 200000):.2f}",
+            "recentExecuteRate": int(rng.integers(70, 101)),
+            "orderNum": int(rng.integers(0, 5000)),
+            "nickName": f"maker{i}",
+            "payments": [str(p) for p in rng.choice(20, size=3, replace=False)],
+        }
+        for i in range(n_ads)
+    ]
+
+
+def bench_analytics(n_ads: int = 10_000) -> dict:
+    """Time one analytics tick (filter, spread, depth, VWAP, rank) over ``n_ads``."""
+    import numpy as np
+
+    from app import analytics
+    from app.analytics import ASK, BID, AdBook
+
+    items = _synthetic_ads(n_ads)
+    build_ms = _timeit(lambda: AdBook.from_items(items), repeat=5)
+    book = AdBook.from_items(items)
+    levels = np.linspace(40, 45, 50)
+
+    def tick() -> None:
+        trusted = book.take(analytics.select(book, payment_id="7", min_execute_rate=95))
+        analytics.spread(trusted)
+        analytics.depth(trusted, ASK, levels)
+        analytics.depth(trusted, BID, levels)
+        analytics.vwap(trusted, ASK, 50_000)
+        analytics.rank(trusted, ASK, [42.0, 42.5, 43.0])
+
+    return {"ads": n_ads, "build_ms": round(build_ms, 3), "tick_ms": round(_timeit(tick), 3)}
+
+
+def bench_recorder(n_ads: int = 2_000, n_frames: int = 200) -> dict:
+    """Record ``n_frames`` scans of ``n_ads`` ads, then time a full replay."""
+    import json
+    import tempfile
+    from pathlib import Path
+
+    from app.analytics import AdBook
+    from app.recorder import Recorder, replay
+
+    items = _synthetic_ads(n_ads)
+    book = AdBook.from_items(items)
+    json_bytes = len(json.dumps(items, ensure_ascii=False, indent=2).encode())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.p2prec"
+        start = time.perf_counter()
+        with Recorder(path) as recorder:
+            for frame in range(n_frames):
+                recorder.append(book, market="USDT/UAH", timestamp_ms=frame)
+        write_ms = (time.perf_counter() - start) * 1e3
+        replay_ms = _timeit(lambda: sum(len(s.book) for s in replay(path)), repeat=5)
+        file_bytes = path.stat().st_size
+    return {
+        "frames": n_frames,
+        "ads": n_ads,
+        "write_ms": round(write_ms, 1),
+        "replay_ms": round(replay_ms, 1),
+        "ratio_vs_json": round(json_bytes * n_frames / file_bytes, 1),
+    }
+
+
+class _StubResponse:
+    status_code = 200
+    headers: dict = {}
+
+    def json(self) -> dict:
+        return {"ret_code": 0, "ret_msg": "SUCCESS", "result": {}}
+
+
+def bench_requests(n_calls: int = 2_000) -> dict:
+    """Per-call CPU cost of building a signed ``update_ad`` request, library vs compiled."""
+    import copy
+
+    from bybit_p2p import P2P
+
+    from app.client.compiler import CompiledP2P
+
+    params = {
+        "id": "1951393103796514816",
+        "priceType": 0,
+        "premium": "",
+        "price": 44.97,
+        "minAmount": 500,
+        "maxAmount": 180000.0,
+        "remark": "",
+        "tradingPreferenceSet": {"isKyc": 1, "hasCompleteRateDay30": 0, "completeRateDay30": ""},
+        "paymentIds": ["624"],
+        "actionType": "MODIFY",
+        "quantity": 6101.4515,
+        "paymentPeriod": 15,
+    }
+
+    def run(api: object = None) -> None:
+        # The library mutates its input, so every call gets a fresh copy; the
+        # copying alone (``api=None``) is timed and subtracted.
+        for _ in range(n_calls):
+            body = copy.deepcopy(params)
+            if api is not None:
+                api.update_ad(**body)
+
+    copying = _timeit(run, repeat=5)
+    results = {}
+    for name, cls in (("library_us", P2P), ("compiled_us", CompiledP2P)):
+        api = cls(testnet=True, api_key="key", api_secret="secret", recv_window=5000)
+        api.client.send = lambda request, **kwargs: _StubResponse()
+        elapsed = _timeit(lambda api=api: run(api), repeat=5) - copying
+        results[name] = round(elapsed * 1e3 / n_calls, 2)
+    results["speedup"] = round(results["library_us"] / results["compiled_us"], 1)
+    return results
+
+
+def bench_transport(n_calls: int = 2_000) -> dict:
+    """CPU cost of a full ``get_online_ads`` call (sign, send, decode) with no network."""
+    import asyncio
+
+    from app.client.compiler import CompiledP2P
+    from app.client.transport import MemoryTransport
+
+    transport = MemoryTransport.from_examples()
+    api = CompiledP2P(testnet=False, api_key="key", api_secret="secret", transport=transport)
+    params = {"tokenId": "USDT", "currencyId": "UAH", "side": "1", "page": "1", "size": "10"}
+
+    async def gather() -> None:
+        await asyncio.gather(
+            *(api.request_async("get_online_ads", **params) for _ in range(n_calls))
+        )
+
+    sync_ms = _timeit(lambda: [api.get_online_ads(**params) for _ in range(n_calls)], repeat=3)
+    async_ms = _timeit(lambda: asyncio.run(gather()), repeat=3)
+    return {
+        "calls": n_calls,
+        "sync_us": round(sync_ms * 1e3 / n_calls, 1),
+        "async_us": round(async_ms * 1e3 / n_calls, 1),
+    }
+
+
+def bench_chat(n_messages: int = 20_000) -> dict:
+    """Scan throughput of the default chat rules over multilingual messages."""
+    from app.chat import ChatScanner
+
+    texts = [
+        "Добрий день, оплатив на картку, перевірте будь ласка 🙏",
+        "Zapłaciłem przelewem, proszę o zwolnienie",
+        "hi, please release, i have paid",
+        "напишіть мені у telegram +380 67 123 4567",
+        "👋👀☀️ hi, im testing API - if all was OK please press 👍❤️",
+        "Dzień dobry, czy mogę zapłacić z innego konta?",
+    ]
+    chats = {
+        str(order): [
+            {"id": str(order * 100 + i), "message": texts[(order + i) % len(texts)]}
+            for i in range(20)
+        ]
+        for order in range(n_messages // 20)
+    }
+    scanner = ChatScanner()
+    start = time.perf_counter()
+    matches = scanner.scan_batch(chats)
+    elapsed = time.perf_counter() - start
+    rescan = _timeit(lambda: scanner.scan_batch(chats), repeat=3)
+    return {
+        "messages": n_messages,
+        "matches": len(matches),
+        "messages_per_s": round(n_messages / elapsed),
+        "rescan_unchanged_ms": round(rescan, 2),
+    }
+
+
+def bench_ingest(n_pages: int = 2_000, page_size: int = 50) -> dict:
+    """Decode raw ``get_orders`` pages serially and across a process pool."""
+    import json
+    import os
+
+    from app.ingest import chunked, decode_order_pages, ingest
+
+    fixture = Path(__file__).resolve().parents[1] / "examples/orders/SELL/UAH/all_orders.json"
+    template = json.loads(fixture.read_text(encoding="utf-8"))["response"]["result"]["items"][0]
+    pages = [
+        json.dumps(
+            {
+                "ret_code": 0,
+                "result": {
+                    "count": n_pages * page_size,
+                    "items": [
+                        template | {"id": str(10**18 + page * page_size + i)}
+                        for i in range(page_size)
+                    ],
+                },
+            }
+        ).encode()
+        for page in range(n_pages)
+    ]
+    workers = os.cpu_count() or 1
+    results = {"orders": n_pages * page_size, "workers": workers}
+    for name, count in (("serial", 1), ("pool", workers)):
+        start = time.perf_counter()
+        total = sum(map(len, ingest(chunked(pages, 16), decode_order_pages, workers=count)))
+        elapsed = time.perf_counter() - start
+        results[f"{name}_orders_per_s"] = round(total / elapsed)
+    return results
+
+
+def _order_events(n_orders: int, *, seed: int) -> list[dict]:
+    """Simulated orders: a chat burst on creation and another around payment."""
+    import random
+
+    rng = random.Random(seed)
+    orders = []
+    for _ in range(n_orders):
+        created = rng.uniform(0, 3600)
+        paid = created + min(15 + rng.expovariate(1 / 150), 880)
+        chat = sorted(
+            [created + rng.uniform(2, 40) for _ in range(2)]
+            + [paid + offset for offset in (-rng.uniform(5, 30), rng.uniform(1, 10))]
+        )
+        orders.append({"created": created, "paid": paid, "deadline": created + 900, "chat": chat})
+    return orders
+
+
+def _simulate_polling(orders: list[dict], *, fixed: float | None) -> dict:
+    """Watch ``orders`` until each one's payment is seen; return requests and latency.
+
+    With ``fixed``, the pending-orders listing and every pending order's chat
+    are polled at that interval. Otherwise the listing is paced by
+    :class:`PollController` and a chat is fetched only when the listing shows
+    its unread counter moved.
+    """
+    from app.polling import PollController, chat_hints, pending_pace
+
+    now = 0.0
+    controller = PollController(clock=lambda: now, wall=lambda: now)
+    controller.track("get_pending_orders")
+    chat_seen = [0.0] * len(orders)
+    listed: dict[str, dict] = {}
+    latencies, requests, done = [], 0, set()
+
+    def fetch_chat(i: int) -> None:
+        nonlocal requests
+        requests += 1
+        latencies.extend(now - t for t in orders[i]["chat"] if chat_seen[i] < t <= now)
+        chat_seen[i] = now
+
+    end = max(order["paid"] for order in orders) + 60
+    while now < end:
+        requests += 1  # one get_pending_orders page
+        current = {}
+        for i, order in enumerate(orders):
+            if i in done or order["created"] > now:
+                continue
+            if str(i) not in listed:
+                latencies.append(now - order["created"])
+            if order["paid"] <= now:
+                latencies.append(now - order["paid"])
+                done.add(i)
+                continue
+            unread = sum(t <= now for t in order["chat"])
+            current[str(i)] = {
+                "id": str(i),
+                "status": 10,
+                "unreadMsgCount": str(unread),
+                "transferLastSeconds": str(int(order["deadline"] - now)),
+            }
+        changed = current.keys() != listed.keys() or bool(chat_hints(listed, current))
+        if fixed:
+            for order_id in current:
+                fetch_chat(int(order_id))
+            now += fixed
+        else:
+            for order_id in chat_hints(listed, current):
+                fetch_chat(int(order_id))
+            status, deadline = pending_pace(current.values(), now=now)
+            controller.track("get_pending_orders", status=status, deadline=deadline)
+            controller.observe("get_pending_orders", changed=changed)
+            now += controller.next_delay()
+            controller.due()
+        listed = current
+    return {"requests": requests, "mean_latency_s": round(sum(latencies) / len(latencies), 2)}
+
+
+def bench_polling(n_orders: int = 200, *, seed: int = 0) -> dict:
+    """Requests and mean detection latency of fixed 2s polling vs the adaptive controller."""
+    orders = _order_events(n_orders, seed=seed)
+    fixed = _simulate_polling(orders, fixed=2.0)
+    adaptive = _simulate_polling(orders, fixed=None)
+    return {
+        "orders": n_orders,
+        "fixed_requests": fixed["requests"],
+        "fixed_mean_latency_s": fixed["mean_latency_s"],
+        "adaptive_requests": adaptive["requests"],
+        "adaptive_mean_latency_s": adaptive["mean_latency_s"],
+    }
+
+
+def bench_metadata(n_ads: int = 10_000) -> dict:
+    """Memory of decoded ad items vs :class:`app.metadata.Ad` models sharing metadata."""
+    import json
+    import tracemalloc
+
+    from app.metadata import MetadataRegistry
+
+    page = json.dumps({"items": _synthetic_ads(n_ads)})
+    registry = MetadataRegistry()
+    items = json.loads(page)["items"]
+    start = time.perf_counter()
+    ads = registry.ads(items)
+    results = {"ads": n_ads, "build_ms": round((time.perf_counter() - start) * 1e3, 1)}
+    tracemalloc.start()
+    try:
+        items = json.loads(page)["items"]
+        results["items_mb"] = round(tracemalloc.get_traced_memory()[0] / 1e6, 1)
+        ads = registry.ads(items)
+        del items
+        results["models_mb"] = round(tracemalloc.get_traced_memory()[0] / 1e6, 1)
+    finally:
+        tracemalloc.stop()
+    results["symbols"] = len({id(ad.symbol) for ad in ads})
+    return results
+
+
+def bench_changes(n_ads: int = 10_000, page_size: int = 50, moved: float = 0.01) -> dict:
+    """Rescan cost when ``moved`` of ``n_ads`` ads change: full rebuild vs change detection."""
+    import numpy as np
+
+    from app.analytics import AdBook
+    from app.scanner import ChangeDetector, Market
+
+    items = _synthetic_ads(n_ads)
+    rng = np.random.default_rng(1)
+    rescan = list(items)
+    for index in rng.choice(n_ads, size=int(n_ads * moved), replace=False):
+        rescan[index] = rescan[index] | {"price": f"{float(rescan[index]['price']) + 0.01:.2f}"}
+    pages = [items[i : i + page_size] for i in range(0, n_ads, page_size)]
+    new_pages = [rescan[i : i + page_size] for i in range(0, n_ads, page_size)]
+    market = Market("USDT", "UAH", 1)
+
+    def detect() -> object:
+        detector = ChangeDetector()
+        detector.diff(market, pages)
+        start = time.perf_counter()
+        diff = detector.diff(market, new_pages)
+        AdBook.from_items(diff.added + diff.changed)
+        return diff, time.perf_counter() - start
+
+    diff, seconds = min((detect() for _ in range(5)), key=lambda result: result[1])
+    return {
+        "ads": n_ads,
+        "changed": len(diff.changed),
+        "unchanged_pages": diff.unchanged_pages,
+        "pages": diff.pages,
+        "full_build_ms": round(_timeit(lambda: AdBook.from_items(rescan), repeat=5), 3),
+        "diff_ms": round(seconds * 1e3, 3),
+    }
+
+
+def bench_load(n_orders: int = 500) -> dict:
+    """500 concurrent orders through the full pipeline against the mock exchange."""
+    from app.loadtest import run
+
+    report = run(n_orders)
+    del report["dispatch"]
+    return report
+
+
+def bench_journal(n_threads: int = 8, per_thread: int = 100) -> dict:
+    """Journaled calls from ``n_threads`` threads with fsync, then the time to reopen."""
+    import tempfile
+    import threading
+
+    from app.journal import Journal
+
+    class _Manager:
+        def call(self, account: str, method: str, **params) -> dict:
+            return {"retCode": 0, "result": {}}
+
+    manager = _Manager()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.journal"
+        journal = Journal(path)
+
+        def release(worker: int) -> None:
+            for i in range(per_thread):
+                journal.call(manager, "bench", "release_assets", orderId=f"{worker}-{i}")
+
+        threads = [threading.Thread(target=release, args=(w,)) for w in range(n_threads)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        journal.close()
+        reopen_ms = _timeit(lambda: Journal(path, fsync=False).close(), repeat=5)
+    calls = n_threads * per_thread
+    return {
+        "calls": calls,
+        "call_us": round(elapsed / calls * 1e6, 1),
+        "fsyncs": journal.syncs,
+        "reopen_ms": round(reopen_ms, 1),
+    }
+
+
+def _import_times(statement: str) -> dict[str, int]:
+    """Cumulative import time in microseconds per top-level module, from ``-X importtime``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=Path(__file__).resolve().parents[1],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def bench_startup() -> dict:
+    """Import cost of the entry point versus the client stack it defers."""
+    entry = _import_times("import main")
+    client = _import_times("import main, bybit_p2p")
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import main"], cwd=Path(__file__).resolve().parents[1])
+    return {
+        "import_main_ms": round(entry["main"] / 1e3, 1),
+        "deferred_bybit_p2p_ms": round(client["bybit_p2p"] / 1e3, 1),
+        "process_ms": round((time.perf_counter() - start) * 1e3, 1),
+    }
+
+
+BENCHMARKS: dict[str, Callable[[], dict]] = {
+    "analytics": bench_analytics,
+    "changes": bench_changes,
+    "chat": bench_chat,
+    "ingest": bench_ingest,
+    "journal": bench_journal,
+    "load": bench_load,
+    "metadata": bench_metadata,
+    "polling": bench_polling,
+    "recorder": bench_recorder,
+    "requests": bench_requests,
+    "startup": bench_startup,
+    "transport": bench_transport,
+}
+
+
+def main(argv: list[str] | None = None) -> None:
+    names = (argv if argv is not None else sys.argv[1:]) or list(BENCHMARKS)
+    for name in names:
+        print(name, BENCHMARKS[name]())
+
+
+if __name__ == "__main__":
+    main()
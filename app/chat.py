@@ -0,0 +1,426 @@
+"""Order chat processing.
+
+Keyword and intent scanning over ``get_chat_messages``, and an outbox that
+sends templated messages and files to many orders without blocking callers.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterable, Mapping
+
+if TYPE_CHECKING:
+    from app.accounts import AccountManager
+
+logger = logging.getLogger(__name__)
+
+# Keyword rules per category. A trailing ``*`` marks a stem matching any word
+# ending, which covers Ukrainian and Polish inflections; ``re:`` marks a raw
+# regular expression.
+DEFAULT_RULES: dict[str, tuple[str, ...]] = {
+    "payment_sent": (
+        "paid",
+        "i have paid",
+        "payment sent",
+        "transferred",
+        "оплатив",
+        "оплатила",
+        "оплачено",
+        "переказ*",
+        "переслав",
+        "відправив",
+        "відправила",
+        "надіслав",
+        "надіслала",
+        "zapłaci*",
+        "opłacon*",
+        "przelew*",
+        "przelał*",
+        "wysłał*",
+        "✅",
+    ),
+    "refund_or_cancel": (
+        "refund*",
+        "cancel*",
+        "chargeback",
+        "поверн*",
+        "скасу*",
+        "відмін*",
+        "zwrot*",
+        "anuluj*",
+        "anulowa*",
+    ),
+    "third_party": (
+        "third party",
+        "another account",
+        "not my account",
+        "інша картка",
+        "з чужої",
+        "чужа картка",
+        "inne konto",
+        "osoba trzecia",
+        "z innego konta",
+    ),
+    "off_platform": (
+        "telegram",
+        "whatsapp",
+        "viber",
+        "signal",
+        "re:(?:t\\.me|wa\\.me)/\\S+",
+    ),
+    "phone_number": (r"re:(?<![\w+])\+?\d[\d \-()]{7,}\d(?!\w)",),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class ChatMatch:
+    """One rule hit inside one chat message."""
+
+    order_id: str
+    message_id: str
+    category: str
+    text: str
+
+
+def _pattern(keyword: str) -> str:
+    if keyword.startswith("re:"):
+        return keyword[3:]
+    stem = keyword.endswith("*")
+    body = re.escape(keyword.rstrip("*"))
+    prefix = r"(?<!\w)" if keyword[0].isalnum() else ""
+    suffix = r"\w*" if stem else (r"(?!\w)" if keyword.rstrip("*")[-1].isalnum() else "")
+    return prefix + body + suffix
+
+
+def compile_rules(rules: Mapping[str, Iterable[str]]) -> tuple[re.Pattern, dict[str, str]]:
+    """Compile every rule into one case-insensitive alternation with a group per category.
+
+    Returns the pattern and a map from group name to category. Longer keywords
+    are tried first within a category, so ``i have paid`` wins over ``paid``.
+    """
+    groups = {}
+    branches = []
+    for index, (category, keywords) in enumerate(rules.items()):
+        name = f"c{index}"
+        groups[name] = category
+        ordered = sorted(keywords, key=len, reverse=True)
+        branches.append(f"(?P<{name}>{'|'.join(_pattern(k) for k in ordered)})")
+    return re.compile("|".join(branches), re.IGNORECASE), groups
+
+
+class ChatScanner:
+    """Scan order chats for rule hits, looking at each message only once.
+
+    The scanner remembers the newest message id seen per order (for at most
+    ``max_orders`` orders) and skips everything up to it on the next call.
+    Messages posted by ``self_user_id`` and, unless ``include_system`` is set,
+    system notices are ignored.
+    """
+
+    def __init__(
+        self,
+        rules: Mapping[str, Iterable[str]] = DEFAULT_RULES,
+        *,
+        self_user_id: str | None = None,
+        include_system: bool = False,
+        max_orders: int = 10_000,
+    ) -> None:
+        self._pattern, self._groups = compile_rules(rules)
+        self.self_user_id = self_user_id
+        self.include_system = include_system
+        self.max_orders = max_orders
+        self._last_seen: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def match_text(self, text: str) -> list[tuple[str, str]]:
+        """Return ``(category, matched text)`` for every hit in ``text``."""
+        return [(self._groups[m.lastgroup], m.group()) for m in self._pattern.finditer(text)]
+
+    def scan(self, order_id: str, messages: Iterable[Mapping]) -> list[ChatMatch]:
+        """Scan the messages of one order that are newer than the last call's."""
+        with self._lock:
+            last = self._last_seen.get(order_id, 0)
+        newest = last
+        matches = []
+        for message in messages:
+            message_id = int(message["id"])
+            if message_id <= last:
+                continue
+            newest = max(newest, message_id)
+            if message.get("contentType", "str") != "str":
+                continue
+            if message.get("roleType") == "sys" and not self.include_system:
+                continue
+            if self.self_user_id is not None and str(message.get("userId")) == self.self_user_id:
+                continue
+            for category, text in self.match_text(message.get("message") or ""):
+                matches.append(ChatMatch(order_id, str(message["id"]), category, text))
+        with self._lock:
+            self._last_seen[order_id] = newest
+            self._last_seen.move_to_end(order_id)
+            while len(self._last_seen) > self.max_orders:
+                self._last_seen.popitem(last=False)
+        return matches
+
+    def scan_batch(self, chats: Mapping[str, Iterable[Mapping]]) -> list[ChatMatch]:
+        """Scan several orders' chats, e.g. one poll round, in one call."""
+        return [
+            match for order_id, messages in chats.items() for match in self.scan(order_id, messages)
+        ]
+
+    def forget(self, order_id: str) -> None:
+        """Drop the state of a finished order."""
+        with self._lock:
+            self._last_seen.pop(order_id, None)
+
+
+# Message templates, filled with ``str.format_map`` from the order's
+# ``get_order_details`` result plus any extra fields given when queueing.
+DEFAULT_TEMPLATES: dict[str, str] = {
+    "greeting": "Hi {targetNickName}! Order {id}: {quantity} {tokenId} for {amount} {currencyId}.",
+    "payment_details": "Please pay {amount} {currencyId} to {account}.",
+    "thanks": "Thank you, {targetNickName}! The order is complete.",
+}
+
+# ``contentType`` of ``send_chat_message`` per uploaded file extension.
+FILE_CONTENT_TYPES = {".png": "pic", ".jpg": "pic", ".jpeg": "pic", ".pdf": "pdf", ".mp4": "video"}
+
+_UUID_NAMESPACE = uuid.UUID("5f0c8a52-4f43-4d1e-9a0b-6f1d2c3b4a59")
+
+
+def message_uuid(order_id: str, key: str) -> str:
+    """Deterministic ``msgUuid`` for the message ``key`` of an order.
+
+    Queueing or retrying the same message yields the same id, which is what
+    the outbox and the API dedupe on.
+    """
+    return uuid.uuid5(_UUID_NAMESPACE, f"{order_id}\0{key}").hex
+
+
+@dataclass(frozen=True, slots=True)
+class OutgoingMessage:
+    """A queued message; ``render`` builds the ``send_chat_message`` params when it is sent."""
+
+    order_id: str
+    msg_uuid: str
+    render: Callable[[], dict]
+
+
+class UploadCache:
+    """``upload_chat_file`` results by SHA-256 of the file content.
+
+    Concurrent requests for the same content share one upload; the last
+    ``maxsize`` contents used are remembered.
+    """
+
+    def __init__(self, upload: Callable[[str], dict], *, maxsize: int = 1024) -> None:
+        self._upload = upload
+        self.maxsize = maxsize
+        self._results: OrderedDict[str, Future] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(path: str | Path) -> str:
+        with open(path, "rb") as file:
+            return hashlib.file_digest(file, "sha256").hexdigest()
+
+    def get(self, path: str | Path) -> dict:
+        """The upload result for ``path``'s content, uploading it on first use."""
+        digest = self.digest(path)
+        with self._lock:
+            future = self._results.get(digest)
+            owner = future is None
+            if owner:
+                future = self._results[digest] = Future()
+                while len(self._results) > self.maxsize:
+                    self._results.popitem(last=False)
+            else:
+                self._results.move_to_end(digest)
+        if owner:
+            try:
+                future.set_result(self._upload(str(path)))
+            except BaseException as exc:
+                with self._lock:
+                    if self._results.get(digest) is future:
+                        del self._results[digest]  # let a later call retry
+                future.set_exception(exc)
+        return future.result()
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+
+class ChatOutbox:
+    """Queue chat messages per order and send them in the background.
+
+    Messages to one order go out in queueing order; different orders are
+    served concurrently by ``workers`` threads, each call drawing from the
+    account's rate limit through ``manager``; a failed send is retried
+    ``retries`` times with exponential ``backoff``. Every message carries a
+    ``msgUuid`` derived from its order and key, and a message whose id was
+    already queued or sent (the last ``max_sent`` ids are remembered) is
+    dropped. Templates are rendered when the message is sent, from
+    ``order_data(order_id)``, which by default is a briefly cached
+    ``get_order_details``. Queueing never waits on the API.
+    """
+
+    def __init__(
+        self,
+        manager: "AccountManager",
+        account: str,
+        *,
+        templates: Mapping[str, str] = DEFAULT_TEMPLATES,
+        order_data: Callable[[str], Mapping] | None = None,
+        workers: int = 4,
+        retries: int = 2,
+        backoff: float = 0.5,
+        max_sent: int = 100_000,
+    ) -> None:
+        self.manager = manager
+        self.account = account
+        self.templates = dict(templates)
+        self._order_data = order_data or self._order_details
+        self.retries = retries
+        self.backoff = backoff
+        self.max_sent = max_sent
+        self.uploads = UploadCache(self._upload)
+        self.sent = 0
+        self.failed = 0
+        self.duplicates = 0
+        self._queues: dict[str, deque[OutgoingMessage]] = {}
+        self._active: set[str] = set()
+        self._seen: OrderedDict[str, None] = OrderedDict()
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="p2p-chat")
+
+    def _order_details(self, order_id: str) -> Mapping:
+        response = self.manager.cached_call(
+            self.account, "get_order_details", ttl=60.0, orderId=order_id
+        )
+        return response["result"]
+
+    def _upload(self, path: str) -> dict:
+        return self.manager.call(self.account, "upload_chat_file", upload_file=path)["result"]
+
+    def send(self, order_id: str, message: str, *, key: str | None = None) -> str | None:
+        """Queue a text message; return its ``msgUuid``, or ``None`` for a duplicate.
+
+        ``key`` names the message for deduplication and defaults to its text.
+        """
+        params = {"orderId": order_id, "message": message, "contentType": "str"}
+        return self._put(order_id, key or message, lambda: params)
+
+    def send_template(
+        self, order_id: str, name: str, *, key: str | None = None, **fields
+    ) -> str | None:
+        """Queue template ``name`` for an order, rendered from its cached data and ``fields``."""
+        template = self.templates[name]
+
+        def render() -> dict:
+            values = {**self._order_data(order_id), **fields}
+            message = template.format_map(values)
+            return {"orderId": order_id, "message": message, "contentType": "str"}
+
+        return self._put(order_id, key or f"template:{name}", render)
+
+    def send_file(self, order_id: str, path: str | Path, *, key: str | None = None) -> str | None:
+        """Queue a file; identical content is uploaded once and its URL reused."""
+        path = Path(path)
+        content_type = FILE_CONTENT_TYPES.get(path.suffix.lower())
+        if content_type is None:
+            raise ValueError(f"unsupported chat file type: {path.suffix}")
+        digest = UploadCache.digest(path)
+
+        def render() -> dict:
+            upload = self.uploads.get(path)
+            return {
+                "orderId": order_id,
+                "message": upload["url"],
+                "contentType": content_type,
+                "fileName": path.name,
+            }
+
+        return self._put(order_id, key or f"file:{digest}", render)
+
+    def _put(self, order_id: str, key: str, render: Callable[[], dict]) -> str | None:
+        msg_uuid = message_uuid(order_id, key)
+        with self._condition:
+            if msg_uuid in self._seen:
+                self.duplicates += 1
+                return None
+            self._seen[msg_uuid] = None
+            while len(self._seen) > self.max_sent:
+                self._seen.popitem(last=False)
+            self._queues.setdefault(order_id, deque()).append(
+                OutgoingMessage(order_id, msg_uuid, render)
+            )
+            if order_id not in self._active:
+                self._active.add(order_id)
+                self._executor.submit(self._drain, order_id)
+        return msg_uuid
+
+    def _drain(self, order_id: str) -> None:
+        """Send one order's queued messages in order, until its queue is empty."""
+        while True:
+            with self._condition:
+                queue = self._queues.get(order_id)
+                if not queue:
+                    self._queues.pop(order_id, None)
+                    self._active.discard(order_id)
+                    self._condition.notify_all()
+                    return
+                message = queue.popleft()
+            self._deliver(message)
+
+    def _deliver(self, message: OutgoingMessage) -> None:
+        for attempt in range(self.retries + 1):
+            try:
+                params = message.render()
+                self.manager.call(
+                    self.account, "send_chat_message", msgUuid=message.msg_uuid, **params
+                )
+            except Exception:
+                if attempt < self.retries:
+                    time.sleep(self.backoff * 2**attempt)
+                    continue
+                logger.warning(
+                    "Chat message %s to order %s failed",
+                    message.msg_uuid,
+                    message.order_id,
+                    exc_info=True,
+                )
+                with self._condition:
+                    self.failed += 1
+                    self._seen.pop(message.msg_uuid, None)  # may be queued again
+                return
+            with self._condition:
+                self.sent += 1
+            return
+
+    def pending(self) -> int:
+        """Messages queued and not yet handed to the API."""
+        with self._condition:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every queued message was sent or gave up; ``False`` on timeout."""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._active, timeout)
+
+    def close(self, *, flush: bool = True) -> None:
+        if flush:
+            self.flush()
+        self._executor.shutdown(wait=True, cancel_futures=not flush)
+
+    def __enter__(self) -> "ChatOutbox":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
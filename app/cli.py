@@ -0,0 +1,525 @@
+"""Command-line tools that stream NDJSON to stdout.
+
+Usage::
+
+    python -m app.cli scan --currency UAH,PLN --side 0,1
+    python -m app.cli watch-orders --interval 2
+    python -m app.cli tail-chat <orderId>
+    python -m app.cli backfill --begin 1754000000000
+    python -m app.cli reprice <itemId> --rank 1 --step 0.01 [--apply]
+    python -m app.cli payments
+    python -m app.cli bench [name ...]
+    python -m app.cli shell < commands.txt
+
+Every command runs on :class:`app.accounts.AccountManager`, so calls share
+one connection pool and respect the account's rate limit. Read-only lookups
+(ad details, payment methods) go through its response cache. ``shell`` reads
+one command per line from stdin and runs them all in the same process and
+client, so repeated lookups are answered from the cache.
+``--profile`` writes cProfile stats (to stderr, or to a file when a path is
+given) and per-stage wall times to stderr. ``--settings PROFILE`` picks a
+:class:`app.settings.Settings` profile. ``--profile-dir DIR`` lets a
+long-running command be profiled on demand: ``python -m app.profiling <pid>``
+then writes a sampled, stage-annotated profile of the live process to DIR.
+"""
+
+import argparse
+import contextlib
+import cProfile
+import json
+import math
+import pstats
+import shlex
+import sys
+import time
+from typing import Callable, Iterator
+
+from app.profiling import annotate
+from app.scanner import Market
+
+
+def emit(record: dict) -> None:
+    """Write ``record`` to stdout as one JSON line."""
+    sys.stdout.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+    sys.stdout.flush()
+
+
+def _number(value: float) -> float | None:
+    return None if math.isnan(value) else round(value, 8)
+
+
+class Stages:
+    """Accumulate wall time per named pipeline stage.
+
+    The stage, or the API method when ``api`` is set, also annotates live
+    profiles taken with :mod:`app.profiling`.
+    """
+
+    def __init__(self) -> None:
+        self.totals: dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def __call__(self, name: str, *, api: bool = False) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            with annotate(method=name) if api else annotate(stage=name):
+                yield
+        finally:
+            self.totals[name] = self.totals.get(name, 0.0) + time.perf_counter() - start
+
+    def report(self) -> dict:
+        return {name: round(seconds * 1e3, 3) for name, seconds in self.totals.items()}
+
+
+class Runtime:
+    """State shared by every command in one process: settings, the client and stage timers."""
+
+    def __init__(
+        self,
+        account: str | None = None,
+        *,
+        sync_clock: bool = False,
+        settings_profile: str | None = None,
+    ) -> None:
+        self._account = account
+        self._sync_clock = sync_clock
+        self._settings_profile = settings_profile
+        self._settings = None
+        self._manager = None
+        self.stages = Stages()
+
+    @property
+    def settings(self):
+        if self._settings is None:
+            from app.settings import Settings
+
+            self._settings = Settings.load(profile=self._settings_profile)
+        return self._settings
+
+    @property
+    def manager(self):
+        if self._manager is None:
+            from app.accounts import AccountManager
+
+            options = {"sync_clock": True} if self._sync_clock else {}
+            with self.stages("connect"):
+                self._manager = AccountManager.from_settings(self.settings, **options)
+        return self._manager
+
+    @property
+    def account(self) -> str:
+        return self._account or next(iter(self.manager.accounts))
+
+    def call(self, method: str, /, **params) -> dict:
+        with self.stages(method, api=True):
+            return self.manager.call(self.account, method, **params)
+
+    def cached_call(self, method: str, /, **params) -> dict:
+        """:meth:`call` for read-only lookups, reused for the settings' ``cache_ttl``."""
+        with self.stages(method, api=True):
+            return self.manager.cached_call(self.account, method, **params)
+
+    def pages(self, method: str, /, *, size: int, **params) -> Iterator[dict]:
+        """Yield the items of every page of a ``count``/``items`` listing, in order."""
+        first = self.call(method, page=1, size=size, **params)["result"]
+        yield from first["items"]
+        pages = math.ceil(int(first["count"]) / size)
+        futures = [
+            self.manager.submit(self.account, method, page=page, size=size, **params)
+            for page in range(2, pages + 1)
+        ]
+        for future in futures:
+            with self.stages(method, api=True):
+                items = future.result()["result"]["items"]
+            yield from items
+
+    def close(self) -> None:
+        if self._manager is not None:
+            self._manager.close()
+
+
+def _split(value: str) -> list[str]:
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+def cmd_scan(runtime: Runtime, args: argparse.Namespace) -> None:
+    """Scan online ads and emit one summary per market (and every ad with ``--ads``).
+
+    With ``--changes``, rescans emit only ads added, changed or removed since
+    the previous scan, and a market's summary is recomputed only when it moved.
+    """
+    from app import analytics
+    from app.analytics import AdBook
+    from app.scanner import ChangeDetector, scan_pages
+
+    markets = [
+        Market(args.token, currency, int(side))
+        for currency in _split(args.currency)
+        for side in _split(args.side)
+    ]
+    detector = ChangeDetector() if args.changes else None
+    recorder = None
+    if args.record:
+        from app.recorder import Recorder
+
+        recorder = Recorder(args.record)
+    try:
+        for poll in _polls(args.count or None):
+            with runtime.stages("fetch"):
+                books = scan_pages(
+                    runtime.manager,
+                    runtime.account,
+                    markets,
+                    size=args.size,
+                    max_pages=args.pages,
+                )
+            for market, pages in books.items():
+                items = [item for page in pages for item in page]
+                diff, first = None, True
+                if detector is not None:
+                    first = market not in detector
+                    with runtime.stages("diff"):
+                        diff = detector.diff(market, pages)
+                    if not first:
+                        _emit_diff(diff, ads=args.ads)
+                        if not diff:
+                            continue
+                with runtime.stages("analytics"):
+                    book = AdBook.from_items(items)
+                    summary = {
+                        "market": str(market),
+                        "ads": len(book),
+                        "best": _number(analytics.best_price(book, market.side)),
+                    }
+                    if args.amount:
+                        summary["vwap"] = _number(analytics.vwap(book, market.side, args.amount))
+                if recorder is not None:
+                    with runtime.stages("record"):
+                        recorder.append(book, market=str(market))
+                if args.ads and first:
+                    for item in items:
+                        emit({"market": str(market), "ad": item})
+                emit(summary)
+            if poll:
+                time.sleep(args.interval)
+    finally:
+        if recorder is not None:
+            recorder.close()
+
+
+def _emit_diff(diff, *, ads: bool) -> None:
+    """Emit a market's change counts and, with ``ads``, the changed ads themselves."""
+    market = str(diff.market)
+    if ads:
+        for event, items in (("added", diff.added), ("changed", diff.changed)):
+            for item in items:
+                emit({"market": market, "event": event, "ad": item})
+        for ad_id in diff.removed:
+            emit({"market": market, "event": "removed", "id": ad_id})
+    emit(
+        {
+            "market": market,
+            "added": len(diff.added),
+            "changed": len(diff.changed),
+            "removed": len(diff.removed),
+            "unchanged_pages": diff.unchanged_pages,
+            "pages": diff.pages,
+        }
+    )
+
+
+def cmd_watch_orders(runtime: Runtime, args: argparse.Namespace) -> None:
+    """Poll pending orders and emit ``new``/``changed``/``gone`` events.
+
+    With ``--adaptive`` the interval follows :class:`app.polling.PollController`
+    and ``unread`` events flag orders whose chat has new messages.
+    """
+    controller = None
+    if args.adaptive:
+        from app.polling import PollController, chat_hints, pending_pace
+
+        max_interval = args.max_interval
+        if max_interval is None:
+            max_interval = runtime.settings.poll_max_interval
+        controller = PollController(max_interval=max_interval)
+        controller.track("get_pending_orders")
+    seen: dict[str, dict] = {}
+    for poll in _polls(args.count):
+        current = {item["id"]: item for item in runtime.pages("get_pending_orders", size=args.size)}
+        events = []
+        for order_id, order in current.items():
+            previous = seen.get(order_id)
+            if previous is None:
+                events.append({"event": "new", "order": order})
+            elif previous.get("status") != order.get("status"):
+                events.append({"event": "changed", "order": order})
+        for order_id in seen.keys() - current.keys():
+            events.append({"event": "gone", "order": seen[order_id]})
+        if controller is not None:
+            for order_id in chat_hints(seen, current) & seen.keys():
+                events.append({"event": "unread", "order": current[order_id]})
+        for event in events:
+            emit(event)
+        seen = current
+        if not poll:
+            continue
+        if controller is None:
+            time.sleep(runtime.settings.poll_interval if args.interval is None else args.interval)
+            continue
+        status, deadline = pending_pace(current.values())
+        controller.track("get_pending_orders", status=status, deadline=deadline)
+        controller.observe("get_pending_orders", changed=bool(events))
+        time.sleep(controller.next_delay())
+        controller.due()
+
+
+def cmd_tail_chat(runtime: Runtime, args: argparse.Namespace) -> None:
+    """Emit chat messages of one order oldest first, then keep polling for new ones."""
+    last_id = 0
+    for poll in _polls(args.count):
+        result = runtime.call("get_chat_messages", orderId=args.order_id, size=str(args.size))
+        messages = result["result"]["result"] or []
+        for message in sorted(messages, key=lambda m: int(m["id"])):
+            if int(message["id"]) > last_id:
+                emit(message)
+                last_id = int(message["id"])
+        if poll:
+            time.sleep(runtime.settings.poll_interval if args.interval is None else args.interval)
+
+
+def cmd_backfill(runtime: Runtime, args: argparse.Namespace) -> None:
+    """Emit every historical order in the requested window, pages fetched concurrently."""
+    params = {"beginTime": args.begin, "endTime": args.end, "status": args.status}
+    params = {key: value for key, value in params.items() if value is not None}
+    for order in runtime.pages("get_orders", size=args.size, **params):
+        emit(order)
+
+
+def cmd_reprice(runtime: Runtime, args: argparse.Namespace) -> None:
+    """Compute the price that puts an ad at ``--rank`` and apply it with ``--apply``."""
+    from app import analytics
+    from app.analytics import AdBook
+    from app.scanner import scan_markets
+
+    ad = runtime.cached_call("get_ad_details", itemId=args.item_id)["result"]
+    market = Market(ad["tokenId"], ad["currencyId"], int(ad["side"]))
+    with runtime.stages("fetch"):
+        items = scan_markets(
+            runtime.manager, runtime.account, [market], size=args.size, max_pages=args.pages
+        )[market]
+    with runtime.stages("analytics"):
+        target = analytics.target_price(
+            AdBook.from_items(items),
+            market.side,
+            rank=args.rank,
+            step=args.step,
+            exclude_user_id=int(ad["userId"]),
+        )
+    if args.min_price is not None:
+        target = max(target, args.min_price)
+    if args.max_price is not None:
+        target = min(target, args.max_price)
+    scale = ad.get("symbolInfo", {}).get("currency", {}).get("scale", 2)
+    plan = {
+        "itemId": ad["id"],
+        "market": str(market),
+        "current": float(ad["price"]),
+        "target": None if math.isnan(target) else round(target, scale),
+        "applied": False,
+    }
+    if args.apply and plan["target"] is not None and plan["target"] != plan["current"]:
+        runtime.call(
+            "update_ad",
+            id=ad["id"],
+            priceType=ad["priceType"],
+            premium=ad["premium"],
+            price=f"{plan['target']:.{scale}f}",
+            minAmount=ad["minAmount"],
+            maxAmount=ad["maxAmount"],
+            remark=ad["remark"],
+            tradingPreferenceSet=ad["tradingPreferenceSet"],
+            paymentIds=[term["id"] for term in ad["paymentTerms"]],
+            actionType="MODIFY",
+            quantity=ad["lastQuantity"],
+            paymentPeriod=ad["paymentPeriod"],
+        )
+        runtime.manager.invalidate(runtime.account, "get_ad_details", itemId=args.item_id)
+        plan["applied"] = True
+    emit(plan)
+
+
+def cmd_payments(runtime: Runtime, args: argparse.Namespace) -> None:
+    """Emit our payment methods with their payment type names."""
+    from app.metadata import MetadataRegistry
+
+    registry = MetadataRegistry(lambda: runtime.cached_call("get_user_payment_types")["result"])
+    registry.refresh()
+    for method in registry.methods.values():
+        emit(
+            {
+                "id": method.id,
+                "type": method.type.id,
+                "name": method.type.name,
+                "online": method.type.online,
+                "bank": method.bank_name,
+                "visible": method.visible,
+            }
+        )
+
+
+def cmd_bench(runtime: Runtime, args: argparse.Namespace) -> None:
+    """Run micro-benchmarks from :mod:`app.bench`."""
+    from app.bench import BENCHMARKS
+
+    for name in args.names or BENCHMARKS:
+        with runtime.stages(f"bench:{name}"):
+            emit({"bench": name, **BENCHMARKS[name]()})
+
+
+def cmd_shell(runtime: Runtime, args: argparse.Namespace) -> None:
+    """Run one command per stdin line in this process; failures are emitted, not raised."""
+    parser = build_parser()
+    for line in sys.stdin:
+        argv = shlex.split(line, comments=True)
+        if not argv:
+            continue
+        try:
+            command = parser.parse_args(argv)
+            if command.handler is cmd_shell:
+                raise ValueError("shell cannot be nested")
+            command.handler(runtime, command)
+        except SystemExit:
+            emit({"error": "invalid command", "command": line.strip()})
+        except Exception as exc:  # keep the session alive for the next command
+            emit({"error": str(exc), "command": line.strip()})
+
+
+def _polls(count: int | None) -> Iterator[bool]:
+    """Yield once per poll; the value is ``False`` on the last one."""
+    index = 0
+    while count is None or index < count:
+        index += 1
+        yield count is None or index < count
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="app.cli", description=__doc__.splitlines()[0])
+    parser.add_argument("--account", help="account name from the configuration")
+    parser.add_argument(
+        "--sync-clock",
+        action="store_true",
+        help="stamp requests with server time; allows a tight BYBIT_RECV_WINDOW",
+    )
+    parser.add_argument(
+        "--settings",
+        dest="settings_profile",
+        metavar="PROFILE",
+        help="settings profile: default, low-latency, bulk-backfill or test",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="-",
+        metavar="PATH",
+        help="profile the run; stats go to PATH, or to stderr when omitted",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        metavar="DIR",
+        help="capture live profiles into DIR on SIGUSR1 (sampling) or SIGUSR2 (cProfile)",
+    )
+    parser.add_argument(
+        "--profile-seconds", type=float, default=10.0, help="length of a live profile"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def command(name: str, handler: Callable) -> argparse.ArgumentParser:
+        sub = commands.add_parser(name, help=handler.__doc__.splitlines()[0])
+        sub.set_defaults(handler=handler)
+        return sub
+
+    scan = command("scan", cmd_scan)
+    scan.add_argument("--token", default="USDT")
+    scan.add_argument("--currency", default="UAH,PLN", help="comma-separated fiat ids")
+    scan.add_argument("--side", default="0,1", help="comma-separated sides")
+    scan.add_argument("--size", type=int, default=50, help="ads per page")
+    scan.add_argument("--pages", type=int, help="maximum pages per market")
+    scan.add_argument("--amount", type=float, help="fiat amount for the VWAP column")
+    scan.add_argument("--ads", action="store_true", help="emit every ad as well")
+    scan.add_argument("--record", metavar="PATH", help="append the books to a recording")
+    scan.add_argument("--count", type=int, default=1, help="number of scans (0 for endless)")
+    scan.add_argument("--interval", type=float, default=5.0, help="seconds between scans")
+    scan.add_argument(
+        "--changes", action="store_true", help="after the first scan, emit only what changed"
+    )
+
+    watch = command("watch-orders", cmd_watch_orders)
+    watch.add_argument("--interval", type=float, help="seconds between polls")
+    watch.add_argument(
+        "--adaptive", action="store_true", help="pace polls by order activity and deadlines"
+    )
+    watch.add_argument("--max-interval", type=float, help="longest adaptive interval")
+    watch.add_argument("--count", type=int, help="stop after this many polls")
+    watch.add_argument("--size", type=int, default=30)
+
+    chat = command("tail-chat", cmd_tail_chat)
+    chat.add_argument("order_id")
+    chat.add_argument("--interval", type=float, help="seconds between polls")
+    chat.add_argument("--count", type=int, help="stop after this many polls")
+    chat.add_argument("--size", type=int, default=100)
+
+    backfill = command("backfill", cmd_backfill)
+    backfill.add_argument("--begin", help="start time, epoch milliseconds")
+    backfill.add_argument("--end", help="end time, epoch milliseconds")
+    backfill.add_argument("--status", type=int)
+    backfill.add_argument("--size", type=int, default=30)
+
+    reprice = command("reprice", cmd_reprice)
+    reprice.add_argument("item_id")
+    reprice.add_argument("--rank", type=int, default=1)
+    reprice.add_argument("--step", type=float, default=0.01)
+    reprice.add_argument("--min-price", type=float)
+    reprice.add_argument("--max-price", type=float)
+    reprice.add_argument("--size", type=int, default=50)
+    reprice.add_argument("--pages", type=int, default=2)
+    reprice.add_argument("--apply", action="store_true", help="update the ad (dry run otherwise)")
+
+    command("payments", cmd_payments)
+
+    bench = command("bench", cmd_bench)
+    bench.add_argument("names", nargs="*")
+
+    command("shell", cmd_shell)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    runtime = Runtime(
+        args.account, sync_clock=args.sync_clock, settings_profile=args.settings_profile
+    )
+    profiler = cProfile.Profile() if args.profile else None
+    if args.profile_dir:
+        from app import profiling
+
+        profiling.install(args.profile_dir, duration=args.profile_seconds)
+    try:
+        if profiler is not None:
+            profiler.enable()
+        args.handler(runtime, args)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            if args.profile == "-":
+                pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(30)
+            else:
+                profiler.dump_stats(args.profile)
+            print(json.dumps({"stages_ms": runtime.stages.report()}), file=sys.stderr)
+        runtime.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,92 @@
-"""Bybit P2P client helpers."""
+"""Bybit P2P client helpers.
 
-from bybit_p2p import P2P
+``bybit_p2p`` and ``requests`` are imported on first use so that importing this
+module, and the entry points built on it, stays cheap.
+"""
 
+from typing import TYPE_CHECKING
 
+if TYPE_CHECKING:
+    import requests
+    from bybit_p2p import P2P
 
-def get_api(*, api_key: str, api_secret: str, testnet: bool, recv_window: int) -> P2P:
-    """Instantiate a Bybit P2P API client."""
-    return P2P(
+    from app.client.clock import ServerClock
+    from app.client.transport import Transport
+
+
+def new_session(
+    *, pool_size: int = 10, verify: bool = True, block: bool = False
+) -> "requests.Session":
+    """Create an HTTP session whose connection pool holds ``pool_size`` sockets per host.
+
+    With ``block``, a thread finding every socket busy waits for one instead of
+    opening a connection that is discarded afterwards.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    session.verify = verify
+    session.headers.update({"Content-Type": "application/json", "Accept": "application/json"})
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, pool_block=block)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_api(
+    *,
+    api_key: str,
+    api_secret: str,
+    testnet: bool,
+    recv_window: int,
+    session: "requests.Session | None" = None,
+    clock: "ServerClock | None" = None,
+    threads: int | None = None,
+    transport: "Transport | None" = None,
+) -> "P2P":
+    """Instantiate a Bybit P2P API client.
+
+    The client builds JSON requests from precompiled plans (see
+    :mod:`app.client.compiler`). Clients given the same ``session`` share its
+    connection pool; request signing stays per client since every call carries
+    its own headers. Requests are stamped with ``clock`` when given, see
+    :func:`server_clock`. With ``threads``, the client is a
+    :class:`~app.client.threaded.ThreadedP2P` meant to be shared by that many
+    threads; without a ``session`` it gets its own pool of that size. Requests
+    go through ``transport`` when given, see :mod:`app.client.transport`.
+    """
+    if threads is not None:
+        from app.client.threaded import ThreadedP2P
+
+        return ThreadedP2P(
+            threads=threads,
+            session=session,
+            testnet=testnet,
+            api_key=api_key,
+            api_secret=api_secret,
+            recv_window=recv_window,
+            clock=clock,
+            transport=transport,
+        )
+    from app.client.compiler import CompiledP2P
+
+    api = CompiledP2P(
         testnet=testnet,
         api_key=api_key,
         api_secret=api_secret,
         recv_window=recv_window,
+        clock=clock,
+        transport=transport,
     )
+    if session is not None:
+        api.client = session
+    return api
+
+
+def server_clock(*, testnet: bool, session: "requests.Session | None" = None) -> "ServerClock":
+    """Start a background-synced clock for the mainnet or testnet API host."""
+    from app.client.clock import ServerClock, server_time_fetcher
 
+    host = "https://api-testnet.bybit.com" if testnet else "https://api.bybit.com"
+    return ServerClock(server_time_fetcher(session or new_session(), host)).start()
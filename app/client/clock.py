@@ -0,0 +1,104 @@
+"""Server clock synchronisation for request timestamps."""
+
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+SERVER_TIME_PATH = "/v5/market/time"
+
+
+def server_time_fetcher(session: "requests.Session", base_url: str) -> Callable[[], float]:
+    """Return a function reading Bybit's public server time, in milliseconds."""
+    url = base_url + SERVER_TIME_PATH
+
+    def fetch() -> float:
+        response = session.get(url, timeout=5)
+        response.raise_for_status()
+        body = response.json()
+        return int(body["result"]["timeNano"]) / 1e6
+
+    return fetch
+
+
+class ServerClock:
+    """Local wall clock corrected by an estimated offset to the server clock.
+
+    Each sample brackets one server-time request between two local readings
+    and assumes the server stamped it at the midpoint, as NTP does, so its
+    error is at most half the round trip. A sync takes ``samples`` readings
+    and keeps the one with the shortest round trip.
+    """
+
+    def __init__(
+        self,
+        fetch_server_ms: Callable[[], float],
+        *,
+        samples: int = 5,
+        interval: float = 300.0,
+    ) -> None:
+        self._fetch = fetch_server_ms
+        self.samples = samples
+        self.interval = interval
+        self.offset_ms = 0.0
+        self.rtt_ms: float | None = None
+        self.synced_at: float | None = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def now_ms(self) -> int:
+        """Current server time estimate in epoch milliseconds."""
+        return int(time.time() * 10**3 + self.offset_ms)
+
+    def sample(self) -> tuple[float, float]:
+        """Take one reading; return ``(offset_ms, rtt_ms)``."""
+        wall = time.time()
+        start = time.perf_counter()
+        server_ms = self._fetch()
+        rtt = time.perf_counter() - start
+        return server_ms - (wall + rtt / 2) * 10**3, rtt * 10**3
+
+    def sync(self) -> float:
+        """Re-estimate the offset and return it."""
+        with self._lock:
+            offset, rtt = min((self.sample() for _ in range(self.samples)), key=lambda s: s[1])
+            self.offset_ms, self.rtt_ms, self.synced_at = offset, rtt, time.monotonic()
+        logger.debug("Server clock offset %.1fms (rtt %.1fms)", offset, rtt)
+        return offset
+
+    def request_sync(self) -> None:
+        """Ask the background thread to re-sync now, e.g. after a timestamp rejection."""
+        self._wake.set()
+
+    def start(self) -> "ServerClock":
+        """Sync once, then keep re-syncing every ``interval`` seconds in a daemon thread."""
+        if self._thread is None:
+            self.sync()
+            self._thread = threading.Thread(target=self._run, name="p2p-clock", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                return
+            try:
+                self.sync()
+            except Exception:  # keep the last good offset
+                logger.warning("Server clock sync failed", exc_info=True)
@@ -0,0 +1,340 @@
+"""Precompiled request plans for ``bybit_p2p`` methods.
+
+``P2P.http_req_handler`` re-derives everything about a request on each call:
+it scans the required-parameter list, rebuilds the cast lists and walks them
+with ``in list`` lookups, and goes through ``Session.prepare_request`` to merge
+headers and re-parse the URL. :func:`compile_plans` does that work once per
+client and :class:`CompiledP2P` only adds the timestamp and signature per call,
+producing the same payloads, signatures and headers as the library.
+"""
+
+import hashlib
+import hmac
+import json
+import time
+from dataclasses import dataclass
+from datetime import datetime as dt
+from datetime import timezone
+from json import JSONDecodeError
+from types import MappingProxyType
+from typing import Any, Mapping
+
+from bybit_p2p import P2P
+from bybit_p2p._exceptions import FailedRequestError
+from bybit_p2p._p2p_helper import P2PMethods
+from bybit_p2p._p2p_method import P2PMethod
+from requests import PreparedRequest, Response
+from requests.structures import CaseInsensitiveDict
+
+from app.client.clock import ServerClock
+from app.client.transport import Transport, send_async
+from app.profiling import annotate
+
+# Keys ``P2PManager._cast_values`` coerces in POST bodies, at any nesting depth.
+_STR_PARAMS = (
+    "itemId",
+    "side",
+    "currency_id",
+    "id",
+    "priceType",
+    "premium",
+    "price",
+    "minAmount",
+    "maxAmount",
+    "remark",
+    "actionType",
+    "quantity",
+    "paymentPeriod",
+    "hasUnPostAd",
+    "isKyc",
+    "isEmail",
+    "isMobile",
+    "hasRegisterTime",
+    "registerTimeThreshold",
+    "orderFinishNumberDay30",
+    "completeRateDay30",
+    "nationalLimit",
+    "hasOrderFinishNumberDay30",
+    "hasCompleteRateDay30",
+    "hasNationalLimit",
+    "beginTime",
+    "endTime",
+    "tokenId",
+    "startMessageId",
+)
+_INT_PARAMS = ("positionIdx",)
+_POST_CASTS = MappingProxyType(
+    {key: str for key in _STR_PARAMS} | {key: int for key in _INT_PARAMS}
+)
+_NO_CASTS: Mapping[str, type] = MappingProxyType({})
+
+# retCode Bybit answers with when X-BAPI-TIMESTAMP falls outside the recv window.
+TIMESTAMP_REJECTED = 10002
+
+# ``FailedRequestError`` outlives the request in logs, futures and retry
+# queues, so it carries at most this much payload and only these headers.
+MAX_ERROR_PAYLOAD = 512
+ERROR_HEADERS = (
+    "Retry-After",
+    "Traceid",
+    "Timenow",
+    "X-Bapi-Limit",
+    "X-Bapi-Limit-Status",
+    "X-Bapi-Limit-Reset-Timestamp",
+)
+
+
+@dataclass(frozen=True, slots=True)
+class RequestPlan:
+    """Everything about a method's requests that does not change between calls."""
+
+    name: str
+    http_method: str  # "GET", "POST" or "FILE"
+    url: str
+    required: frozenset[str]
+    required_order: tuple[str, ...]
+    casts: Mapping[str, type]
+    headers: Mapping[str, str]  # all headers except the signature and timestamp
+
+
+def compile_plans(
+    *,
+    base_url: str,
+    api_key: str,
+    recv_window: int,
+    session_headers: Mapping[str, str] | None = None,
+) -> dict[P2PMethod, RequestPlan]:
+    """Compile a plan for every method declared on ``P2PMethods``."""
+    template = dict(session_headers or {}) | {
+        "Content-Type": "application/json",
+        "X-BAPI-API-KEY": api_key,
+        "X-BAPI-SIGN-TYPE": "2",
+        "X-BAPI-RECV-WINDOW": str(recv_window),
+    }
+    plans = {}
+    for name, method in vars(P2PMethods).items():
+        if not isinstance(method, P2PMethod):
+            continue
+        url = base_url + method.url
+        if method.http_method == "POST":
+            url = _prepared_url(url)
+        plans[method] = RequestPlan(
+            name=name.lower(),
+            http_method=method.http_method,
+            url=url,
+            required=frozenset(method.required_params),
+            required_order=tuple(method.required_params),
+            casts=_POST_CASTS if method.http_method == "POST" else _NO_CASTS,
+            headers=MappingProxyType(template),
+        )
+    return plans
+
+
+def _prepared_url(url: str) -> str:
+    request = PreparedRequest()
+    request.prepare_url(url, None)
+    return request.url
+
+
+def _whole(value: Any) -> bool:
+    return isinstance(value, float) and value == int(value)
+
+
+def _sanitize(params: Mapping[str, Any]) -> Mapping[str, Any]:
+    """``params`` with whole floats turned into ints, as the library does.
+
+    Copied only when something changes; the caller's mapping is never modified.
+    """
+    if not any(_whole(value) for value in params.values()):
+        return params
+    return {key: int(value) if _whole(value) else value for key, value in params.items()}
+
+
+def _cast(params: Mapping[str, Any], casts: Mapping[str, type]) -> Mapping[str, Any]:
+    """``params`` with the ``casts`` table applied recursively through nested dicts.
+
+    Like :func:`_sanitize`, a dict is copied only when one of its values changes.
+    """
+    result = None
+    for key, value in params.items():
+        if isinstance(value, dict):
+            new = _cast(value, casts)
+        else:
+            cast = casts.get(key)
+            new = value if cast is None or isinstance(value, cast) else cast(value)
+        if new is not value:
+            if result is None:
+                result = dict(params)
+            result[key] = new
+    return params if result is None else result
+
+
+def encode_payload(plan: RequestPlan, params: Mapping[str, Any]) -> str:
+    """Serialise validated ``params`` exactly as ``P2PManager._generate_payload`` would."""
+    params = _sanitize(params)
+    if plan.http_method == "GET":
+        return "&".join(
+            f"{key}={value}" for key, value in sorted(params.items()) if value is not None
+        )
+    return json.dumps(_cast(params, plan.casts))
+
+
+class CompiledP2P(P2P):
+    """:class:`bybit_p2p.P2P` whose JSON requests are built from precompiled plans.
+
+    Caller-supplied ``params`` are never mutated. File uploads still go through
+    the library's own handler. With a ``clock``, requests are stamped with its
+    server-time estimate and a timestamp rejection asks it to re-sync.
+    Requests are sent through ``transport`` (see :mod:`app.client.transport`),
+    by default the ``requests`` session in ``client``.
+    """
+
+    def __init__(
+        self, *, clock: ServerClock | None = None, transport: Transport | None = None, **kwargs
+    ) -> None:
+        super().__init__(**kwargs)
+        self.clock = clock
+        self.transport = transport
+        self._plans = compile_plans(
+            base_url=self._url,
+            api_key=self._api_key,
+            recv_window=self._recv_window,
+            session_headers=self.client.headers,
+        )
+        self._sign_prefix = f"{self._api_key}{self._recv_window}"
+        self._mac = None
+        if not self._rsa:
+            self._mac = hmac.new(self._api_secret.encode("utf-8"), digestmod=hashlib.sha256)
+
+    def _timestamp(self) -> int:
+        if self.clock is not None:
+            return self.clock.now_ms()
+        return int(time.time() * 10**3)
+
+    def _sign_payload(self, payload: str, timestamp: int) -> str:
+        sign_string = f"{timestamp}{self._sign_prefix}{payload}"
+        if self._mac is None:
+            return P2P._sign(True, self._api_secret, sign_string)
+        mac = self._mac.copy()
+        mac.update(sign_string.encode("utf-8"))
+        return mac.hexdigest()
+
+    def build_request(
+        self, method: P2PMethod, params: Mapping[str, Any] | None, *, timestamp: int | None = None
+    ) -> tuple[PreparedRequest, str]:
+        """Return the signed request for ``method`` and the payload it carries."""
+        plan = self._plans[method]
+        if params is None:
+            params = {}
+        if not plan.required <= params.keys():
+            missing = [p for p in plan.required_order if p not in params]
+            raise ValueError(f"Missing required parameters: {', '.join(missing)}")
+        if timestamp is None:
+            timestamp = self._timestamp()
+        payload = encode_payload(plan, params)
+
+        headers = CaseInsensitiveDict(plan.headers)
+        headers["X-BAPI-SIGN"] = self._sign_payload(payload, timestamp)
+        headers["X-BAPI-TIMESTAMP"] = str(timestamp)
+        request = PreparedRequest()
+        if plan.http_method == "GET":
+            request.method = "GET"
+            request.prepare_url(f"{plan.url}?{payload}" if payload else plan.url, None)
+        else:
+            request.method = "POST"
+            request.url = plan.url
+            request.body = payload
+            headers["Content-Length"] = str(len(payload))
+        request.headers = headers
+        return request, payload
+
+    def http_req_handler(self, method: P2PMethod, params):
+        if method.http_method == "FILE" or method not in self._plans:
+            # the library rewrites whole floats in place
+            return super().http_req_handler(method, dict(params or {}))
+        plan = self._plans[method]
+        with annotate(method=plan.name):
+            request, payload = self.build_request(method, params)
+            response = (self.transport or self.client).send(request)
+            return self._checked(response, plan, payload)
+
+    def _checked(self, response: Response, plan: RequestPlan, payload: str) -> dict:
+        try:
+            return self._process_response(response, plan, payload)
+        except FailedRequestError as exc:
+            if exc.status_code == TIMESTAMP_REJECTED and self.clock is not None:
+                self.clock.request_sync()
+            raise
+
+    async def request_async(self, name: str, /, **params) -> dict:
+        """Call ``name`` (e.g. ``"get_online_ads"``) from a coroutine and return the response.
+
+        An asynchronous transport sends on the running event loop; a
+        synchronous one is called on the loop's default executor.
+        """
+        method = getattr(P2PMethods, name.upper())
+        if method.http_method == "FILE":
+            raise ValueError(f"{name} is not available asynchronously")
+        request, payload = self.build_request(method, params)
+        response = await send_async(self.transport or self.client, request)
+        return self._checked(response, self._plans[method], payload)
+
+    def request_raw(self, name: str, /, **params) -> bytes:
+        """Send ``name`` (e.g. ``"get_orders"``) and return the undecoded response body.
+
+        Only the HTTP status is checked; decoding and ``retCode`` handling are
+        left to the caller, e.g. :mod:`app.ingest` workers.
+        """
+        method = getattr(P2PMethods, name.upper())
+        plan = self._plans[method]
+        with annotate(method=plan.name):
+            request, payload = self.build_request(method, params)
+            response = (self.transport or self.client).send(request)
+        if response.status_code != 200:
+            message = f"HTTP status code is: {response.status_code}, expected: 200"
+            raise self._failure(plan, payload, message, response.status_code, response.headers)
+        return response.content
+
+    def _failure(self, plan: RequestPlan, payload: str, message: str, code, headers):
+        if len(payload) > MAX_ERROR_PAYLOAD:
+            payload = f"{payload[:MAX_ERROR_PAYLOAD]}... ({len(payload)} chars)"
+        if headers is not None:
+            headers = {key: headers[key] for key in ERROR_HEADERS if key in headers}
+        return FailedRequestError(
+            request=f"{plan.url}: {payload}",
+            message=message,
+            status_code=code,
+            time=dt.now(timezone.utc).strftime("%H:%M:%S"),
+            resp_headers=headers,
+        )
+
+    def _process_response(self, response: Response, plan: RequestPlan, payload: str) -> dict:
+        """Decode ``response`` or raise ``FailedRequestError`` like the library does."""
+        if response.status_code != 200:
+            if response.status_code == 403:
+                error_msg = (
+                    "Access denied error. Possible causes: 1) your IP is located in the US or "
+                    "Mainland China, 2) IP banned due to ratelimit violation"
+                )
+            elif response.status_code == 401:
+                error_msg = (
+                    "Unauthorized. Possible causes: 1) incorrect API key and/or secret, "
+                    "2) incorrect environment: Mainnet vs Testnet"
+                )
+            else:
+                error_msg = f"HTTP status code is: {response.status_code}, expected: 200"
+                self.logger.error(error_msg)
+            raise self._failure(plan, payload, error_msg, response.status_code, response.headers)
+        try:
+            s_json = response.json()
+        except JSONDecodeError:
+            self.logger.debug(f"Response text: {response.text[:MAX_ERROR_PAYLOAD]}")
+            raise self._failure(
+                plan, payload, "Could not decode JSON.", response.status_code, response.headers
+            )
+        ret_code = "retCode" if "retCode" in s_json else "ret_code"
+        ret_msg = "retMsg" if "retMsg" in s_json else "ret_msg"
+        if s_json[ret_code]:
+            self.logger.error(f"{s_json[ret_msg]} (ErrCode: {s_json[ret_code]})")
+            raise self._failure(plan, payload, s_json[ret_msg], s_json[ret_code], response.headers)
+        return s_json
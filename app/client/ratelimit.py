@@ -0,0 +1,69 @@
+"""Token-bucket rate limiting for API calls."""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at ``rate`` tokens per second.
+
+    ``burst`` defaults to ``rate``, but at least one token, so rates below one
+    request per second still let a request through.
+    """
+
+    def __init__(self, rate: float, burst: float | None = None) -> None:
+        self.rate, self.burst = self._check(rate, burst)
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate: float, burst: float | None = None) -> None:
+        """Change the refill rate, e.g. after a settings reload; ``burst`` as in the constructor."""
+        rate, burst = self._check(rate, burst)
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+            self.burst = burst
+            self._tokens = min(self._tokens, self.burst)
+
+    @staticmethod
+    def _check(rate: float, burst: float | None) -> tuple[float, float]:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if burst is None:
+            burst = max(rate, 1.0)
+        if burst < 1:
+            raise ValueError("burst must be at least one token")
+        return rate, burst
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def try_acquire(self, tokens: float = 1, *, keep: float = 0) -> float:
+        """Take ``tokens`` if available; otherwise return the seconds to wait.
+
+        With ``keep``, tokens are only taken if ``keep`` more would be left,
+        reserving them for other callers.
+        """
+        keep = max(0.0, min(keep, self.burst - tokens))
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens + keep:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens + keep - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1, timeout: float | None = None, *, keep: float = 0) -> bool:
+        """Block until ``tokens`` are taken; ``False`` if ``timeout`` expires first.
+
+        ``keep`` is as for :meth:`try_acquire`.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens, keep=keep)
+            if not wait:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
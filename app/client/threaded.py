@@ -0,0 +1,83 @@
+"""One API client shared by many threads."""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Mapping
+
+from app.client.bybit import new_session
+from app.client.compiler import CompiledP2P
+
+if TYPE_CHECKING:
+    import requests
+
+
+class ThreadedP2P(CompiledP2P):
+    """:class:`CompiledP2P` that any number of threads may call at once.
+
+    Requests are built from the client's immutable plans; a call keeps its
+    state on the stack and copies caller params only where a value has to
+    change, so neither the client nor the caller's dicts are ever modified.
+    The HTTP connection pool holds one socket per thread and makes a thread
+    wait when all are busy. :meth:`submit` and :meth:`map` run calls on a
+    pool of ``threads`` workers.
+    """
+
+    def __init__(
+        self, *, threads: int = 8, session: "requests.Session | None" = None, **kwargs
+    ) -> None:
+        super().__init__(**kwargs)
+        self.threads = threads
+        if session is None:
+            session = new_session(pool_size=threads, verify=self.client.verify, block=True)
+        self.client.close()
+        self.client = session
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.threads, thread_name_prefix="p2p-client")
+            return self._executor
+
+    def submit(self, name: str, /, **params) -> Future:
+        """Call method ``name`` (e.g. ``"get_online_ads"``) on the worker pool."""
+        return self.executor.submit(getattr(self, name), **params)
+
+    def map(
+        self, name: str, params: Iterable[Mapping[str, Any]], *, timeout: float | None = None
+    ) -> Iterator[dict]:
+        """Call ``name`` once per mapping in ``params`` concurrently; yield responses in order.
+
+        As with :meth:`Executor.map`, an exception is raised when its response
+        is reached, ``timeout`` bounds the whole map from this call, and calls
+        not yet started are cancelled once the iterator is left early.
+        """
+        method = getattr(self, name)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        futures = [self.executor.submit(method, **call) for call in params]
+        return self._results(futures, deadline)
+
+    @staticmethod
+    def _results(futures: list[Future], deadline: float | None) -> Iterator[dict]:
+        try:
+            for future in futures:
+                yield future.result(None if deadline is None else deadline - time.monotonic())
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def close(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        self.client.close()
+
+    def __enter__(self) -> "ThreadedP2P":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -1,27 +1,107 @@
 """Configuration utilities for the Bybit P2P client."""
 
+from functools import cache
 from os import getenv
+from typing import TYPE_CHECKING
 
-try:  # Prefer local .env when available
-    from dotenv import load_dotenv
+if TYPE_CHECKING:
+    from app.settings import Settings
 
-    load_dotenv()
-except Exception:  # pragma: no cover - dotenv is optional
-    pass
+DEFAULT_RATE_LIMIT = 10.0  # requests per second per account
+
+
+@cache
+def _load_dotenv() -> None:
+    """Parse a local ``.env`` into the environment, once per process."""
+    try:  # Prefer local .env when available
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    except Exception:  # pragma: no cover - dotenv is optional
+        pass
+
+
+def _flag(value: str) -> bool:
+    return value.lower() in {"1", "true", "yes"}
 
 
 def load_config() -> dict:
     """Load API credentials and flags from environment variables."""
-    api_key = getenv("BYBIT_API_KEY")
-    api_secret = getenv("BYBIT_API_SECRET")
-    testnet = getenv("BYBIT_TESTNET", "false").lower() in {"1", "true", "yes"}
-    recv_window = int(getenv("BYBIT_RECV_WINDOW", "20000"))
-    if not api_key or not api_secret:
-        raise RuntimeError("BYBIT_API_KEY and BYBIT_API_SECRET must be set")
+    from app.settings import Settings
+
+    settings = Settings.from_env()
     return {
-        "api_key": api_key,
-        "api_secret": api_secret,
-        "testnet": testnet,
-        "recv_window": recv_window,
+        "api_key": settings.api_key,
+        "api_secret": settings.api_secret,
+        "testnet": settings.testnet,
+        "recv_window": settings.recv_window,
     }
 
+
+def load_accounts(settings: "Settings | None" = None) -> dict[str, dict]:
+    """Load credentials for every merchant account, keyed by account name.
+
+    Accounts come from the TOML file named by ``BYBIT_ACCOUNTS_FILE`` (one
+    ``[accounts.<name>]`` table each) or from ``BYBIT_ACCOUNTS=<name>,...`` with
+    ``BYBIT_<NAME>_API_KEY``/``BYBIT_<NAME>_API_SECRET`` per account. Without
+    either, the single account from :func:`load_config` is returned as
+    ``"default"``. Every entry has the :func:`load_config` keys plus
+    ``rate_limit`` in requests per second; ``settings`` (by default
+    :meth:`Settings.load`) provides the values an account does not set.
+    """
+    if settings is None:
+        from app.settings import Settings
+
+        settings = Settings.load()
+    testnet = settings.testnet
+    recv_window = settings.recv_window
+    rate_limit = settings.rate_limit
+
+    path = getenv("BYBIT_ACCOUNTS_FILE")
+    if path:
+        import tomllib
+
+        with open(path, "rb") as fh:
+            tables = tomllib.load(fh).get("accounts", {})
+    elif getenv("BYBIT_ACCOUNTS"):
+        tables = {}
+        for name in filter(None, (n.strip() for n in getenv("BYBIT_ACCOUNTS").split(","))):
+            prefix = f"BYBIT_{name.upper()}_"
+            table = {
+                "api_key": getenv(prefix + "API_KEY"),
+                "api_secret": getenv(prefix + "API_SECRET"),
+                "testnet": getenv(prefix + "TESTNET"),
+                "recv_window": getenv(prefix + "RECV_WINDOW"),
+                "rate_limit": getenv(prefix + "RATE_LIMIT"),
+            }
+            tables[name] = {key: value for key, value in table.items() if value is not None}
+    else:
+        if not settings.api_key or not settings.api_secret:
+            raise RuntimeError("BYBIT_API_KEY and BYBIT_API_SECRET must be set")
+        return {
+            "default": {
+                "api_key": settings.api_key,
+                "api_secret": settings.api_secret,
+                "testnet": testnet,
+                "recv_window": recv_window,
+                "rate_limit": rate_limit,
+            }
+        }
+
+    accounts = {}
+    for name, table in tables.items():
+        if not table.get("api_key") or not table.get("api_secret"):
+            raise RuntimeError(f"Account {name!r} needs both an API key and secret")
+        account_testnet = table.get("testnet", testnet)
+        if isinstance(account_testnet, str):
+            account_testnet = _flag(account_testnet)
+        accounts[name] = {
+            "api_key": table["api_key"],
+            "api_secret": table["api_secret"],
+            "testnet": account_testnet,
+            "recv_window": int(table.get("recv_window", recv_window)),
+            "rate_limit": float(table.get("rate_limit", rate_limit)),
+        }
+    if not accounts:
+        raise RuntimeError("No accounts configured")
+    return accounts
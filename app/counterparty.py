@@ -0,0 +1,246 @@
+"""Counterparty profile cache and risk scoring.
+
+Profiles from ``get_counterparty_info`` are cached per ``originalUid`` (the
+``targetUserId`` of an order) and persisted to a JSON file, so a repeat buyer
+is known as soon as the process starts. Expired profiles keep being served
+while a refresh runs in the background.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable
+
+# Order statuses that end an order, see ``get_orders``.
+STATUS_APPEAL = 30
+STATUS_CANCELLED = 40
+STATUS_COMPLETED = 50
+
+# Finished orders remembered per counterparty to ignore repeated reports.
+HISTORY_ORDERS = 256
+
+
+@dataclass(frozen=True, slots=True)
+class Profile:
+    """The parts of a ``get_counterparty_info`` result used for risk scoring."""
+
+    uid: str
+    fetched_at: float
+    recent_rate: int
+    total_finish_count: int
+    recent_finish_count: int
+    account_create_days: int
+    good_appraise_count: int
+    bad_appraise_count: int
+    kyc_level: int
+    blocked: bool
+
+    @classmethod
+    def from_result(cls, uid: str, result: dict, *, fetched_at: float) -> "Profile":
+        return cls(
+            uid=uid,
+            fetched_at=fetched_at,
+            recent_rate=int(result.get("recentRate") or 0),
+            total_finish_count=int(result.get("totalFinishCount") or 0),
+            recent_finish_count=int(result.get("recentFinishCount") or 0),
+            account_create_days=int(result.get("accountCreateDays") or 0),
+            good_appraise_count=int(result.get("goodAppraiseCount") or 0),
+            bad_appraise_count=int(result.get("badAppraiseCount") or 0),
+            kyc_level=int(result.get("kycLevel") or 0),
+            blocked=result.get("blocked") == "Y",
+        )
+
+    def base_risk(self) -> float:
+        """Risk in ``[0, 1]`` from the platform-wide statistics alone."""
+        if self.blocked:
+            return 1.0
+        appraisals = self.good_appraise_count + self.bad_appraise_count
+        risk = (
+            0.30 * (100 - min(self.recent_rate, 100)) / 100
+            + 0.25 * max(0.0, 1 - self.account_create_days / 90)
+            + 0.20 * max(0.0, 1 - self.total_finish_count / 50)
+            + 0.15 * (self.bad_appraise_count / appraisals if appraisals else 0.5)
+            + 0.10 * (self.kyc_level < 2)
+        )
+        return min(risk, 1.0)
+
+
+@dataclass(slots=True)
+class History:
+    """Outcomes of our own orders with one counterparty."""
+
+    completed: int = 0
+    cancelled: int = 0
+    appealed: int = 0
+    orders: dict[str, None] = field(default_factory=dict)
+
+
+class CounterpartyStore:
+    """TTL cache of counterparty profiles plus our own order history with each of them.
+
+    ``fetch(original_uid, order_id)`` returns the ``result`` of
+    ``get_counterparty_info``; it runs on ``executor`` and never on the caller's
+    thread. At most ``maxsize`` profiles and histories are kept, least recently
+    used first out.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str, str], dict],
+        *,
+        path: str | Path | None = None,
+        ttl: float = 6 * 3600,
+        maxsize: int = 50_000,
+        executor: Executor | None = None,
+    ) -> None:
+        self._fetch = fetch
+        self.path = Path(path) if path else None
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._executor = executor or ThreadPoolExecutor(2, thread_name_prefix="p2p-counterparty")
+        self._owns_executor = executor is None
+        self._profiles: OrderedDict[str, Profile] = OrderedDict()
+        self._base_risk: dict[str, float] = {}
+        self._history: OrderedDict[str, History] = OrderedDict()
+        self._inflight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        if self.path is not None and self.path.exists():
+            self.load()
+
+    @classmethod
+    def for_account(cls, manager, account: str, **kwargs) -> "CounterpartyStore":
+        """Build a store fetching through ``manager`` as ``account``."""
+
+        def fetch(uid: str, order_id: str) -> dict:
+            response = manager.call(
+                account, "get_counterparty_info", originalUid=uid, orderId=order_id
+            )
+            return response["result"]
+
+        return cls(fetch, **kwargs)
+
+    def _put(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles[profile.uid] = profile
+            self._profiles.move_to_end(profile.uid)
+            self._base_risk[profile.uid] = profile.base_risk()
+            while len(self._profiles) > self.maxsize:
+                uid, _ = self._profiles.popitem(last=False)
+                self._base_risk.pop(uid, None)
+
+    def _refresh(self, uid: str, order_id: str) -> Profile:
+        try:
+            profile = Profile.from_result(uid, self._fetch(uid, order_id), fetched_at=time.time())
+            self._put(profile)
+            return profile
+        finally:
+            with self._lock:
+                self._inflight.pop(uid, None)
+
+    def refresh(self, uid: str, order_id: str) -> Future:
+        """Fetch ``uid`` in the background unless a fetch is already running."""
+        with self._lock:
+            future = self._inflight.get(uid)
+            if future is None:
+                future = self._inflight[uid] = self._executor.submit(self._refresh, uid, order_id)
+        return future
+
+    def get(self, uid: str, order_id: str | None = None) -> Profile | None:
+        """Return the cached profile, scheduling a refresh when it is missing or expired."""
+        profile = self._profiles.get(uid)
+        expired = profile is None or time.time() - profile.fetched_at > self.ttl
+        if expired and order_id is not None:
+            self.refresh(uid, order_id)
+        return profile
+
+    def prefetch(self, orders: Iterable[dict]) -> list[Future]:
+        """Start fetching counterparties of ``orders`` that are not cached or have expired."""
+        futures = []
+        now = time.time()
+        for order in orders:
+            uid = str(order.get("targetUserId") or "")
+            profile = self._profiles.get(uid)
+            if uid and (profile is None or now - profile.fetched_at > self.ttl):
+                futures.append(self.refresh(uid, str(order["id"])))
+        return futures
+
+    def record_order(self, order: dict) -> None:
+        """Count a finished order of ours towards its counterparty's history."""
+        uid = str(order.get("targetUserId") or "")
+        status = int(order.get("status", 0))
+        if not uid or status not in (STATUS_APPEAL, STATUS_CANCELLED, STATUS_COMPLETED):
+            return
+        with self._lock:
+            history = self._history.setdefault(uid, History())
+            self._history.move_to_end(uid)
+            while len(self._history) > self.maxsize:
+                self._history.popitem(last=False)
+            key = f"{order['id']}:{status}"
+            if key in history.orders:
+                return
+            history.orders[key] = None
+            if len(history.orders) > HISTORY_ORDERS:
+                del history.orders[next(iter(history.orders))]
+            if status == STATUS_COMPLETED:
+                history.completed += 1
+            elif status == STATUS_CANCELLED:
+                history.cancelled += 1
+            else:
+                history.appealed += 1
+
+    def score(self, uid: str) -> float | None:
+        """Risk in ``[0, 1]`` from cached data only; ``None`` for an unknown counterparty.
+
+        Completed trades with us lower the platform-based risk, appeals and
+        cancellations raise it.
+        """
+        base = self._base_risk.get(uid)
+        history = self._history.get(uid)
+        if base is None and history is None:
+            return None
+        risk = 0.5 if base is None else base
+        if history is not None:
+            risk *= 0.8 ** min(history.completed, 10)
+            risk += 0.3 * history.appealed + 0.05 * history.cancelled
+        return min(risk, 1.0)
+
+    def assess(self, order: dict) -> float | None:
+        """Score an order's counterparty without waiting; refreshes happen in the background."""
+        uid = str(order.get("targetUserId") or "")
+        self.get(uid, str(order["id"]))
+        return self.score(uid)
+
+    def save(self) -> None:
+        """Write profiles and history to ``path`` atomically."""
+        if self.path is None:
+            return
+        with self._lock:
+            data = {
+                "profiles": [asdict(profile) for profile in self._profiles.values()],
+                "history": {
+                    uid: asdict(history) | {"orders": list(history.orders)}
+                    for uid, history in self._history.items()
+                },
+            }
+        temporary = self.path.with_suffix(self.path.suffix + ".tmp")
+        temporary.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(temporary, self.path)
+
+    def load(self) -> None:
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        for fields in data.get("profiles", []):
+            self._put(Profile(**fields))
+        with self._lock:
+            for uid, fields in data.get("history", {}).items():
+                self._history[uid] = History(**fields | {"orders": dict.fromkeys(fields["orders"])})
+
+    def close(self) -> None:
+        """Persist the store and stop its own worker threads."""
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+        self.save()
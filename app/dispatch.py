@@ -0,0 +1,227 @@
+"""Priority dispatch of API calls under each account's rate limit.
+
+Calls are sorted into three classes. Critical calls complete trades,
+interactive calls serve an order being worked on, and background calls are
+scans and backfills that can wait. Queued calls are ordered by weighted fair
+queueing across classes; on top of that, background calls may never take the
+last ``reserve_tokens`` of an account's bucket nor more than
+``background_slots`` workers, so a critical call arriving in the middle of a
+full market scan finds both a token and a free worker. Each class is queued
+per account, so one throttled account never holds up the others' calls.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from app.accounts import AccountManager
+
+CRITICAL = 0
+INTERACTIVE = 1
+BACKGROUND = 2
+
+CLASS_NAMES = {CRITICAL: "critical", INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+PRIORITIES = {
+    "release_assets": CRITICAL,
+    "mark_as_paid": CRITICAL,
+    "send_chat_message": CRITICAL,
+    "get_order_details": INTERACTIVE,
+    "get_chat_messages": INTERACTIVE,
+    "get_pending_orders": INTERACTIVE,
+    "get_counterparty_info": INTERACTIVE,
+    "upload_chat_file": INTERACTIVE,
+    "get_online_ads": BACKGROUND,
+    "get_orders": BACKGROUND,
+}
+
+DEFAULT_WEIGHTS = {CRITICAL: 16.0, INTERACTIVE: 4.0, BACKGROUND: 1.0}
+
+
+def priority_of(method: str) -> int:
+    """Class of ``method``; methods not listed in ``PRIORITIES`` are interactive."""
+    return PRIORITIES.get(method, INTERACTIVE)
+
+
+@dataclass(slots=True)
+class _Job:
+    account: str
+    method: str
+    params: dict[str, Any]
+    priority: int
+    finish: float
+    future: Future = field(default_factory=Future)
+    queued_at: float = field(default_factory=time.monotonic)
+
+
+class Dispatcher:
+    """Run ``manager``'s calls on ``workers`` threads, most urgent first.
+
+    Offers the same ``call``/``submit`` interface as :class:`AccountManager`,
+    so it can be passed wherever a manager is expected; the class of a call
+    comes from :data:`PRIORITIES` unless ``priority`` is given. Calls already
+    in flight are never interrupted: background work is preempted by being
+    held back in the queue, not cancelled.
+    """
+
+    def __init__(
+        self,
+        manager: "AccountManager",
+        *,
+        workers: int = 8,
+        weights: dict[int, float] | None = None,
+        background_slots: int | None = None,
+        reserve_tokens: float = 1.0,
+        latency_samples: int = 1024,
+    ) -> None:
+        self.manager = manager
+        self.accounts = manager.accounts
+        self.workers = workers
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        if background_slots is None:
+            background_slots = max(1, workers // 2)
+        self.background_slots = background_slots
+        self.reserve_tokens = reserve_tokens
+        self.latencies = {priority: deque(maxlen=latency_samples) for priority in CLASS_NAMES}
+        # Queued jobs per class, then per account; empty account queues are dropped.
+        self._queues: dict[int, dict[str, deque[_Job]]] = {priority: {} for priority in CLASS_NAMES}
+        self._last_finish = dict.fromkeys(CLASS_NAMES, 0.0)
+        self._vtime = 0.0
+        self._running = 0
+        self._background_running = 0
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="p2p-dispatch")
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="p2p-dispatcher", daemon=True)
+        self._thread.start()
+
+    def submit(
+        self, account: str, method: str, /, *, priority: int | None = None, **params
+    ) -> Future:
+        """Queue a call and return its future."""
+        if account not in self.accounts:
+            raise KeyError(account)
+        priority = priority_of(method) if priority is None else priority
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("dispatcher is closed")
+            start = max(self._vtime, self._last_finish[priority])
+            finish = self._last_finish[priority] = start + 1 / self.weights[priority]
+            job = _Job(account, method, params, priority, finish)
+            self._queues[priority].setdefault(account, deque()).append(job)
+            self._condition.notify_all()
+        return job.future
+
+    def call(self, account: str, method: str, /, *, priority: int | None = None, **params) -> dict:
+        """Queue a call and wait for its response."""
+        return self.submit(account, method, priority=priority, **params).result()
+
+    def pending(self) -> dict[str, int]:
+        """Number of queued calls per class."""
+        with self._condition:
+            return {
+                CLASS_NAMES[p]: sum(map(len, queues.values())) for p, queues in self._queues.items()
+            }
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Queue-plus-call latency percentiles per class, in milliseconds."""
+        with self._condition:  # workers append under the same lock
+            snapshot = {priority: list(samples) for priority, samples in self.latencies.items()}
+        stats = {}
+        for priority, samples in snapshot.items():
+            ordered = sorted(samples)
+            if ordered:
+                stats[CLASS_NAMES[priority]] = {
+                    "count": len(ordered),
+                    "p50_ms": ordered[len(ordered) // 2] * 1e3,
+                    "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1e3,
+                }
+        return stats
+
+    def _pick(self) -> tuple[_Job | None, float | None]:
+        """Pop the next runnable job, or return how long to wait before trying again."""
+        if self._running >= self.workers:
+            return None, None
+        heads = sorted(
+            (queue[0] for queues in self._queues.values() for queue in queues.values()),
+            key=lambda job: job.finish,
+        )
+        wait = None
+        for job in heads:
+            background = job.priority == BACKGROUND
+            if background and self._background_running >= self.background_slots:
+                continue
+            limiter = self.accounts[job.account].limiter
+            delay = limiter.try_acquire(keep=self.reserve_tokens if background else 0)
+            if not delay:
+                queues = self._queues[job.priority]
+                queues[job.account].popleft()
+                if not queues[job.account]:
+                    del queues[job.account]
+                self._vtime = max(self._vtime, job.finish - 1 / self.weights[job.priority])
+                return job, None
+            wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    if self._stopped:
+                        return
+                    job, wait = self._pick()
+                    if job is not None:
+                        break
+                    self._condition.wait(wait)
+                self._running += 1
+                self._background_running += job.priority == BACKGROUND
+            self._executor.submit(self._execute, job)
+
+    def _execute(self, job: _Job) -> None:
+        try:
+            if job.future.set_running_or_notify_cancel():
+                api = self.accounts[job.account].api
+                try:
+                    result = getattr(api, job.method)(**job.params)
+                except BaseException as exc:
+                    self._record_latency(job)
+                    job.future.set_exception(exc)
+                else:
+                    self._record_latency(job)
+                    job.future.set_result(result)
+        finally:
+            with self._condition:
+                self._running -= 1
+                self._background_running -= job.priority == BACKGROUND
+                self._condition.notify_all()
+
+    def _record_latency(self, job: _Job) -> None:
+        latency = time.monotonic() - job.queued_at
+        with self._condition:
+            self.latencies[job.priority].append(latency)
+
+    def close(self, *, cancel: bool = True) -> None:
+        """Stop dispatching; queued calls are cancelled unless ``cancel`` is false."""
+        with self._condition:
+            if not cancel:
+                while any(self._queues.values()):
+                    self._condition.wait(0.05)
+            self._stopped = True
+            for queues in self._queues.values():
+                for queue in queues.values():
+                    while queue:
+                        queue.popleft().future.cancel()
+                queues.clear()
+            self._condition.notify_all()
+        self._thread.join(timeout=5)
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "Dispatcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
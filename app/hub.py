@@ -0,0 +1,262 @@
+"""One poller per resource, fanned out to any number of asyncio subscribers.
+
+The order watcher, chat sync and repricer all want the same few listings.
+:class:`PollerHub` polls each :class:`Resource` (pending orders, the online
+ads of a market, the chat of an order) once, however many consumers
+subscribed to it, and puts every changed response on each subscriber's
+queue. Polls are paced by :class:`app.polling.PollController`: pending orders
+by their most urgent status and deadline, and a chat is polled again at once
+when the pending listing shows its unread counters moving. A resource is
+forgotten, and no longer requested, when its last subscription closes.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from app.polling import PollController, chat_hints, pending_pace
+from app.scanner import Market
+
+logger = logging.getLogger(__name__)
+
+PENDING_ORDERS = "get_pending_orders"
+CHAT_MESSAGES = "get_chat_messages"
+
+
+@dataclass(frozen=True, slots=True)
+class Resource:
+    """One API call to poll; equal resources share one poller."""
+
+    method: str
+    params: tuple[tuple[str, Any], ...] = ()
+
+    @classmethod
+    def of(cls, method: str, /, **params) -> "Resource":
+        return cls(method, tuple(sorted(params.items())))
+
+    def __str__(self) -> str:
+        return f"{self.method}({', '.join(f'{k}={v}' for k, v in self.params)})"
+
+
+def pending_orders(*, size: int = 30) -> Resource:
+    return Resource.of(PENDING_ORDERS, page=1, size=size)
+
+
+def online_ads(market: Market, *, size: int = 50) -> Resource:
+    return Resource.of("get_online_ads", **market.params(1, size))
+
+
+def chat(order_id: str, *, size: int = 100) -> Resource:
+    return Resource.of(CHAT_MESSAGES, orderId=str(order_id), size=str(size))
+
+
+@dataclass(frozen=True, slots=True)
+class Update:
+    """A response of ``resource`` that differs from the one published before it."""
+
+    resource: Resource
+    response: dict = field(repr=False)
+    polled_at: float  # epoch seconds
+
+
+class Subscription:
+    """Updates of one resource; iterate it, or ``await get()``, and ``close()`` when done."""
+
+    def __init__(self, hub: "PollerHub", resource: Resource, queue: asyncio.Queue) -> None:
+        self.hub = hub
+        self.resource = resource
+        self.queue = queue
+        self._closed = False
+
+    async def get(self) -> Update:
+        return await self.queue.get()
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> Update:
+        return await self.queue.get()
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self.hub._unsubscribe(self.resource, self.queue)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+Fetch = Callable[[str, dict], Awaitable[dict]]
+
+
+class PollerHub:
+    """Poll each subscribed resource once and publish changes to its subscribers.
+
+    ``fetch(method, params)`` is a coroutine returning the response.
+    Subscribing the same queue to a resource twice delivers each update to it
+    once. A subscriber that falls ``queue_size`` updates behind loses the
+    oldest ones: every update is a full response, so the latest is enough.
+    New subscribers get the latest response at once. Use from one event loop.
+    """
+
+    def __init__(
+        self,
+        fetch: Fetch,
+        *,
+        controller: PollController | None = None,
+        queue_size: int = 16,
+    ) -> None:
+        self._fetch = fetch
+        if controller is None:
+            controller = PollController(max_interval=10.0)
+        self.controller = controller
+        self.queue_size = queue_size
+        self.polls = 0
+        self._subscribers: dict[Resource, dict[asyncio.Queue, int]] = {}
+        self._latest: dict[Resource, Update] = {}
+        self._chats: dict[str, set[Resource]] = {}  # order id to its chat resources
+        self._orders: dict[str, dict] = {}  # last pending orders by id
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._inflight: set[asyncio.Task] = set()
+
+    @classmethod
+    def for_account(cls, manager, account: str, **kwargs) -> "PollerHub":
+        """A hub fetching through ``manager`` (an :class:`AccountManager`) as ``account``."""
+
+        def fetch(method: str, params: dict) -> Awaitable[dict]:
+            return asyncio.wrap_future(manager.submit(account, method, **params))
+
+        return cls(fetch, **kwargs)
+
+    def __contains__(self, resource: Resource) -> bool:
+        return resource in self._subscribers
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribers(self, resource: Resource) -> int:
+        return len(self._subscribers.get(resource, ()))
+
+    def subscribe(self, resource: Resource, queue: asyncio.Queue | None = None) -> Subscription:
+        """Start receiving updates of ``resource``, on ``queue`` or a new one."""
+        if queue is None:
+            queue = asyncio.Queue(self.queue_size)
+        queues = self._subscribers.get(resource)
+        if queues is None:
+            queues = self._subscribers[resource] = {}
+            self.controller.track(resource)
+            if resource.method == CHAT_MESSAGES:
+                self._chats.setdefault(dict(resource.params)["orderId"], set()).add(resource)
+            self._ensure_running()
+        if queue not in queues and resource in self._latest:
+            self._put(queue, self._latest[resource])
+        queues[queue] = queues.get(queue, 0) + 1
+        return Subscription(self, resource, queue)
+
+    def poke(self, resource: Resource) -> None:
+        """Poll ``resource`` at the minimum interval again, e.g. after acting on it."""
+        self.controller.poke(resource)
+        self._wake.set()
+
+    def _unsubscribe(self, resource: Resource, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(resource)
+        if queues is None or queue not in queues:
+            return
+        queues[queue] -= 1
+        if queues[queue]:
+            return
+        del queues[queue]
+        if queues:
+            return
+        del self._subscribers[resource]
+        self._latest.pop(resource, None)
+        self.controller.forget(resource)
+        if resource.method == CHAT_MESSAGES:
+            order_id = dict(resource.params)["orderId"]
+            chats = self._chats.get(order_id, set())
+            chats.discard(resource)
+            if not chats:
+                self._chats.pop(order_id, None)
+        logger.debug("Stopped polling %s", resource)
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        self._wake.set()
+
+    async def _run(self) -> None:
+        while True:
+            for resource in self.controller.due():
+                if resource in self._subscribers:
+                    task = asyncio.create_task(self._poll(resource))
+                    self._inflight.add(task)
+                    task.add_done_callback(self._inflight.discard)
+            self._wake.clear()
+            delay = self.controller.next_delay()
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except TimeoutError:
+                pass
+
+    async def _poll(self, resource: Resource) -> None:
+        self.polls += 1
+        try:
+            response = await self._fetch(resource.method, dict(resource.params))
+        except Exception:
+            logger.warning("Polling %s failed", resource, exc_info=True)
+            response = None
+        if resource not in self._subscribers:
+            return  # unsubscribed while in flight
+        changed = False
+        try:
+            latest = self._latest.get(resource)
+            changed = response is not None and (
+                latest is None or response.get("result") != latest.response.get("result")
+            )
+            if changed:
+                update = self._latest[resource] = Update(resource, response, time.time())
+                for queue in self._subscribers[resource]:
+                    self._put(queue, update)
+                if resource.method == PENDING_ORDERS:
+                    self._pending_changed(resource, response)
+        except Exception:
+            logger.warning("Publishing %s failed", resource, exc_info=True)
+        finally:
+            # ``due()`` marked the resource in flight; only this schedules its next poll.
+            self.controller.observe(resource, changed=changed)
+            self._wake.set()
+
+    def _pending_changed(self, resource: Resource, response: dict) -> None:
+        current = {str(item["id"]): item for item in response["result"].get("items") or []}
+        status, deadline = pending_pace(current.values())
+        self.controller.track(resource, status=status, deadline=deadline)
+        for order_id in chat_hints(self._orders, current):
+            for chat_resource in self._chats.get(order_id, ()):
+                self.controller.poke(chat_resource)
+        self._orders = current
+
+    def _put(self, queue: asyncio.Queue, update: Update) -> None:
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(update)
+
+    async def aclose(self) -> None:
+        """Stop polling everything; open subscriptions receive nothing more."""
+        tasks = list(self._inflight)
+        if self._task is not None:
+            tasks.append(self._task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        for resource in list(self._subscribers):
+            self.controller.forget(resource)
+        self._subscribers.clear()
+        self._latest.clear()
+        self._chats.clear()
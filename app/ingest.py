@@ -0,0 +1,201 @@
+"""Parallel decoding of bulk order history and recorded ad pages.
+
+Raw response bodies (or NDJSON blocks) are grouped into chunks and decoded in
+worker processes, so JSON parsing and column building use every core instead
+of one; results are yielded in input order. Fetching stays in the calling
+process and overlaps with decoding.
+"""
+
+import json
+import math
+import os
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Mapping, TypeVar
+
+import numpy as np
+
+from app.analytics import AdBook
+
+if TYPE_CHECKING:
+    from app.client.compiler import CompiledP2P
+    from app.client.ratelimit import TokenBucket
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True, slots=True)
+class OrderBatch:
+    """Columnar view of orders from ``get_orders``; row ``i`` of every array is the same order."""
+
+    order_id: np.ndarray  # int64
+    side: np.ndarray  # int8
+    status: np.ndarray  # int16
+    price: np.ndarray  # float64
+    amount: np.ndarray  # float64, fiat
+    quantity: np.ndarray  # float64, token (``notifyTokenQuantity``)
+    fee: np.ndarray  # float64
+    create_date: np.ndarray  # int64, epoch milliseconds
+    target_user_id: np.ndarray  # int64
+    token_id: np.ndarray  # object
+    currency_id: np.ndarray  # object
+
+    def __len__(self) -> int:
+        return len(self.order_id)
+
+    @classmethod
+    def from_items(cls, items: Iterable[Mapping]) -> "OrderBatch":
+        items = list(items)
+        return cls(
+            order_id=_column(items, "id", np.int64),
+            side=_column(items, "side", np.int8),
+            status=_column(items, "status", np.int16),
+            price=_column(items, "price", np.float64),
+            amount=_column(items, "amount", np.float64),
+            quantity=_column(items, "notifyTokenQuantity", np.float64),
+            fee=_column(items, "fee", np.float64),
+            create_date=_column(items, "createDate", np.int64),
+            target_user_id=_column(items, "targetUserId", np.int64),
+            token_id=np.array([it["tokenId"] for it in items], dtype=object),
+            currency_id=np.array([it["currencyId"] for it in items], dtype=object),
+        )
+
+    @classmethod
+    def concat(cls, batches: Iterable["OrderBatch"]) -> "OrderBatch":
+        """Join batches in the given order."""
+        batches = list(batches) or [cls.from_items([])]
+        return cls(
+            **{
+                f.name: np.concatenate([getattr(batch, f.name) for batch in batches])
+                for f in fields(cls)
+            }
+        )
+
+
+def _column(items: list, key: str, dtype: type) -> np.ndarray:
+    return np.array([it[key] for it in items], dtype=dtype)
+
+
+def _result(body: bytes) -> dict:
+    """Decode one response body, raising on an API error code."""
+    data = json.loads(body)
+    code = data.get("ret_code", data.get("retCode", 0))
+    if code:
+        raise RuntimeError(f"{data.get('ret_msg', data.get('retMsg'))} (ErrCode: {code})")
+    return data["result"]
+
+
+def decode_order_pages(bodies: list[bytes]) -> OrderBatch:
+    """Decode raw ``get_orders`` response bodies into one batch."""
+    return OrderBatch.from_items(item for body in bodies for item in _result(body)["items"])
+
+
+def decode_order_lines(block: bytes) -> OrderBatch:
+    """Decode a block of NDJSON orders, e.g. ``python -m app.cli backfill`` output."""
+    return OrderBatch.from_items(json.loads(line) for line in block.splitlines() if line.strip())
+
+
+def decode_ad_pages(bodies: list[bytes]) -> AdBook:
+    """Decode raw ``get_online_ads`` response bodies into one book."""
+    return AdBook.from_items(item for body in bodies for item in _result(body)["items"])
+
+
+def chunked(iterable: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Yield lists of up to ``size`` consecutive items."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def read_blocks(path: str | Path, *, block_size: int = 1 << 22) -> Iterator[bytes]:
+    """Yield blocks of about ``block_size`` bytes of a line-oriented file, split at newlines."""
+    with open(path, "rb") as file:
+        while block := file.read(block_size):
+            if not block.endswith(b"\n"):
+                block += file.readline()
+            yield block
+
+
+def ingest(
+    chunks: Iterable[Any],
+    decode: Callable[[Any], T],
+    *,
+    workers: int | None = None,
+    max_pending: int | None = None,
+    executor: Executor | None = None,
+) -> Iterator[T]:
+    """Yield ``decode(chunk)`` for every chunk, in order, computed in a process pool.
+
+    ``decode`` must be a module-level function so it can be pickled. At most
+    ``max_pending`` chunks (default twice the worker count) are in flight, which
+    bounds memory when ``chunks`` is a lazy stream. ``workers=1`` decodes in
+    this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 and executor is None:
+        yield from map(decode, chunks)
+        return
+    own = executor is None
+    if own:
+        executor = ProcessPoolExecutor(workers)
+    limit = max_pending or 2 * workers
+    pending = deque()
+    try:
+        for chunk in chunks:
+            pending.append(executor.submit(decode, chunk))
+            if len(pending) >= limit:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        if own:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def order_pages(
+    api: "CompiledP2P",
+    *,
+    size: int = 50,
+    limiter: "TokenBucket | None" = None,
+    reserve: float = 1.0,
+    **params,
+) -> Iterator[bytes]:
+    """Yield the raw body of every ``get_orders`` page; only the first one is decoded here.
+
+    With ``limiter``, every page waits for a token and leaves ``reserve``
+    tokens to other callers, like background calls of :mod:`app.dispatch`.
+    """
+
+    def fetch(page: int) -> bytes:
+        if limiter is not None:
+            limiter.acquire(keep=reserve)
+        return api.request_raw("get_orders", page=page, size=size, **params)
+
+    first = fetch(1)
+    count = int(_result(first)["count"])
+    yield first
+    for page in range(2, math.ceil(count / size) + 1):
+        yield fetch(page)
+
+
+def backfill_orders(
+    api: "CompiledP2P",
+    *,
+    size: int = 50,
+    chunk_pages: int = 8,
+    workers: int | None = None,
+    limiter: "TokenBucket | None" = None,
+    **params,
+) -> OrderBatch:
+    """Fetch the whole ``get_orders`` history matching ``params`` as one batch.
+
+    Pass the account's ``limiter`` (``manager[account].limiter``) when the
+    live bot uses the same account, so the backfill stays within its budget.
+    """
+    pages = order_pages(api, size=size, limiter=limiter, **params)
+    return OrderBatch.concat(
+        ingest(chunked(pages, chunk_pages), decode_order_pages, workers=workers)
+    )
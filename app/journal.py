@@ -0,0 +1,395 @@
+"""Write-ahead journal that makes money-moving calls happen exactly once.
+
+Before a mutating call such as ``release_assets`` is sent, its intent is
+appended to the journal and forced to disk; its outcome is appended once the
+response arrives. After a crash, only the calls whose intent has no outcome
+are in doubt, and :meth:`Journal.reconcile` settles each of them with one
+read (the order's status) instead of re-checking every order. Calls are
+keyed, by default per method and order, and a key that already succeeded
+returns its recorded response without calling the API again.
+
+Intents from many threads are written and fsynced together by one committer
+thread (group commit), so concurrent callers share an fsync; outcomes are
+not waited for, because a lost outcome only leaves its call in doubt.
+
+A journal is an 8 byte magic followed by records, each a ``<II`` header
+(payload length, CRC-32 of the payload) and a compact JSON payload. A
+record cut short or corrupted by a crash ends the journal and is dropped on
+reopen.
+"""
+
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator, Mapping
+
+from app.counterparty import STATUS_CANCELLED, STATUS_COMPLETED
+from app.polling import STATUS_WAIT_PAY
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"P2PJRN\x01\n"
+_RECORD = struct.Struct("<II")
+
+# Outcomes of a journaled call.
+APPLIED = "applied"  # the call took effect; its response, if known, is kept
+FAILED = "failed"  # the API refused it; the key may be tried again
+NOT_APPLIED = "not_applied"  # found not to have happened on reconcile
+
+
+def default_key(method: str, params: Mapping) -> str:
+    """One key per method and order, or per method and exact params for other calls."""
+    if "orderId" in params:
+        return f"{method}:{params['orderId']}"
+    return f"{method}:{json.dumps(params, sort_keys=True, default=str)}"
+
+
+def _order_status(manager, account: str, order_id: str) -> int:
+    response = manager.call(account, "get_order_details", orderId=order_id)
+    return int(response["result"]["status"])
+
+
+def _released(manager, account: str, params: Mapping) -> bool | None:
+    status = _order_status(manager, account, params["orderId"])
+    return True if status == STATUS_COMPLETED else None if status == STATUS_CANCELLED else False
+
+
+def _paid(manager, account: str, params: Mapping) -> bool | None:
+    status = _order_status(manager, account, params["orderId"])
+    return False if status == STATUS_WAIT_PAY else None if status == STATUS_CANCELLED else True
+
+
+# Per method, ``check(manager, account, params)`` tells whether an in-doubt
+# call took effect: ``True``, ``False``, or ``None`` when it no longer matters.
+RECONCILERS: dict[str, Callable[..., bool | None]] = {
+    "release_assets": _released,
+    "mark_as_paid": _paid,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class Entry:
+    """A journaled call whose outcome is not known yet."""
+
+    seq: int
+    key: str
+    method: str
+    account: str
+    params: dict
+    created: float  # epoch seconds
+
+
+# ``retCode``s with which the API refuses a request before acting on it. Server
+# errors such as 10000 (timeout) and 10016 (internal error) are not listed: a
+# call answered with them may still have taken effect, so it stays in flight.
+REJECTED_CODES = frozenset(
+    {
+        10001,  # invalid parameters
+        10002,  # timestamp outside the receive window
+        10003,  # invalid API key
+        10004,  # invalid signature
+        10005,  # permission denied
+        10006,  # rate limited
+        10010,  # IP not allowed for the API key
+        10017,  # unknown path
+        10018,  # IP rate limited
+    }
+)
+
+
+def _definitely_failed(exc: Exception) -> bool:
+    """Whether the API answered ``exc`` and so certainly did not apply the call."""
+    code = getattr(exc, "status_code", None)
+    if not isinstance(code, int):
+        return False
+    return 400 <= code < 500 or code in REJECTED_CODES  # HTTP client errors and refusals
+
+
+def _check_params(method: str, params: Mapping) -> None:
+    """Raise ``ValueError`` for a call the client would refuse before sending it.
+
+    Checked before the intent is written, so a mistake in the call leaves
+    nothing in flight.
+    """
+    from bybit_p2p._p2p_helper import P2PMethods
+
+    spec = getattr(P2PMethods, method.upper(), None)
+    if spec is None:
+        raise ValueError(f"Unknown method: {method}")
+    missing = [name for name in spec.required_params if name not in params]
+    if missing:
+        raise ValueError(f"Missing required parameters: {', '.join(missing)}")
+
+
+def _records(data: bytes) -> Iterator[tuple[dict, int]]:
+    """Yield ``(record, end offset)`` for every intact record in ``data``."""
+    if data[: len(MAGIC)] != MAGIC:
+        raise ValueError("not a journal")
+    offset = len(MAGIC)
+    while offset + _RECORD.size <= len(data):
+        size, crc = _RECORD.unpack_from(data, offset)
+        start = offset + _RECORD.size
+        payload = data[start : start + size]
+        if len(payload) < size or zlib.crc32(payload) != crc:
+            break  # torn or corrupted write at the tail
+        offset = start + size
+        yield json.loads(payload), offset
+
+
+def _frame(record: dict) -> bytes:
+    payload = json.dumps(record, separators=(",", ":"), default=str).encode()
+    return _RECORD.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+class Journal:
+    """Append-only journal of mutating calls with group-committed intents.
+
+    Use :meth:`call` in place of ``manager.call`` for the methods that move
+    money. ``max_completed`` bounds how many succeeded keys are remembered;
+    older ones are dropped when the journal is reopened. With ``fsync``
+    false, records are only flushed to the OS, which is enough for tests.
+    """
+
+    def __init__(
+        self, path: str | Path, *, max_completed: int = 100_000, fsync: bool = True
+    ) -> None:
+        self.path = Path(path)
+        self.max_completed = max_completed
+        self.fsync = fsync
+        self.syncs = 0
+        self._completed: OrderedDict[str, dict | None] = OrderedDict()
+        self._in_flight: dict[int, Entry] = {}
+        self._keys: dict[str, int] = {}  # key of each in-flight entry to its seq
+        self._seq = 0
+        self._pending: list[bytes] = []
+        self._queued = 0  # records handed to the committer so far
+        self._synced = 0  # of those, records known to be on disk
+        self._error: BaseException | None = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._file: BinaryIO = self._open()
+        self._thread = threading.Thread(target=self._commit, name="p2p-journal", daemon=True)
+        self._thread.start()
+
+    # Recovery
+
+    def _open(self) -> BinaryIO:
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            handle = self.path.open("wb")
+            handle.write(MAGIC)
+            handle.flush()
+            return handle
+        data = self.path.read_bytes()
+        end, records = len(MAGIC), 0
+        for record, end in _records(data):
+            self._load(record)
+            records += 1
+        if end < len(data):
+            logger.warning("Dropping %d bytes of a torn journal record", len(data) - end)
+        if records > 2 * (len(self._completed) + len(self._in_flight)) + 1000:
+            return self._rewrite()
+        handle = self.path.open("r+b")
+        handle.truncate(end)
+        handle.seek(end)
+        return handle
+
+    def _load(self, record: dict) -> None:
+        seq = record["s"]
+        self._seq = max(self._seq, seq)
+        if "m" in record:
+            entry = Entry(seq, record["k"], record["m"], record["a"], record["p"], record["t"])
+            self._in_flight[seq] = entry
+            self._keys[entry.key] = seq
+            return
+        entry = self._in_flight.pop(seq, None)
+        key = record.get("k") or (entry.key if entry else None)
+        if key is None:
+            return
+        self._keys.pop(key, None)
+        if record["o"] == APPLIED:
+            self._remember(key, record.get("r"))
+
+    def _remember(self, key: str, response: dict | None) -> None:
+        self._completed[key] = response
+        self._completed.move_to_end(key)
+        while len(self._completed) > self.max_completed:
+            self._completed.popitem(last=False)
+
+    def _rewrite(self) -> BinaryIO:
+        """Replace the file with only what recovery needs: remembered keys and in-flight calls."""
+        temporary = self.path.with_suffix(self.path.suffix + ".tmp")
+        with temporary.open("wb") as handle:
+            handle.write(MAGIC)
+            for key, response in self._completed.items():
+                self._seq += 1
+                handle.write(_frame({"s": self._seq, "k": key, "o": APPLIED, "r": response}))
+            for entry in self._in_flight.values():
+                handle.write(_frame(self._intent(entry)))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temporary, self.path)
+        handle = self.path.open("r+b")
+        handle.seek(0, os.SEEK_END)
+        return handle
+
+    def in_flight(self) -> list[Entry]:
+        """Calls started but not known to have finished, oldest first."""
+        with self._condition:
+            return sorted(self._in_flight.values(), key=lambda entry: entry.seq)
+
+    def completed(self, key: str) -> bool:
+        with self._condition:
+            return key in self._completed
+
+    def reconcile(self, manager) -> dict[str, int]:
+        """Settle every in-flight entry by asking the API whether it took effect.
+
+        Entries of methods without a check in :data:`RECONCILERS` are marked
+        not applied, so they may be called again. Returns counts per outcome.
+        """
+        counts = {APPLIED: 0, NOT_APPLIED: 0}
+        for entry in self.in_flight():
+            check = RECONCILERS.get(entry.method)
+            applied = check(manager, entry.account, entry.params) if check else False
+            outcome = APPLIED if applied else NOT_APPLIED
+            self._finish(entry.seq, outcome, None)
+            counts[outcome] += 1
+            logger.info("Reconciled %s as %s", entry.key, outcome)
+        return counts
+
+    # Calls
+
+    @staticmethod
+    def _intent(entry: Entry) -> dict:
+        return {
+            "s": entry.seq,
+            "k": entry.key,
+            "m": entry.method,
+            "a": entry.account,
+            "p": entry.params,
+            "t": entry.created,
+        }
+
+    def begin(self, account: str, method: str, params: Mapping, *, key: str | None = None) -> int:
+        """Durably record the intent to call ``method``; return its sequence number.
+
+        Raises ``RuntimeError`` if the key already succeeded or is in flight.
+        """
+        key = key or default_key(method, params)
+        with self._condition:
+            if key in self._completed:
+                raise RuntimeError(f"{key} already applied")
+            if key in self._keys:
+                raise RuntimeError(f"{key} is in flight; reconcile it first")
+            self._seq += 1
+            entry = Entry(self._seq, key, method, account, dict(params), time.time())
+            ticket = self._enqueue(_frame(self._intent(entry)))
+            self._in_flight[entry.seq] = entry
+            self._keys[key] = entry.seq
+            self._condition.wait_for(lambda: self._synced >= ticket or self._error)
+            if self._synced < ticket:
+                del self._in_flight[entry.seq], self._keys[key]
+                raise RuntimeError("journal write failed") from self._error
+        return entry.seq
+
+    def _finish(self, seq: int, outcome: str, response: dict | None) -> None:
+        """Record the outcome of entry ``seq``; not waited for, and never raises.
+
+        If the journal can no longer be written, the outcome still holds in
+        memory and the call is in doubt again after a restart.
+        """
+        with self._condition:
+            entry = self._in_flight.pop(seq)
+            self._keys.pop(entry.key, None)
+            if outcome == APPLIED:
+                self._remember(entry.key, response)
+            record = {"s": seq, "o": outcome}
+            if response is not None:
+                record["r"] = response
+            try:
+                self._enqueue(_frame(record))
+            except RuntimeError as exc:
+                logger.error("Outcome %s of %s not journaled: %s", outcome, entry.key, exc)
+
+    def call(self, manager, account: str, method: str, /, *, key: str | None = None, **params):
+        """``manager.call(account, method, **params)`` at most once per ``key``.
+
+        A key that already succeeded returns the recorded response (``None``
+        if it was found applied by :meth:`reconcile`). If the
+        call fails in a way that leaves its effect unknown (a timeout or a
+        server error), the entry stays in flight and the key is blocked until
+        :meth:`reconcile`. Missing parameters raise ``ValueError`` before
+        anything is journaled.
+        """
+        key = key or default_key(method, params)
+        with self._condition:
+            if key in self._completed:
+                return self._completed[key]
+        _check_params(method, params)
+        seq = self.begin(account, method, params, key=key)
+        try:
+            response = manager.call(account, method, **params)
+        except Exception as exc:
+            if _definitely_failed(exc):
+                self._finish(seq, FAILED, None)
+            raise
+        self._finish(seq, APPLIED, response)
+        return response
+
+    # Group commit
+
+    def _enqueue(self, frame: bytes) -> int:
+        """Hand ``frame`` to the committer; hold ``_condition``. Returns its ticket."""
+        if self._closed:
+            raise RuntimeError("journal is closed")
+        if self._error is not None:
+            raise RuntimeError("journal write failed") from self._error
+        self._pending.append(frame)
+        self._queued += 1
+        self._condition.notify_all()
+        return self._queued
+
+    def _commit(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                frames, self._pending = self._pending, []
+                ticket = self._queued
+            try:
+                self._file.write(b"".join(frames))
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+            except BaseException as exc:
+                with self._condition:
+                    self._error = exc
+                    self._condition.notify_all()
+                logger.error("Journal write failed", exc_info=True)
+                return
+            with self._condition:
+                self._synced = ticket
+                self.syncs += 1
+                self._condition.notify_all()
+
+    def close(self) -> None:
+        """Write every queued record, then close the file."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self._file.close()
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
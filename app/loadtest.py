@@ -0,0 +1,472 @@
+"""End-to-end load scenario: many concurrent orders against a mock exchange.
+
+:class:`MockExchange` is a transport that plays the P2P endpoints in
+process: orders appear over a ramp, their buyers pay after a random delay and
+write in the chat, and an order is completed when we release it. The bot
+side is the real pipeline: :class:`AccountManager` behind a
+:class:`Dispatcher`, pending orders polled and paged, chats fetched when their
+unread counters move, greetings and thanks sent through :class:`ChatOutbox`,
+and paid orders checked and released, while market scans and repricing run
+continuously alongside. :func:`run` reports throughput, end-to-end release
+latency (from the buyer's payment to our release), requests per endpoint and
+the process's CPU time and peak memory.
+
+Usage::
+
+    python -m app.loadtest [--orders 500] [--latency 0.002] [--seed 0]
+"""
+
+import argparse
+import json
+import math
+import random
+import resource
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+from requests import PreparedRequest, Response
+
+from app.client.transport import EXAMPLES, make_response
+from app.counterparty import STATUS_COMPLETED
+from app.polling import STATUS_WAIT_PAY, STATUS_WAIT_RELEASE
+
+AD_ID = "1951393103796514816"  # our ad, from ``examples/ad_details``
+ERROR_ORDER_STATUS = 912100035  # any non-zero code is an API error to the client
+
+
+def _fixture(relative: str) -> dict:
+    return json.loads((EXAMPLES / relative).read_text(encoding="utf-8"))["response"]
+
+
+def _paths() -> dict[str, str]:
+    from bybit_p2p._p2p_helper import P2PMethods
+
+    return {
+        getattr(P2PMethods, name).url: name.lower()
+        for name in dir(P2PMethods)
+        if not name.startswith("_")
+    }
+
+
+@dataclass(slots=True)
+class _MockOrder:
+    id: str
+    created: float  # monotonic seconds
+    paid: float
+    status: int = STATUS_WAIT_PAY
+    unread: int = 0
+    released: float | None = None
+    messages: list[dict] = field(default_factory=list)
+
+
+class MockExchange:
+    """The P2P endpoints the pipeline uses, simulated in memory with ``latency`` per call.
+
+    ``n_orders`` orders are created evenly over ``ramp`` seconds from
+    :meth:`start`, each paid ``pay_delay`` seconds (uniform range) after
+    creation. ``calls`` counts requests per client method and
+    ``release_latencies`` holds payment-to-release times in seconds.
+    """
+
+    def __init__(
+        self,
+        n_orders: int = 500,
+        *,
+        ramp: float = 2.0,
+        pay_delay: tuple[float, float] = (0.2, 1.0),
+        latency: float = 0.002,
+        book_size: int = 100,
+        seed: int = 0,
+    ) -> None:
+        self.n_orders = n_orders
+        self.ramp = ramp
+        self.pay_delay = pay_delay
+        self.latency = latency
+        self.book_size = book_size
+        self.calls: Counter[str] = Counter()
+        self.errors: Counter[str] = Counter()
+        self.release_latencies: list[float] = []
+        self._rng = random.Random(seed)
+        self._paths = _paths()
+        self._order = _fixture("orders/SELL/UAH/all_orders.json")["result"]["items"][0]
+        self._details = _fixture("order_details/BUY/UAH/1955655162847768576.json")["result"]
+        self._ad = _fixture(f"ad_details/SELL/UAH/{AD_ID}.json")["result"]
+        self._ads = _fixture("competitor_ads/SELL/UAH/response.json")["result"]["items"]
+        self._orders: dict[str, _MockOrder] = {}
+        self._lock = threading.Lock()
+        self._started = 0.0
+
+    def start(self) -> None:
+        """Schedule every order from now."""
+        self._started = now = time.monotonic()
+        step = self.ramp / max(1, self.n_orders)
+        with self._lock:
+            for index in range(self.n_orders):
+                created = now + index * step
+                paid = created + self._rng.uniform(*self.pay_delay)
+                order_id = str(2 * 10**18 + index)
+                self._orders[order_id] = _MockOrder(order_id, created, paid)
+
+    @property
+    def released(self) -> int:
+        return len(self.release_latencies)
+
+    def done(self) -> bool:
+        return self.released >= self.n_orders
+
+    # Transport
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        url = urlsplit(request.url)
+        method = self._paths.get(url.path)
+        if request.method == "POST":
+            params = json.loads(request.body or b"{}")
+        else:
+            params = dict(parse_qsl(url.query))
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls[method] += 1
+            handler = getattr(self, f"_{method}", None)
+            result = handler(params, time.monotonic()) if handler else {}
+        if isinstance(result, tuple):  # (code, message)
+            self.errors[method] += 1
+            body = {"ret_code": result[0], "ret_msg": result[1], "result": {}}
+        else:
+            body = {"ret_code": 0, "ret_msg": "SUCCESS", "result": result}
+        return make_response(request, 200, json.dumps(body).encode())
+
+    async def send_async(self, request: PreparedRequest) -> Response:
+        return self.send(request)
+
+    def close(self) -> None:
+        pass
+
+    # Endpoints; called with ``_lock`` held
+
+    def _advance(self, order: _MockOrder, now: float) -> None:
+        if order.status == STATUS_WAIT_PAY and now >= order.paid:
+            order.status = STATUS_WAIT_RELEASE
+            order.unread += 1
+            order.messages.append(self._message(order, "paid, please release", "user"))
+
+    def _message(self, order: _MockOrder, text: str, role: str) -> dict:
+        return {
+            "id": str(len(order.messages) + 1),
+            "orderId": order.id,
+            "message": text,
+            "contentType": "str",
+            "roleType": role,
+            "createDate": str(int(time.time() * 1e3)),
+        }
+
+    def _item(self, order: _MockOrder) -> dict:
+        return self._order | {
+            "id": order.id,
+            "status": order.status,
+            "unreadMsgCount": str(order.unread),
+            "createDate": str(int((time.time() - time.monotonic() + order.created) * 1e3)),
+        }
+
+    def _get_pending_orders(self, params: dict, now: float) -> dict:
+        pending = []
+        for order in self._orders.values():
+            if order.created <= now and order.status != STATUS_COMPLETED:
+                self._advance(order, now)
+                pending.append(order)
+        page, size = int(params["page"]), int(params["size"])
+        items = [self._item(order) for order in pending[(page - 1) * size : page * size]]
+        return {"count": len(pending), "items": items}
+
+    def _get_order_details(self, params: dict, now: float):
+        order = self._orders.get(str(params["orderId"]))
+        if order is None:
+            return (ERROR_ORDER_STATUS, "order not found")
+        self._advance(order, now)
+        return self._details | self._item(order) | {"itemId": AD_ID}
+
+    def _get_chat_messages(self, params: dict, now: float):
+        order = self._orders.get(str(params["orderId"]))
+        if order is None:
+            return (ERROR_ORDER_STATUS, "order not found")
+        self._advance(order, now)
+        order.unread = 0
+        return {"result": order.messages[::-1][: int(params["size"])]}
+
+    def _send_chat_message(self, params: dict, now: float):
+        order = self._orders.get(str(params["orderId"]))
+        if order is None:
+            return (ERROR_ORDER_STATUS, "order not found")
+        order.messages.append(self._message(order, params["message"], "self"))
+        return {"msgUuid": params.get("msgUuid", "")}
+
+    def _release_assets(self, params: dict, now: float):
+        order = self._orders.get(str(params["orderId"]))
+        if order is None:
+            return (ERROR_ORDER_STATUS, "order not found")
+        self._advance(order, now)
+        if order.status != STATUS_WAIT_RELEASE:
+            return (ERROR_ORDER_STATUS, f"order status is {order.status}")
+        order.status = STATUS_COMPLETED
+        order.released = now
+        self.release_latencies.append(now - order.paid)
+        return {}
+
+    def _get_online_ads(self, params: dict, now: float) -> dict:
+        page, size = int(params["page"]), int(params["size"])
+        start, stop = (page - 1) * size, min(page * size, self.book_size)
+        items = [
+            self._ads[index % len(self._ads)] | {"id": str(3 * 10**18 + index)}
+            for index in range(start, stop)
+        ]
+        return {"count": self.book_size, "items": items}
+
+    def _get_ad_details(self, params: dict, now: float) -> dict:
+        return self._ad
+
+    def _update_ad(self, params: dict, now: float) -> dict:
+        self._ad = self._ad | {"price": params["price"]}
+        return {"securityRiskToken": "", "needSecurityRisk": False}
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return math.nan
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class _Bot:
+    """The order pipeline under test, built from the production modules."""
+
+    def __init__(self, exchange: MockExchange, *, workers: int, poll_interval: float) -> None:
+        from app.accounts import AccountManager
+        from app.chat import ChatOutbox, ChatScanner
+        from app.dispatch import Dispatcher
+
+        account = {
+            "api_key": "load",
+            "api_secret": "load",
+            "testnet": False,
+            "recv_window": 5000,
+            "rate_limit": 100_000.0,
+        }
+        self.exchange = exchange
+        self.poll_interval = poll_interval
+        self.manager = AccountManager({"load": account}, max_workers=workers, transport=exchange)
+        self.dispatcher = Dispatcher(self.manager, workers=workers)
+        self.outbox = ChatOutbox(self.manager, "load", workers=workers, backoff=0.05)
+        self.scanner = ChatScanner()
+        self.failures: Counter[str] = Counter()
+        self._orders: dict[str, dict] = {}
+        self._handling: set[str] = set()
+        self._releases = ThreadPoolExecutor(workers, thread_name_prefix="p2p-load-release")
+        self._stopped = threading.Event()
+
+    def _call(self, method: str, /, **params) -> dict:
+        return self.dispatcher.call("load", method, **params)
+
+    def poll_orders(self) -> None:
+        """One poll of the pending listing, acting on every change since the last one."""
+        from app.polling import chat_hints
+
+        size = 50
+        first = self._call("get_pending_orders", page=1, size=size)["result"]
+        items = list(first["items"])
+        futures = [
+            self.dispatcher.submit("load", "get_pending_orders", page=page, size=size)
+            for page in range(2, math.ceil(int(first["count"]) / size) + 1)
+        ]
+        for future in futures:
+            items += future.result()["result"]["items"]
+        current = {item["id"]: item for item in items}
+        for order_id in chat_hints(self._orders, current) & self._orders.keys():
+            future = self.dispatcher.submit("load", "get_chat_messages", orderId=order_id, size=50)
+            future.add_done_callback(lambda f, order_id=order_id: self._scan_chat(order_id, f))
+        for order_id, order in current.items():
+            if order_id not in self._orders:
+                self.outbox.send_template(order_id, "greeting")
+            status = int(order["status"])
+            if status == STATUS_WAIT_RELEASE and order_id not in self._handling:
+                self._handling.add(order_id)
+                self._releases.submit(self._release, order_id)
+        self._orders = current
+
+    def _scan_chat(self, order_id: str, future) -> None:
+        if future.exception() is not None:
+            self.failures["get_chat_messages"] += 1
+            return
+        self.scanner.scan(order_id, future.result()["result"]["result"])
+
+    def _release(self, order_id: str) -> None:
+        try:
+            details = self._call("get_order_details", orderId=order_id)["result"]
+            if int(details["status"]) == STATUS_WAIT_RELEASE:
+                self._call("release_assets", orderId=order_id)
+                self.outbox.send_template(order_id, "thanks")
+                self.scanner.forget(order_id)
+        except Exception:
+            self.failures["release"] += 1
+            self._handling.discard(order_id)  # retried on the next poll
+
+    def watch_orders(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self.poll_orders()
+            except Exception:
+                self.failures["get_pending_orders"] += 1
+            self._stopped.wait(self.poll_interval)
+
+    def scan_markets(self, markets, interval: float) -> None:
+        from app.scanner import scan_pages
+
+        while not self._stopped.is_set():
+            try:
+                scan_pages(self.dispatcher, "load", markets, size=50, max_pages=2)
+            except Exception:
+                self.failures["scan"] += 1
+            self._stopped.wait(interval)
+
+    def reprice(self, interval: float) -> None:
+        from app import analytics
+        from app.analytics import AdBook
+        from app.scanner import Market, scan_markets
+
+        while not self._stopped.is_set():
+            try:
+                ad = self._call("get_ad_details", itemId=AD_ID)["result"]
+                market = Market(ad["tokenId"], ad["currencyId"], int(ad["side"]))
+                items = scan_markets(self.dispatcher, "load", [market], size=50, max_pages=1)
+                target = analytics.target_price(
+                    AdBook.from_items(items[market]),
+                    market.side,
+                    exclude_user_id=int(ad["userId"]),
+                )
+                if not math.isnan(target):
+                    self._call(
+                        "update_ad",
+                        id=ad["id"],
+                        priceType=ad["priceType"],
+                        premium=ad["premium"],
+                        price=f"{target:.2f}",
+                        minAmount=ad["minAmount"],
+                        maxAmount=ad["maxAmount"],
+                        remark=ad["remark"],
+                        tradingPreferenceSet=ad["tradingPreferenceSet"],
+                        paymentIds=[term["id"] for term in ad["paymentTerms"]],
+                        actionType="MODIFY",
+                        quantity=ad["lastQuantity"],
+                        paymentPeriod=ad["paymentPeriod"],
+                    )
+            except Exception:
+                self.failures["reprice"] += 1
+            self._stopped.wait(interval)
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def close(self) -> None:
+        self._releases.shutdown(wait=True)
+        self.outbox.close()
+        self.dispatcher.close()
+        self.manager.close()
+
+
+def run(
+    n_orders: int = 500,
+    *,
+    ramp: float = 2.0,
+    pay_delay: tuple[float, float] = (0.2, 1.0),
+    latency: float = 0.002,
+    workers: int = 16,
+    poll_interval: float = 0.1,
+    scan_interval: float = 0.5,
+    reprice_interval: float = 0.5,
+    timeout: float = 120.0,
+    seed: int = 0,
+) -> dict:
+    """Run the scenario until every order is released or ``timeout`` passes; return the report."""
+    from app.scanner import Market
+
+    exchange = MockExchange(n_orders, ramp=ramp, pay_delay=pay_delay, latency=latency, seed=seed)
+    bot = _Bot(exchange, workers=workers, poll_interval=poll_interval)
+    markets = [Market("USDT", currency, side) for currency in ("UAH", "PLN") for side in (0, 1)]
+    threads = [
+        threading.Thread(target=bot.watch_orders, name="p2p-load-orders"),
+        threading.Thread(
+            target=bot.scan_markets, args=(markets, scan_interval), name="p2p-load-scan"
+        ),
+        threading.Thread(target=bot.reprice, args=(reprice_interval,), name="p2p-load-reprice"),
+    ]
+    cpu, start = time.process_time(), time.perf_counter()
+    exchange.start()
+    for thread in threads:
+        thread.start()
+    deadline = start + timeout
+    while not exchange.done() and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    bot.stop()
+    for thread in threads:
+        thread.join()
+    bot.close()
+    cpu = time.process_time() - cpu
+    latencies = exchange.release_latencies
+    requests = sum(exchange.calls.values())
+    return {
+        "orders": n_orders,
+        "released": exchange.released,
+        "seconds": round(elapsed, 2),
+        "orders_per_s": round(exchange.released / elapsed, 1),
+        "requests": requests,
+        "requests_per_s": round(requests / elapsed, 1),
+        "release_p50_ms": round(_percentile(latencies, 0.5) * 1e3, 1),
+        "release_p99_ms": round(_percentile(latencies, 0.99) * 1e3, 1),
+        "calls": dict(sorted(exchange.calls.items())),
+        "api_errors": dict(exchange.errors),
+        "failures": dict(bot.failures),
+        "chat_sent": bot.outbox.sent,
+        "dispatch": {
+            name: {key: round(value, 1) for key, value in stats.items()}
+            for name, stats in bot.dispatcher.stats().items()
+        },
+        "cpu_s": round(cpu, 2),
+        "cpu_percent": round(100 * cpu / elapsed, 1),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="app.loadtest", description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--ramp", type=float, default=2.0, help="seconds over which orders open")
+    parser.add_argument("--latency", type=float, default=0.002, help="mock seconds per request")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", metavar="PATH", help="also write the report to PATH")
+    args = parser.parse_args(argv)
+    report = run(
+        args.orders,
+        ramp=args.ramp,
+        latency=args.latency,
+        workers=args.workers,
+        poll_interval=args.poll_interval,
+        timeout=args.timeout,
+        seed=args.seed,
+    )
+    print(json.dumps(report, indent=2))
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0 if report["released"] == report["orders"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
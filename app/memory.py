@@ -0,0 +1,186 @@
+"""Memory guards for long-running bots: order lifetimes and allocation metrics.
+
+Finished orders are only weakly referenced, so they go away as soon as the
+last consumer drops them, and :class:`MemoryMonitor` takes periodic
+``tracemalloc`` snapshots and reports where traced memory has grown since the
+baseline.
+"""
+
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import deque
+from typing import Iterable
+
+from app.counterparty import STATUS_CANCELLED, STATUS_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = frozenset({STATUS_CANCELLED, STATUS_COMPLETED})
+
+
+class Order:
+    """One of our orders, wrapping the latest dict seen for it."""
+
+    __slots__ = ("id", "status", "data", "__weakref__")
+
+    def __init__(self, data: dict) -> None:
+        self.id = str(data["id"])
+        self.status = int(data.get("status", 0))
+        self.data = data
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def __repr__(self) -> str:
+        return f"Order({self.id}, status={self.status})"
+
+
+class OrderRegistry:
+    """Orders by id: active ones held strongly, finished ones only weakly.
+
+    A finished order stays reachable through :meth:`get` while something
+    else (a chat task, a pending release) still holds it and disappears once
+    it does not.
+    """
+
+    def __init__(self) -> None:
+        self._active: dict[str, Order] = {}
+        self._finished: weakref.WeakValueDictionary[str, Order] = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def update(self, data: dict) -> Order:
+        """Record the latest ``data`` of an order and return its object."""
+        order_id = str(data["id"])
+        with self._lock:
+            order = self._active.get(order_id) or self._finished.get(order_id)
+            if order is None:
+                order = Order(data)
+            else:
+                order.status = int(data.get("status", order.status))
+                order.data = data
+            if order.finished:
+                self._active.pop(order_id, None)
+                self._finished[order_id] = order
+            else:
+                self._active[order_id] = order
+        return order
+
+    def update_many(self, items: Iterable[dict]) -> list[Order]:
+        return [self.update(item) for item in items]
+
+    def get(self, order_id: str) -> Order | None:
+        with self._lock:
+            return self._active.get(order_id) or self._finished.get(order_id)
+
+    def active(self) -> list[Order]:
+        with self._lock:
+            return list(self._active.values())
+
+    def __len__(self) -> int:
+        return len(self._active) + len(self._finished)
+
+
+def rss_bytes() -> int | None:
+    """Resident set size of this process, where the platform exposes it."""
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+class MemoryMonitor:
+    """Periodic ``tracemalloc`` snapshots exposed as plain-dict metrics.
+
+    The first snapshot is the baseline; every later one reports traced and
+    resident memory plus the ``top`` source lines whose allocations grew the
+    most since the baseline. Only the last ``keep`` reports are retained.
+    Tracing costs CPU, so start the monitor only where the metrics are wanted.
+    """
+
+    def __init__(
+        self, *, interval: float = 300.0, top: int = 10, frames: int = 1, keep: int = 48
+    ) -> None:
+        self.interval = interval
+        self.top = top
+        self.frames = frames
+        self.reports: deque[dict] = deque(maxlen=keep)
+        self._baseline: tracemalloc.Snapshot | None = None
+        self._started_tracing = False
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        snapshot = tracemalloc.take_snapshot()
+        return snapshot.filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+        )
+
+    def begin(self) -> None:
+        """Start tracing if needed and take the baseline snapshot."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        self._baseline = self._snapshot()
+
+    def report(self) -> dict:
+        """Take a snapshot now and return its metrics."""
+        if self._baseline is None:
+            self.begin()
+        current, peak = tracemalloc.get_traced_memory()
+        growth = self._snapshot().compare_to(self._baseline, "lineno")
+        report = {
+            "time": time.time(),
+            "traced_bytes": current,
+            "traced_peak_bytes": peak,
+            "rss_bytes": rss_bytes(),
+            "growth_bytes": sum(stat.size_diff for stat in growth),
+            "top_growth": [
+                {
+                    "where": str(stat.traceback),
+                    "size_diff": stat.size_diff,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in growth[: self.top]
+                if stat.size_diff > 0
+            ],
+        }
+        self.reports.append(report)
+        return report
+
+    def start(self) -> "MemoryMonitor":
+        """Take the baseline and report every ``interval`` seconds in a daemon thread."""
+        self.begin()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="p2p-memory", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self._baseline = None
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                report = self.report()
+            except Exception:
+                logger.warning("Memory snapshot failed", exc_info=True)
+                continue
+            logger.info(
+                "Traced memory %d bytes (%+d since baseline), rss %s",
+                report["traced_bytes"],
+                report["growth_bytes"],
+                report["rss_bytes"],
+            )
@@ -0,0 +1,224 @@
+"""Shared payment-type and symbol metadata.
+
+Every online ad repeats a full ``symbolInfo`` and names its payment methods
+by payment-type id (``payments: ["46"]``); ``get_user_payment_types`` lists
+our own payment methods with their types. :class:`MetadataRegistry` keeps one
+immutable object per payment type and per symbol, indexed by id, so ads and
+orders can point at them instead of carrying their own copies.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, Iterable, Mapping
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class PaymentType:
+    """A payment type such as a bank; ``id`` is the ``paymentType`` used in ad ``payments``."""
+
+    id: str
+    name: str = ""
+    online: bool = False
+
+
+@dataclass(frozen=True, slots=True)
+class PaymentMethod:
+    """One of our own payment methods; ``id`` is what ``paymentIds`` of an ad refer to."""
+
+    id: str
+    type: PaymentType
+    bank_name: str
+    visible: bool
+
+
+@dataclass(frozen=True, slots=True)
+class Symbol:
+    """Trading limits of a token/fiat pair, from an ad's ``symbolInfo``."""
+
+    id: str
+    token_id: str
+    currency_id: str
+    token_scale: int
+    currency_scale: int
+    token_min_quote: float
+    token_max_quote: float
+    currency_min_quote: float
+    currency_max_quote: float
+    item_down_range: float  # lowest allowed price, percent of the reference price
+    item_up_range: float
+    order_auto_cancel_minute: int
+    order_finish_minute: int
+
+    @classmethod
+    def from_info(cls, info: Mapping) -> "Symbol":
+        return cls(
+            id=str(info["id"]),
+            token_id=info["tokenId"],
+            currency_id=info["currencyId"],
+            token_scale=int(info["token"]["scale"]),
+            currency_scale=int(info["currency"]["scale"]),
+            token_min_quote=float(info["tokenMinQuote"]),
+            token_max_quote=float(info["tokenMaxQuote"]),
+            currency_min_quote=float(info["currencyMinQuote"]),
+            currency_max_quote=float(info["currencyMaxQuote"]),
+            item_down_range=float(info["itemDownRange"]),
+            item_up_range=float(info["itemUpRange"]),
+            order_auto_cancel_minute=int(info["orderAutoCancelMinute"]),
+            order_finish_minute=int(info["orderFinishMinute"]),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Ad:
+    """An online ad whose metadata fields are shared registry objects."""
+
+    id: str
+    user_id: str
+    nick_name: str
+    side: int
+    price: float
+    last_quantity: float
+    min_amount: float
+    max_amount: float
+    payment_period: int
+    remark: str
+    payments: tuple[PaymentType, ...]
+    symbol: Symbol
+
+
+class MetadataRegistry:
+    """Payment types, our payment methods and symbols, each indexed by id.
+
+    ``fetch_payment_types()`` returns the ``result`` list of
+    ``get_user_payment_types``. Refreshes build new indexes and swap them in,
+    so lookups never lock and objects handed out earlier stay valid. Symbols
+    are learned from the ``symbolInfo`` of ads as they are seen.
+    """
+
+    def __init__(
+        self,
+        fetch_payment_types: Callable[[], list[dict]] | None = None,
+        *,
+        interval: float = 3600.0,
+    ) -> None:
+        self._fetch = fetch_payment_types
+        self.interval = interval
+        self.payment_types: dict[str, PaymentType] = {}
+        self.methods: dict[str, PaymentMethod] = {}
+        self.symbols: dict[str, Symbol] = {}
+        self._symbol_keys: dict[tuple[str, str], Symbol] = {}
+        self._symbol_info: dict[str, Mapping] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @classmethod
+    def for_account(cls, manager, account: str, **kwargs) -> "MetadataRegistry":
+        """Build a registry loading our payment types through ``manager`` as ``account``."""
+
+        def fetch() -> list[dict]:
+            return manager.call(account, "get_user_payment_types")["result"]
+
+        return cls(fetch, **kwargs)
+
+    def load_payment_types(self, methods: Iterable[Mapping]) -> None:
+        """Index a ``get_user_payment_types`` result."""
+        types = dict(self.payment_types)
+        own = {}
+        for method in methods:
+            config = method.get("paymentConfigVo") or {}
+            type_id = str(method["paymentType"])
+            payment_type = PaymentType(
+                type_id, config.get("paymentName", ""), str(config.get("online", "0")) == "1"
+            )
+            if types.get(type_id) != payment_type:
+                types[type_id] = payment_type
+            own[str(method["id"])] = PaymentMethod(
+                str(method["id"]),
+                types[type_id],
+                method.get("bankName", ""),
+                bool(method.get("visible", 0)),
+            )
+        with self._lock:
+            self.payment_types, self.methods = types, own
+
+    def refresh(self) -> None:
+        if self._fetch is not None:
+            self.load_payment_types(self._fetch())
+
+    def payment_type(self, type_id: str | int) -> PaymentType:
+        """The shared object for ``type_id``; unknown ids get a nameless entry."""
+        type_id = str(type_id)
+        payment_type = self.payment_types.get(type_id)
+        if payment_type is None:
+            with self._lock:
+                payment_type = self.payment_types.setdefault(type_id, PaymentType(type_id))
+        return payment_type
+
+    def symbol(self, info: Mapping) -> Symbol:
+        """The shared object for a ``symbolInfo``, replaced only when its content changes."""
+        symbol_id = str(info["id"])
+        if self._symbol_info.get(symbol_id) == info:
+            return self.symbols[symbol_id]
+        symbol = Symbol.from_info(info)
+        with self._lock:
+            current = self.symbols.get(symbol_id)
+            if current == symbol:
+                symbol = current
+            else:
+                self.symbols[symbol_id] = symbol
+                self._symbol_keys[symbol.token_id, symbol.currency_id] = symbol
+            self._symbol_info[symbol_id] = info
+        return symbol
+
+    def symbol_for(self, token_id: str, currency_id: str) -> Symbol | None:
+        return self._symbol_keys.get((token_id, currency_id))
+
+    def ad(self, item: Mapping) -> Ad:
+        """Build an :class:`Ad` from an online ad item."""
+        return Ad(
+            id=item["id"],
+            user_id=item["userId"],
+            nick_name=item["nickName"],
+            side=int(item["side"]),
+            price=float(item["price"]),
+            last_quantity=float(item["lastQuantity"]),
+            min_amount=float(item["minAmount"]),
+            max_amount=float(item["maxAmount"]),
+            payment_period=int(item["paymentPeriod"]),
+            remark=item.get("remark", ""),
+            payments=tuple(self.payment_type(type_id) for type_id in item["payments"]),
+            symbol=self.symbol(item["symbolInfo"]),
+        )
+
+    def ads(self, items: Iterable[Mapping]) -> list[Ad]:
+        return [self.ad(item) for item in items]
+
+    def order_payment_type(self, order: Mapping) -> PaymentType | None:
+        """Payment type chosen in a ``get_order_details`` result, if any."""
+        type_id = order.get("paymentType")
+        return None if type_id in (None, "", 0) else self.payment_type(type_id)
+
+    def start(self) -> "MetadataRegistry":
+        """Load now and refresh every ``interval`` seconds in a daemon thread."""
+        self.refresh()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="p2p-metadata", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.warning("Payment type refresh failed", exc_info=True)
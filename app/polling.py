@@ -0,0 +1,209 @@
+"""Adaptive poll intervals for pending orders and their chats.
+
+Each polled resource, such as ``"get_pending_orders"`` or
+``("get_chat_messages", order_id)``, has its own interval. It drops to the
+minimum when a poll sees a change and grows geometrically while nothing
+happens, up to a ceiling set by the order's status and by the time left
+until its payment deadline.
+
+One ``get_pending_orders`` page carries the status and unread-message
+counters of every pending order, so the cheapest way to watch many orders is
+to pace that single listing by its most urgent order (:func:`pending_pace`)
+and fetch a chat only when its counters move (:func:`chat_hints`).
+"""
+
+import heapq
+import time
+from dataclasses import dataclass
+from typing import Callable, Hashable, Iterable, Mapping
+
+from app.counterparty import STATUS_APPEAL, STATUS_CANCELLED, STATUS_COMPLETED
+
+STATUS_WAIT_PAY = 10
+STATUS_WAIT_RELEASE = 20
+
+# Longest interval per order status, in seconds. A paid order waits on us to
+# release, so it is watched closely; an appeal moves slowly.
+STATUS_CEILINGS = {
+    STATUS_WAIT_RELEASE: 1.0,
+    STATUS_WAIT_PAY: 1.5,
+    STATUS_APPEAL: 30.0,
+}
+
+# ``_State.due`` of a key handed out by ``due()`` until its ``observe()``.
+_POLLING = float("inf")
+
+
+def payment_deadline(
+    order: Mapping, *, payment_period: float | None = None, now: float | None = None
+) -> float | None:
+    """Epoch seconds by which a waiting-for-payment order must be paid, if known.
+
+    Uses ``transferLastSeconds`` from ``get_orders``/``get_order_details`` and
+    falls back to ``createDate`` plus the ad's ``paymentPeriod`` (minutes).
+    """
+    if int(order.get("status", 0)) != STATUS_WAIT_PAY:
+        return None
+    left = int(order.get("transferLastSeconds") or 0)
+    if left > 0:
+        return (time.time() if now is None else now) + left
+    if payment_period and order.get("createDate"):
+        return int(order["createDate"]) / 1e3 + float(payment_period) * 60
+    return None
+
+
+def pending_pace(
+    orders: Iterable[Mapping], *, payment_period: float | None = None, now: float | None = None
+) -> tuple[int | None, float | None]:
+    """Most urgent status and earliest payment deadline among pending ``orders``.
+
+    Pass the result to :meth:`PollController.track` for the
+    ``get_pending_orders`` key.
+    """
+    status, ceiling, deadline = None, float("inf"), None
+    for order in orders:
+        order_status = int(order.get("status", 0))
+        if STATUS_CEILINGS.get(order_status, ceiling) < ceiling:
+            status, ceiling = order_status, STATUS_CEILINGS[order_status]
+        order_deadline = payment_deadline(order, payment_period=payment_period, now=now)
+        if order_deadline is not None and (deadline is None or order_deadline < deadline):
+            deadline = order_deadline
+    return status, deadline
+
+
+def _unread(order: Mapping) -> tuple[str, str]:
+    return str(order.get("unreadMsgCount", "0")), str(order.get("selfUnreadMsgCount", "0"))
+
+
+def chat_hints(previous: Mapping[str, Mapping], current: Mapping[str, Mapping]) -> set[str]:
+    """Ids of orders, keyed by id in both listings, whose unread-message counters changed."""
+    return {
+        order_id
+        for order_id, order in current.items()
+        if order_id not in previous or _unread(order) != _unread(previous[order_id])
+    }
+
+
+@dataclass(slots=True)
+class _State:
+    interval: float
+    due: float
+    status: int | None = None
+    deadline: float | None = None  # epoch seconds
+
+
+class PollController:
+    """Decide when each resource should be polled next.
+
+    After a poll, report it with :meth:`observe`; :meth:`due` returns the
+    keys to poll now and :meth:`next_delay` how long to sleep until the next
+    one. ``clock`` returns monotonic seconds and ``wall`` epoch seconds; both
+    are injectable for simulations.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_interval: float = 0.5,
+        max_interval: float = 60.0,
+        backoff: float = 1.5,
+        deadline_fraction: float = 0.1,
+        clock: Callable[[], float] = time.monotonic,
+        wall: Callable[[], float] = time.time,
+    ) -> None:
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.deadline_fraction = deadline_fraction
+        self._clock = clock
+        self._wall = wall
+        self._states: dict[Hashable, _State] = {}
+        self._heap: list[tuple[float, int, Hashable]] = []
+        self._counter = 0
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._states
+
+    def ceiling(self, key: Hashable) -> float:
+        """Longest interval ``key`` may currently back off to."""
+        state = self._states[key]
+        ceiling = STATUS_CEILINGS.get(state.status, self.max_interval)
+        if state.deadline is not None:
+            left = state.deadline - self._wall()
+            ceiling = min(ceiling, left * self.deadline_fraction)
+        return max(self.min_interval, min(ceiling, self.max_interval))
+
+    def _schedule(self, key: Hashable, state: _State) -> None:
+        state.due = self._clock() + state.interval
+        self._counter += 1
+        heapq.heappush(self._heap, (state.due, self._counter, key))
+
+    def track(
+        self, key: Hashable, *, status: int | None = None, deadline: float | None = None
+    ) -> None:
+        """Start polling ``key`` now, or update the status and deadline it is paced by."""
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _State(self.min_interval, 0.0, status, deadline)
+            state.due = self._clock()
+            self._counter += 1
+            heapq.heappush(self._heap, (state.due, self._counter, key))
+            return
+        state.status, state.deadline = status, deadline
+        ceiling = self.ceiling(key)
+        if state.interval > ceiling:
+            state.interval = ceiling
+            if self._clock() + ceiling < state.due < _POLLING:
+                self._schedule(key, state)
+
+    def poke(self, key: Hashable) -> None:
+        """Go back to the minimum interval, e.g. after activity elsewhere on the same order."""
+        state = self._states.get(key)
+        if state is None or state.interval == self.min_interval:
+            return
+        state.interval = self.min_interval
+        if self._clock() + state.interval < state.due < _POLLING:
+            self._schedule(key, state)
+
+    def forget(self, key: Hashable) -> None:
+        """Stop polling ``key``, e.g. once its order is finished."""
+        self._states.pop(key, None)
+
+    def observe(self, key: Hashable, *, changed: bool) -> float:
+        """Record a poll of ``key`` and schedule the next one; return the new interval."""
+        state = self._states[key]
+        if state.status in (STATUS_CANCELLED, STATUS_COMPLETED):
+            self.forget(key)
+            return 0.0
+        if changed:
+            interval = self.min_interval
+        else:
+            interval = state.interval * self.backoff
+        state.interval = min(interval, self.ceiling(key))
+        self._schedule(key, state)
+        return state.interval
+
+    def due(self) -> list[Hashable]:
+        """Keys whose next poll is due, most overdue first."""
+        now = self._clock()
+        keys = []
+        while self._heap and self._heap[0][0] <= now:
+            due, _, key = heapq.heappop(self._heap)
+            state = self._states.get(key)
+            if state is not None and state.due == due:  # skip stale heap entries
+                keys.append(key)
+                state.due = _POLLING
+        return keys
+
+    def next_delay(self) -> float | None:
+        """Seconds until the next poll is due; ``None`` when nothing is tracked."""
+        while self._heap:
+            due, _, key = self._heap[0]
+            state = self._states.get(key)
+            if state is not None and state.due == due:
+                return max(0.0, due - self._clock())
+            heapq.heappop(self._heap)
+        return None
@@ -0,0 +1,236 @@
+"""On-demand profiling of a running bot.
+
+:func:`install` registers signal handlers: ``SIGUSR1`` captures a statistical
+sample of every thread's stack for ``duration`` seconds and ``SIGUSR2`` a
+cProfile of the main thread. Captures are written to ``out_dir``; send the
+signals with ``python -m app.profiling <pid> [--cprofile]``. Sampled stacks
+are written in the folded format read by ``flamegraph.pl`` and speedscope,
+each rooted at the thread's current pipeline stage and API method as set by
+:func:`annotate`.
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+
+logger = logging.getLogger(__name__)
+
+# Current (method, stage) per thread id, read by the sampler thread.
+_context: dict[int, tuple[str | None, str | None]] = {}
+
+_NONE = (None, None)
+
+
+class annotate:
+    """Mark the current thread as working in ``stage`` and/or calling API ``method``.
+
+    Used as a context manager; nests, and costs about a dictionary write.
+    """
+
+    __slots__ = ("_method", "_stage", "_ident", "_previous")
+
+    def __init__(self, *, method: str | None = None, stage: str | None = None) -> None:
+        self._method = method
+        self._stage = stage
+
+    def __enter__(self) -> "annotate":
+        self._ident = ident = threading.get_ident()
+        self._previous = previous = _context.get(ident, _NONE)
+        _context[ident] = (self._method or previous[0], self._stage or previous[1])
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._previous is _NONE:
+            _context.pop(self._ident, None)
+        else:
+            _context[self._ident] = self._previous
+
+
+def current(ident: int | None = None) -> tuple[str | None, str | None]:
+    """``(method, stage)`` of thread ``ident`` (default: this thread)."""
+    return _context.get(threading.get_ident() if ident is None else ident, _NONE)
+
+
+def _label(frame: FrameType) -> str:
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{frame.f_code.co_qualname}"
+
+
+def fold(frame: FrameType | None, *, thread: str, ident: int) -> str:
+    """One folded stack, root first: thread, stage, method, then the frames."""
+    frames = []
+    while frame is not None:
+        frames.append(_label(frame))
+        frame = frame.f_back
+    method, stage = _context.get(ident, _NONE)
+    roots = [f"thread:{thread}", f"stage:{stage or '-'}", f"method:{method or '-'}"]
+    return ";".join(roots + frames[::-1])
+
+
+class Sampler:
+    """Sample the stacks of all other threads every ``interval`` seconds."""
+
+    def __init__(self, *, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def sample(self) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        me = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident != me:
+                self.stacks[fold(frame, thread=names.get(ident, str(ident)), ident=ident)] += 1
+        self.samples += 1
+
+    def start(self) -> "Sampler":
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="p2p-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def folded(self) -> str:
+        """The samples in the folded format, heaviest stack first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def contexts(self) -> dict[str, int]:
+        """Sample counts per ``stage/method``."""
+        totals: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            _, stage, method = stack.split(";", 3)[:3]
+            totals[f"{stage[6:]}/{method[7:]}"] += count
+        return dict(totals.most_common())
+
+
+def _stem(out_dir: Path, mode: str) -> Path:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    return out_dir / f"p2p-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}-{mode}"
+
+
+def _write_summary(stem: Path, sampler: Sampler, **fields) -> None:
+    summary = {"pid": os.getpid(), "samples": sampler.samples, **fields}
+    summary["contexts"] = sampler.contexts()
+    stem.with_suffix(".json").write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+
+def sample(duration: float, *, out_dir: str | Path, interval: float = 0.005) -> Path:
+    """Sample every thread for ``duration`` seconds; return the ``.folded`` file written."""
+    stem = _stem(Path(out_dir), "sample")
+    sampler = Sampler(interval=interval).start()
+    time.sleep(duration)
+    sampler.stop()
+    path = stem.with_suffix(".folded")
+    path.write_text(sampler.folded(), encoding="utf-8")
+    _write_summary(stem, sampler, mode="sample", duration=duration, interval=interval)
+    return path
+
+
+class _CProfileCapture:
+    """cProfile of the thread that starts it, stopped after ``duration`` by ``SIGALRM``."""
+
+    def __init__(self, duration: float, out_dir: Path) -> None:
+        import cProfile
+
+        self.duration = duration
+        self.stem = _stem(out_dir, "cprofile")
+        self.profiler = cProfile.Profile()
+        self.sampler = Sampler(interval=0.05)  # only to annotate the capture
+
+    def start(self) -> None:
+        signal.signal(signal.SIGALRM, lambda signum, frame: self.stop())
+        self.sampler.start()
+        self.profiler.enable()
+        signal.setitimer(signal.ITIMER_REAL, self.duration)
+
+    def stop(self) -> Path:
+        import pstats
+
+        self.profiler.disable()
+        self.sampler.stop()
+        path = self.stem.with_suffix(".prof")
+        try:
+            self.profiler.dump_stats(path)
+            with open(self.stem.with_suffix(".txt"), "w", encoding="utf-8") as file:
+                stats = pstats.Stats(self.profiler, stream=file)
+                stats.sort_stats("cumulative").print_stats(50)
+            _write_summary(self.stem, self.sampler, mode="cprofile", duration=self.duration)
+            logger.info("Wrote profile %s", path)
+        finally:
+            _busy.release()
+        return path
+
+
+# Held while a signalled capture runs; signals arriving meanwhile are ignored.
+_busy = threading.Lock()
+
+
+def _sample_in_background(duration: float, out_dir: Path, interval: float) -> None:
+    try:
+        path = sample(duration, out_dir=out_dir, interval=interval)
+        logger.info("Wrote profile %s", path)
+    except Exception:
+        logger.warning("Live profile failed", exc_info=True)
+    finally:
+        _busy.release()
+
+
+def install(out_dir: str | Path, *, duration: float = 10.0, interval: float = 0.005) -> None:
+    """Capture a profile into ``out_dir`` on ``SIGUSR1`` (sampling) or ``SIGUSR2`` (cProfile).
+
+    Call from the main thread. The cProfile capture covers the main thread
+    and uses ``SIGALRM`` to stop.
+    """
+    out_dir = Path(out_dir)
+
+    def on_sample(signum, frame) -> None:
+        if _busy.acquire(blocking=False):
+            threading.Thread(
+                target=_sample_in_background,
+                args=(duration, out_dir, interval),
+                name="p2p-profile",
+                daemon=True,
+            ).start()
+
+    def on_cprofile(signum, frame) -> None:
+        if _busy.acquire(blocking=False):
+            _CProfileCapture(duration, out_dir).start()
+
+    signal.signal(signal.SIGUSR1, on_sample)
+    signal.signal(signal.SIGUSR2, on_cprofile)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="app.profiling", description="Ask a running bot to capture a profile."
+    )
+    parser.add_argument("pid", type=int, help="process started with profiling hooks installed")
+    parser.add_argument(
+        "--cprofile", action="store_true", help="cProfile the main thread instead of sampling"
+    )
+    args = parser.parse_args(argv)
+    os.kill(args.pid, signal.SIGUSR2 if args.cprofile else signal.SIGUSR1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""Append-only columnar recorder for online ad snapshots.
+
+A recording is an 8 byte magic followed by one frame per snapshot::
+
+    header   <IqIIIII  size, timestamp_ms, market, n_ads, n_links, n_strings, 0
+    strings  n_strings * <BI (namespace, utf-8 length), the utf-8 blobs
+    columns  see ``_COLUMNS``; ``n_links`` payment codes, ``n_ads`` rows otherwise
+
+Every section starts on an 8 byte boundary so replay can hand out
+``numpy.frombuffer`` views of a memory map without copying. Markets, nicknames
+and payment ids are interned per file: a string is written once, in the frame
+that first uses it, and referenced by index afterwards. Only the columns kept
+by :class:`app.analytics.AdBook` are recorded.
+"""
+
+import mmap
+import os
+import struct
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+import numpy as np
+
+from app.analytics import AdBook
+
+MAGIC = b"P2PREC\x01\n"
+_HEADER = struct.Struct("<IqIIIII")
+_STRING = struct.Struct("<BI")
+_MARKET, _NICK, _PAYMENT = range(3)
+
+_COLUMNS = (
+    ("item_id", "<i8"),
+    ("user_id", "<i8"),
+    ("price", "<f8"),
+    ("last_quantity", "<f8"),
+    ("min_amount", "<f8"),
+    ("max_amount", "<f8"),
+    ("order_num", "<i4"),
+    ("nick", "<u4"),
+    ("execute_rate", "<i2"),
+    ("payment_count", "<u2"),
+    ("side", "<i1"),
+    ("payment_code", "<u4"),
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Snapshot:
+    """One recorded market scan."""
+
+    timestamp_ms: int
+    market: str
+    book: AdBook
+
+
+def _pad(size: int) -> int:
+    return -size % 8
+
+
+def _frames(buffer) -> Iterator[tuple[int, tuple, int]]:
+    """Yield ``(offset, header, end)`` for each complete frame in ``buffer``."""
+    if bytes(buffer[: len(MAGIC)]) != MAGIC:
+        raise ValueError("not a snapshot recording")
+    offset = len(MAGIC)
+    while offset + _HEADER.size <= len(buffer):
+        header = _HEADER.unpack_from(buffer, offset)
+        end = offset + _HEADER.size + header[0]
+        if end > len(buffer):
+            break  # torn write at the tail
+        yield offset + _HEADER.size, header, end
+        offset = end
+
+
+def _read_strings(buffer, offset: int, count: int, tables: tuple[list, list, list]) -> int:
+    """Append ``count`` new strings at ``offset`` to ``tables``; return the column offset."""
+    blob = offset + count * _STRING.size
+    for index in range(count):
+        namespace, size = _STRING.unpack_from(buffer, offset + index * _STRING.size)
+        tables[namespace].append(bytes(buffer[blob : blob + size]).decode("utf-8"))
+        blob += size
+    return blob + _pad(blob)
+
+
+class Recorder:
+    """Append snapshots to a recording, creating it when missing.
+
+    Reopening an existing file restores its string tables and drops a frame
+    left incomplete by a crash.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._index: tuple[dict, dict, dict] = ({}, {}, {})
+        self._file: BinaryIO = self._open()
+
+    def _open(self) -> BinaryIO:
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            handle = self.path.open("wb")
+            handle.write(MAGIC)
+            return handle
+        data = self.path.read_bytes()
+        tables: tuple[list, list, list] = ([], [], [])
+        end = len(MAGIC)
+        for offset, header, end in _frames(data):
+            _read_strings(data, offset, header[5], tables)
+        for index, table in zip(self._index, tables):
+            index.update((value, position) for position, value in enumerate(table))
+        handle = self.path.open("r+b")
+        handle.truncate(end)
+        handle.seek(end)
+        return handle
+
+    def _intern(self, namespace: int, value: str, new: list) -> int:
+        index = self._index[namespace]
+        position = index.get(value)
+        if position is None:
+            position = index[value] = len(index)
+            new.append((namespace, value.encode("utf-8")))
+        return position
+
+    def append(self, book: AdBook, *, market: str, timestamp_ms: int | None = None) -> None:
+        """Write ``book`` as one frame; ``timestamp_ms`` defaults to now."""
+        if timestamp_ms is None:
+            timestamp_ms = int(time.time() * 10**3)
+        new: list[tuple[int, bytes]] = []
+        market_id = self._intern(_MARKET, market, new)
+        payments = np.array([self._intern(_PAYMENT, p, new) for p in book.payment_ids], np.uint32)
+        columns = {
+            "item_id": book.item_id,
+            "user_id": book.user_id,
+            "price": book.price,
+            "last_quantity": book.last_quantity,
+            "min_amount": book.min_amount,
+            "max_amount": book.max_amount,
+            "order_num": book.order_num,
+            "nick": [self._intern(_NICK, n, new) for n in book.nick_name],
+            "execute_rate": book.execute_rate,
+            "payment_count": np.diff(book.payment_ptr),
+            "side": book.side,
+            "payment_code": payments[book.payment_code] if len(payments) else [],
+        }
+        parts = [_STRING.pack(namespace, len(blob)) for namespace, blob in new]
+        parts += [blob for _, blob in new]
+        size = sum(map(len, parts))
+        parts.append(b"\0" * _pad(size))
+        for name, dtype in _COLUMNS:
+            raw = np.ascontiguousarray(columns[name], dtype).tobytes()
+            parts += (raw, b"\0" * _pad(len(raw)))
+        body = b"".join(parts)
+        header = _HEADER.pack(
+            len(body), timestamp_ms, market_id, len(book), len(book.payment_code), len(new), 0
+        )
+        self._file.write(header + body)
+        self._file.flush()
+
+    def sync(self) -> None:
+        """Force written frames to stable storage."""
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "Recorder":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def replay(path: str | Path) -> Iterator[Snapshot]:
+    """Iterate recorded snapshots in order.
+
+    Numeric columns are read-only views over a memory map of ``path``; copy
+    them before keeping them past the next write to the file.
+    """
+    with open(path, "rb") as handle:
+        buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    tables: tuple[list, list, list] = ([], [], [])
+    nicks = np.empty(0, dtype=object)
+    payment_ids: tuple[str, ...] = ()
+    for offset, header, _ in _frames(buffer):
+        _, timestamp_ms, market, n_ads, n_links, n_strings, _ = header
+        offset = _read_strings(buffer, offset, n_strings, tables)
+        if len(nicks) != len(tables[_NICK]):
+            nicks = np.array(tables[_NICK], dtype=object)
+        if len(payment_ids) != len(tables[_PAYMENT]):
+            payment_ids = tuple(tables[_PAYMENT])
+        columns = {}
+        for name, dtype in _COLUMNS:
+            count = n_links if name == "payment_code" else n_ads
+            columns[name] = np.frombuffer(buffer, dtype, count, offset)
+            size = columns[name].nbytes
+            offset += size + _pad(size)
+        ptr = np.zeros(n_ads + 1, np.int64)
+        np.cumsum(columns.pop("payment_count"), out=ptr[1:])
+        yield Snapshot(
+            timestamp_ms=timestamp_ms,
+            market=tables[_MARKET][market],
+            book=AdBook(
+                nick_name=nicks[columns.pop("nick")],
+                payment_ptr=ptr,
+                payment_ids=payment_ids,
+                **columns,
+            ),
+        )
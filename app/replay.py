@@ -0,0 +1,179 @@
+"""Replay the recorded ``examples/`` through API clients and compare what they do.
+
+Every fixture's request is sent through a reference client (the ``bybit_p2p``
+library) and a candidate client (:class:`CompiledP2P` by default) at a fixed
+timestamp, against a stub transport that answers with the recorded response.
+The encoded payload, URL, body, headers and signature of the outgoing request
+and the decoded result or error must be identical; per-fixture timings of
+both clients are reported alongside.
+
+Usage::
+
+    python -m app.replay [--repeat N] [--save PATH] [--baseline PATH]
+
+``--save`` stores the candidate's outcomes and timings; ``--baseline``
+compares against a file saved by an earlier version instead of the library.
+"""
+
+import argparse
+import copy
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+from unittest import mock
+
+import requests
+from bybit_p2p import P2P
+from bybit_p2p._p2p_helper import P2PMethods
+from bybit_p2p._p2p_manager import P2PManager
+
+from app.client.compiler import CompiledP2P, compile_plans, encode_payload
+from app.client.transport import (
+    EXAMPLES,
+    Fixture,
+    load_fixtures,
+    make_response,
+    recorded_outcome,
+)
+
+FIXED_TIMESTAMP_MS = 1755113471413
+CREDENTIALS = {"testnet": False, "api_key": "replay-key", "api_secret": "replay-secret"}
+
+
+class StubTransport:
+    """Stands in for ``requests.Session.send``, answering with the fixture's response.
+
+    Recorded errors are answered as :func:`recorded_outcome` describes.
+    """
+
+    def __init__(self, response: dict) -> None:
+        self._content, self._raise = recorded_outcome(response)
+        self.sent: list[requests.PreparedRequest] = []
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        self.sent.append(request)
+        if self._raise is not None:
+            raise self._raise
+        return make_response(request, 200, self._content)
+
+
+def _outcome(client: P2P, fixture: Fixture) -> dict:
+    """Call the fixture's method once and describe everything observable about it."""
+    transport = StubTransport(fixture.response)
+    client.client.send = transport.send
+    params = copy.deepcopy(fixture.params)
+    outcome: dict[str, Any] = {}
+    try:
+        outcome["result"] = getattr(client, fixture.method)(**params)
+    except Exception as exc:
+        outcome["error"] = {
+            "type": type(exc).__name__,
+            "status_code": getattr(exc, "status_code", None),
+            "message": getattr(exc, "message", str(exc)),
+        }
+    outcome["params_after"] = params
+    if transport.sent:
+        request = transport.sent[0]
+        body = request.body
+        outcome |= {
+            "http_method": request.method,
+            "url": request.url,
+            "body": body.decode() if isinstance(body, bytes) else body,
+            "headers": dict(request.headers),
+        }
+    return outcome
+
+
+def _payloads(fixture: Fixture, plans: dict) -> tuple[str | None, str | None]:
+    """``_generate_payload`` output of the library and of the compiled plan."""
+    method = getattr(P2PMethods, fixture.method.upper())
+    if not set(method.required_params) <= fixture.params.keys():
+        return None, None
+    plan = plans[method]
+    library = P2PManager._generate_payload(method.http_method, copy.deepcopy(fixture.params))
+    return library, encode_payload(plan, fixture.params)
+
+
+def _best_us(call: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1e6, 1)
+
+
+def run_fixture(client: P2P, fixture: Fixture, *, repeat: int) -> tuple[dict, float]:
+    """Outcome of ``fixture`` on ``client`` at the fixed timestamp, and its best time in µs."""
+    with mock.patch("time.time", return_value=FIXED_TIMESTAMP_MS / 1e3):
+        outcome = _outcome(client, fixture)
+        timing = _best_us(lambda: _outcome(client, fixture), repeat)
+    return outcome, timing
+
+
+def _differences(expected: dict, actual: dict) -> list[str]:
+    keys = sorted(expected.keys() | actual.keys())
+    return [key for key in keys if expected.get(key) != actual.get(key)]
+
+
+def replay(
+    *,
+    root: Path = EXAMPLES,
+    repeat: int = 20,
+    candidate: Callable[[], P2P] | None = None,
+    baseline: dict | None = None,
+) -> list[dict]:
+    """Compare the candidate client with the library, or with a saved ``baseline``, per fixture."""
+    candidate = candidate or (lambda: CompiledP2P(**CREDENTIALS))
+    reference_client, candidate_client = P2P(**CREDENTIALS), candidate()
+    for client in (reference_client, candidate_client):
+        client.logger.disabled = True  # recorded API errors are expected here
+    plans = compile_plans(base_url=reference_client._url, api_key="", recv_window=5000)
+    results = []
+    for fixture in load_fixtures(root):
+        actual, candidate_us = run_fixture(candidate_client, fixture, repeat=repeat)
+        record = {"fixture": fixture.name, "method": fixture.method, "candidate_us": candidate_us}
+        if baseline is None:
+            expected, reference_us = run_fixture(reference_client, fixture, repeat=repeat)
+            library_payload, compiled_payload = _payloads(fixture, plans)
+            differences = _differences(expected, actual)
+            if library_payload != compiled_payload:
+                differences.append("payload")
+        else:
+            saved = baseline[fixture.name]
+            expected, reference_us = saved["outcome"], saved["candidate_us"]
+            differences = _differences(expected, json.loads(json.dumps(actual)))
+        record |= {
+            "reference_us": reference_us,
+            "speedup": round(reference_us / candidate_us, 2),
+            "identical": not differences,
+            "differences": differences,
+            "outcome": actual,
+        }
+        results.append(record)
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="app.replay", description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per fixture")
+    parser.add_argument("--save", metavar="PATH", help="store outcomes and timings")
+    parser.add_argument("--baseline", metavar="PATH", help="compare with a saved run")
+    args = parser.parse_args(argv)
+    baseline = None
+    if args.baseline:
+        saved = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        baseline = {record["fixture"]: record for record in saved}
+    results = replay(repeat=args.repeat, baseline=baseline)
+    for record in results:
+        summary = {key: value for key, value in record.items() if key != "outcome"}
+        print(json.dumps(summary), flush=True)
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, ensure_ascii=False), encoding="utf-8")
+    return 0 if all(record["identical"] for record in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
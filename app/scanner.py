@@ -0,0 +1,180 @@
+"""Fetch complete ``get_online_ads`` books for one or more markets.
+
+From one scan to the next most ads, and most pages, are unchanged.
+:class:`ChangeDetector` fingerprints every ad (id, price, quantity and
+limits) and every page, and reduces a scan to the ads that were added,
+changed or removed, so consumers do work proportional to market movement
+rather than market size.
+"""
+
+import math
+from dataclasses import dataclass, field
+from operator import itemgetter
+from typing import Callable, Iterable, Mapping
+
+from app.accounts import AccountManager
+
+
+@dataclass(frozen=True, slots=True)
+class Market:
+    """One side of one token/fiat pair; ``side`` uses the API's ``0``/``1``."""
+
+    token: str
+    currency: str
+    side: int
+
+    def __str__(self) -> str:
+        return f"{self.token}/{self.currency}/{self.side}"
+
+    def params(self, page: int, size: int) -> dict:
+        return {
+            "tokenId": self.token,
+            "currencyId": self.currency,
+            "side": str(self.side),
+            "page": str(page),
+            "size": str(size),
+        }
+
+
+def scan_pages(
+    manager: AccountManager,
+    account: str,
+    markets: Iterable[Market],
+    *,
+    size: int = 50,
+    max_pages: int | None = None,
+) -> dict[Market, list[list[dict]]]:
+    """Return the ``items`` of every ``get_online_ads`` page of each market, in page order.
+
+    First pages of all markets are requested together; once their counts are
+    known, all remaining pages are requested together as well.
+    """
+    markets = list(markets)
+    first = {
+        market: manager.submit(account, "get_online_ads", **market.params(1, size))
+        for market in markets
+    }
+    pages = {}
+    rest = {}
+    for market, future in first.items():
+        result = future.result()["result"]
+        pages[market] = [list(result["items"])]
+        count = math.ceil(int(result["count"]) / size)
+        if max_pages is not None:
+            count = min(count, max_pages)
+        rest[market] = [
+            manager.submit(account, "get_online_ads", **market.params(page, size))
+            for page in range(2, count + 1)
+        ]
+    for market, futures in rest.items():
+        for future in futures:
+            pages[market].append(future.result()["result"]["items"])
+    return pages
+
+
+def scan_markets(
+    manager: AccountManager,
+    account: str,
+    markets: Iterable[Market],
+    *,
+    size: int = 50,
+    max_pages: int | None = None,
+) -> dict[Market, list[dict]]:
+    """Return every online ad of each market, in the API's ranking order."""
+    pages = scan_pages(manager, account, markets, size=size, max_pages=max_pages)
+    return {market: [item for page in book for item in page] for market, book in pages.items()}
+
+
+# What makes an ad different to a taker: its id, price, quantity and limits,
+# taken as the API's strings without decoding them.
+ad_fingerprint: Callable[[Mapping], tuple[str, ...]] = itemgetter(
+    "id", "price", "lastQuantity", "minAmount", "maxAmount"
+)
+
+
+@dataclass(frozen=True, slots=True)
+class BookDiff:
+    """Ads of one market that differ from the previous scan."""
+
+    market: Market
+    added: list[dict] = field(default_factory=list)
+    changed: list[dict] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)  # ad ids
+    pages: int = 0
+    unchanged_pages: int = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+
+@dataclass(slots=True)
+class _Snapshot:
+    pages: list[tuple[tuple[str, ...], ...]] = field(default_factory=list)
+    ads: dict[str, tuple[str, ...]] = field(default_factory=dict)  # by id
+    counts: dict[str, int] = field(default_factory=dict)  # pages each id is on
+
+
+class ChangeDetector:
+    """Diff each scan of a market against the previous one.
+
+    A page whose fingerprints equal those of the page at the same position
+    last time is skipped as a whole; only ads on the other pages are looked
+    up, so an ad that merely moved between pages is not reported.
+    """
+
+    def __init__(self) -> None:
+        self._snapshots: dict[Market, _Snapshot] = {}
+
+    def __contains__(self, market: Market) -> bool:
+        return market in self._snapshots
+
+    def diff(self, market: Market, pages: list[list[Mapping]]) -> BookDiff:
+        """Record ``pages`` as the market's snapshot and return what changed since the last one."""
+        snapshot = self._snapshots.setdefault(market, _Snapshot())
+        previous, counts, ads = snapshot.pages, snapshot.counts, snapshot.ads
+        fingerprints = [tuple(map(ad_fingerprint, page)) for page in pages]
+        moved = [
+            index
+            for index, prints in enumerate(fingerprints)
+            if index >= len(previous) or previous[index] != prints
+        ]
+        moved_out = moved + list(range(len(fingerprints), len(previous)))
+        touched: dict[str, None] = {}  # ordered set
+        for index in moved_out:
+            if index < len(previous):
+                for fp in previous[index]:
+                    counts[fp[0]] -= 1
+                    touched[fp[0]] = None
+        added, changed = [], []
+        for index in moved:
+            for item, fp in zip(pages[index], fingerprints[index]):
+                ad_id = fp[0]
+                counts[ad_id] = counts.get(ad_id, 0) + 1
+                before = ads.get(ad_id)
+                if before is None:
+                    added.append(item)
+                elif before != fp:
+                    changed.append(item)
+                ads[ad_id] = fp
+        removed = [ad_id for ad_id in touched if not counts[ad_id]]
+        for ad_id in removed:
+            del counts[ad_id], ads[ad_id]
+        snapshot.pages = fingerprints
+        return BookDiff(market, added, changed, removed, len(pages), len(pages) - len(moved))
+
+    def forget(self, market: Market) -> None:
+        self._snapshots.pop(market, None)
+
+
+def scan_changes(
+    manager: AccountManager,
+    account: str,
+    markets: Iterable[Market],
+    detector: ChangeDetector,
+    *,
+    size: int = 50,
+    max_pages: int | None = None,
+) -> dict[Market, BookDiff]:
+    """Scan ``markets`` and return each one's changes since ``detector`` last saw it."""
+    pages = scan_pages(manager, account, markets, size=size, max_pages=max_pages)
+    return {market: detector.diff(market, book) for market, book in pages.items()}
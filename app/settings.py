@@ -0,0 +1,233 @@
+"""Typed settings with named performance profiles, and a watcher that reloads them.
+
+Kept apart from :mod:`app.config` so the entry point does not pay for
+``dataclasses``, ``logging`` and ``threading`` before settings are needed.
+"""
+
+import logging
+import os
+import threading
+from dataclasses import Field, dataclass, field, fields
+from pathlib import Path
+from typing import Callable, Mapping
+
+from app.config import DEFAULT_RATE_LIMIT, _flag, _load_dotenv
+
+logger = logging.getLogger(__name__)
+
+
+# Named sets of performance settings; a profile only lists what it changes.
+PROFILES: dict[str, dict] = {
+    "default": {},
+    # Quote and release fast: a tight receive window on server time, short
+    # timeouts, enough sockets for every worker, and fresh caches.
+    "low-latency": {
+        "recv_window": 5000,
+        "sync_clock": True,
+        "pool_size": 16,
+        "workers": 16,
+        "timeout": 3.0,
+        "cache_ttl": 5.0,
+        "poll_interval": 0.5,
+        "poll_max_interval": 2.0,
+    },
+    # Long history pulls: few workers well inside the rate limit, patient
+    # timeouts, and slow polling of everything else.
+    "bulk-backfill": {
+        "rate_limit": 5.0,
+        "pool_size": 4,
+        "workers": 4,
+        "timeout": 30.0,
+        "cache_ttl": 600.0,
+        "poll_interval": 10.0,
+        "poll_max_interval": 60.0,
+    },
+    # Tests and local runs against MemoryTransport or a mock server.
+    "test": {
+        "api_key": "test",
+        "api_secret": "test",
+        "testnet": True,
+        "rate_limit": 10_000.0,
+        "pool_size": 2,
+        "workers": 2,
+        "timeout": 1.0,
+        "cache_ttl": 0.0,
+        "poll_interval": 0.01,
+        "poll_max_interval": 0.1,
+    },
+}
+
+# Settings that must be greater than zero; the other numbers must not be negative.
+_POSITIVE = {"recv_window", "rate_limit", "pool_size", "workers", "timeout", "cache_size"}
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """Credentials and performance settings, validated on construction.
+
+    :meth:`load` starts from the defaults below, applies the named
+    ``profile`` (see :data:`PROFILES`), then the ``[settings]`` table of the
+    TOML file named by ``BYBIT_CONFIG_FILE``, then ``BYBIT_<NAME>``
+    environment variables (also read from ``.env``), e.g.
+    ``BYBIT_POOL_SIZE=16``.
+    """
+
+    api_key: str = field(default="", repr=False)
+    api_secret: str = field(default="", repr=False)
+    testnet: bool = False
+    recv_window: int = 20000  # milliseconds
+    profile: str = "default"
+    sync_clock: bool = False  # stamp requests with server time
+    rate_limit: float = DEFAULT_RATE_LIMIT  # requests per second per account
+    pool_size: int = 8  # HTTP connections per host
+    workers: int = 8  # threads of the shared worker pool
+    timeout: float = 10.0  # seconds per HTTP request
+    cache_size: int = 1024  # responses kept by ``cached_call``
+    cache_ttl: float = 60.0  # seconds a read-only response may be reused
+    poll_interval: float = 2.0  # seconds between polls
+    poll_max_interval: float = 10.0  # longest adaptive poll interval
+
+    def __post_init__(self) -> None:
+        if self.profile not in PROFILES:
+            raise ValueError(f"Unknown profile {self.profile!r}; choose from {sorted(PROFILES)}")
+        for item in fields(self):
+            value = getattr(self, item.name)
+            if not isinstance(value, item.type) or (item.type is int and isinstance(value, bool)):
+                raise ValueError(f"{item.name} must be {item.type.__name__}, got {value!r}")
+            if item.type in (int, float):
+                if value < 0 or (value == 0 and item.name in _POSITIVE):
+                    raise ValueError(f"{item.name} is out of range: {value!r}")
+        if self.poll_max_interval < self.poll_interval:
+            raise ValueError("poll_max_interval must not be below poll_interval")
+
+    @classmethod
+    def load(
+        cls,
+        *,
+        profile: str | None = None,
+        path: str | Path | None = None,
+        environ: Mapping[str, str] | None = None,
+    ) -> "Settings":
+        """Settings from ``profile``, the TOML file at ``path`` and the environment."""
+        if environ is None:
+            _load_dotenv()
+            environ = os.environ
+        path = path or environ.get("BYBIT_CONFIG_FILE")
+        table: dict = {}
+        if path:
+            import tomllib
+
+            with open(path, "rb") as fh:
+                table = dict(tomllib.load(fh).get("settings", {}))
+        names = {item.name: item for item in fields(cls)}
+        unknown = table.keys() - names.keys()
+        if unknown:
+            raise ValueError(f"Unknown settings in {path}: {', '.join(sorted(unknown))}")
+        env = {
+            name: environ[f"BYBIT_{name.upper()}"]
+            for name in names
+            if f"BYBIT_{name.upper()}" in environ
+        }
+        profile = profile or env.pop("profile", None) or table.get("profile") or "default"
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown profile {profile!r}; choose from {sorted(PROFILES)}")
+        values = PROFILES[profile] | table | env | {"profile": profile}
+        return cls(**{name: _coerce(names[name], value) for name, value in values.items()})
+
+    @classmethod
+    def from_env(cls, **kwargs) -> "Settings":
+        """Like :meth:`load`, but the API key and secret must be set."""
+        settings = cls.load(**kwargs)
+        if not settings.api_key or not settings.api_secret:
+            raise RuntimeError("BYBIT_API_KEY and BYBIT_API_SECRET must be set")
+        return settings
+
+
+def _coerce(item: Field, value):
+    """Convert ``value``, possibly a string from the environment, to ``item``'s type."""
+    if not isinstance(value, str) or item.type is str:
+        return float(value) if item.type is float and type(value) is int else value
+    if item.type is bool:
+        if value.lower() not in {"1", "true", "yes", "0", "false", "no", ""}:
+            raise ValueError(f"{item.name} must be a boolean, got {value!r}")
+        return _flag(value)
+    try:
+        return item.type(value)
+    except ValueError:
+        raise ValueError(f"{item.name} must be {item.type.__name__}, got {value!r}") from None
+
+
+class SettingsWatcher:
+    """Reload :class:`Settings` when the TOML file changes and pass them to callbacks.
+
+    Only the file is watched; the environment and ``.env`` are read at
+    start-up and keep overriding it. An invalid file is logged and ignored,
+    so ``current`` is always valid.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        profile: str | None = None,
+        interval: float = 2.0,
+        environ: Mapping[str, str] | None = None,
+    ) -> None:
+        self.path = Path(path)
+        self.profile = profile
+        self.interval = interval
+        self._environ = environ
+        self._callbacks: list[Callable[[Settings], None]] = []
+        self._mtime = self._stat()
+        self.current = Settings.load(profile=profile, path=self.path, environ=environ)
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _stat(self) -> int | None:
+        try:
+            return self.path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def subscribe(self, callback: Callable[[Settings], None]) -> None:
+        """Call ``callback(settings)`` after every successful reload."""
+        self._callbacks.append(callback)
+
+    def check(self) -> bool:
+        """Reload if the file changed since the last check; ``True`` if settings changed."""
+        mtime = self._stat()
+        if mtime == self._mtime or mtime is None:
+            return False
+        self._mtime = mtime
+        try:
+            settings = Settings.load(profile=self.profile, path=self.path, environ=self._environ)
+        except (ValueError, OSError) as exc:
+            logger.warning("Ignoring invalid settings in %s: %s", self.path, exc)
+            return False
+        if settings == self.current:
+            return False
+        self.current = settings
+        logger.info("Reloaded settings from %s", self.path)
+        for callback in self._callbacks:
+            try:
+                callback(settings)
+            except Exception:
+                logger.warning("Settings callback failed", exc_info=True)
+        return True
+
+    def start(self) -> "SettingsWatcher":
+        """Check the file every ``interval`` seconds in a daemon thread."""
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="p2p-settings", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.check()
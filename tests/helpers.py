@@ -0,0 +1,43 @@
+"""Request fixtures and a capturing transport shared by the client tests."""
+
+from bybit_p2p import P2P
+
+AD = {
+    "id": 1951393103796514816,
+    "priceType": 0,
+    "premium": "",
+    "price": 44.0,
+    "minAmount": 500,
+    "maxAmount": 1000.5,
+    "remark": "",
+    "tradingPreferenceSet": {"isKyc": 1, "completeRateDay30": 95, "positionIdx": "2"},
+    "paymentIds": ["624"],
+    "actionType": "MODIFY",
+    "quantity": 10,
+    "paymentPeriod": 15,
+}
+
+
+class Response:
+    """Just enough of ``requests.Response`` for the client to decode ``body``."""
+
+    status_code = 200
+    headers: dict = {}
+
+    def __init__(self, body: dict) -> None:
+        self.body = body
+
+    def json(self) -> dict:
+        return self.body
+
+
+def capture(api: P2P, body: dict | None = None) -> list:
+    """Answer every request ``api`` sends with ``body``; return the list of sent requests."""
+    sent = []
+
+    def send(request, **kwargs):
+        sent.append(request)
+        return Response(body or {"ret_code": 0, "ret_msg": "SUCCESS", "result": {}})
+
+    api.client.send = send
+    return sent
@@ -0,0 +1,73 @@
+"""Tests for multi-account configuration and dispatch."""
+
+import pytest
+
+from app.accounts import AccountManager
+from app.client.ratelimit import TokenBucket
+from app.config import load_accounts
+
+
+def test_load_accounts_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BYBIT_ACCOUNTS", "main, alt")
+    monkeypatch.setenv("BYBIT_MAIN_API_KEY", "k1")
+    monkeypatch.setenv("BYBIT_MAIN_API_SECRET", "s1")
+    monkeypatch.setenv("BYBIT_ALT_API_KEY", "k2")
+    monkeypatch.setenv("BYBIT_ALT_API_SECRET", "s2")
+    monkeypatch.setenv("BYBIT_ALT_RATE_LIMIT", "2")
+    accounts = load_accounts()
+    assert list(accounts) == ["main", "alt"]
+    assert accounts["alt"]["rate_limit"] == 2.0
+    assert accounts["main"]["api_key"] == "k1"
+
+
+def test_load_accounts_from_file(monkeypatch: pytest.MonkeyPatch, tmp_path) -> None:
+    path = tmp_path / "accounts.toml"
+    path.write_text('[accounts.a]\napi_key = "k"\napi_secret = "s"\ntestnet = true\n')
+    monkeypatch.setenv("BYBIT_ACCOUNTS_FILE", str(path))
+    assert load_accounts()["a"]["testnet"] is True
+
+    path.write_text('[accounts.a]\napi_key = "k"\n')
+    with pytest.raises(RuntimeError):
+        load_accounts()
+
+
+def test_manager_shares_session_and_isolates_limits() -> None:
+    config = {"testnet": True, "recv_window": 5000, "rate_limit": 100.0}
+    accounts = {
+        "a": config | {"api_key": "k1", "api_secret": "s1"},
+        "b": config | {"api_key": "k2", "api_secret": "s2"},
+    }
+    with AccountManager(accounts, max_workers=2) as manager:
+        assert manager["a"].api.client is manager["b"].api.client is manager.session
+        assert manager["a"].limiter is not manager["b"].limiter
+        for account in manager.accounts.values():
+            account.api.http_req_handler = lambda method, params, key=account.api._api_key: key
+        results = manager.broadcast("get_account_information")
+        assert {name: f.result() for name, f in results.items()} == {"a": "k1", "b": "k2"}
+
+
+def test_token_bucket() -> None:
+    bucket = TokenBucket(rate=1000, burst=2)
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() > 0
+    assert bucket.acquire(timeout=1)
+
+
+def test_token_bucket_below_one_per_second() -> None:
+    bucket = TokenBucket(rate=0.5)
+    assert bucket.burst == 1
+    assert bucket.try_acquire() == 0
+    assert 0 < bucket.try_acquire() <= 2
+    bucket.set_rate(0.25)
+    assert bucket.burst == 1
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0.5, burst=0.5)
+
+
+def test_token_bucket_reserve() -> None:
+    bucket = TokenBucket(rate=1, burst=3)
+    assert bucket.try_acquire(keep=1) == 0
+    assert bucket.try_acquire(keep=1) == 0
+    assert bucket.try_acquire(keep=1) > 0  # the last token is kept for unreserved callers
+    assert bucket.try_acquire() == 0
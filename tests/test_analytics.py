@@ -0,0 +1,78 @@
+"""Tests for the vectorised order-book analytics."""
+
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+
+from app import analytics
+from app.analytics import ASK, BID, AdBook
+
+EXAMPLES = Path(__file__).resolve().parents[1] / "examples" / "competitor_ads"
+
+
+def _items(side: str, currency: str) -> list[dict]:
+    path = EXAMPLES / side / currency / "response.json"
+    return json.loads(path.read_text(encoding="utf-8"))["response"]["result"]["items"]
+
+
+def _book() -> AdBook:
+    return AdBook.from_items(_items("BUY", "UAH") + _items("SELL", "UAH"))
+
+
+def test_from_items_columns() -> None:
+    book = _book()
+    assert len(book) == 20
+    assert book.item_id.dtype == np.int64
+    assert book.price[0] == 42.50
+    first = book.payment_code[book.payment_ptr[1] : book.payment_ptr[2]]
+    assert [book.payment_ids[c] for c in first] == ["1", "545", "43", "60", "61"]
+
+
+def test_spread_and_rank() -> None:
+    book = _book()
+    assert analytics.best_price(book, BID) == 42.50
+    assert analytics.best_price(book, ASK) == 41.40
+    assert math.isclose(analytics.spread(book), 41.40 - 42.50)
+    assert analytics.rank(book, ASK, [41.0, 42.50]).tolist() == [1, 3]
+    assert analytics.rank(book, BID, 42.46).tolist() == 2
+
+
+def test_depth_and_vwap() -> None:
+    book = AdBook.from_items(
+        {
+            "id": str(i),
+            "userId": str(i),
+            "side": ASK,
+            "price": price,
+            "lastQuantity": "10",
+            "minAmount": "1",
+            "maxAmount": "1000",
+            "recentExecuteRate": 100,
+            "orderNum": 1,
+            "nickName": f"n{i}",
+            "payments": ["1"],
+        }
+        for i, price in enumerate(["2", "1"])
+    )
+    assert analytics.depth(book, ASK, [0.5, 1, 2]).tolist() == [0, 10, 20]
+    # 10 tokens at 1.0 cost 10, the remaining 10 fiat buy 5 tokens at 2.0.
+    assert math.isclose(analytics.vwap(book, ASK, 20), 20 / 15)
+    assert math.isnan(analytics.vwap(book, ASK, 100))
+
+
+def test_empty_side() -> None:
+    bids_only = AdBook.from_items(_items("BUY", "UAH"))
+    assert analytics.depth(bids_only, ASK, [41.0, 45.0]).tolist() == [0, 0]
+    assert analytics.depth(bids_only.take(bids_only.side == ASK), BID, [41.0]).tolist() == [0]
+    assert math.isnan(analytics.best_price(bids_only, ASK))
+
+
+def test_select_and_take() -> None:
+    book = _book()
+    mask = analytics.select(book, side=ASK, payment_id="623", min_execute_rate=99)
+    sub = book.take(mask)
+    assert sub.price.tolist() == [42.50]
+    assert "623" in [sub.payment_ids[c] for c in sub.payment_code]
+    assert not analytics.select(book, payment_id="missing").any()
@@ -0,0 +1,126 @@
+"""Tests for the balance and exposure tracker."""
+
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+from app.balance import SIDE_BUY, SIDE_SELL, BalanceTracker
+
+EXAMPLES = Path(__file__).resolve().parents[1] / "examples"
+SNAPSHOT_MS = 1755113468622  # ``time`` of the recorded balance response
+AD_ID = "1850820623983730688"
+
+
+def _response(relative: str) -> dict:
+    return json.loads((EXAMPLES / relative).read_text(encoding="utf-8"))["response"]
+
+
+class FakeManager:
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, dict]] = []
+        self.balance = _response("current_balance/balance.json")
+
+    def call(self, account: str, method: str, /, **params) -> dict:
+        self.calls.append((method, params))
+        if method == "get_current_balance":
+            return self.balance
+        if params["page"] == "1":
+            response = _response("my_ads/SELL/UAH/response.json")
+            response["result"]["items"][2]["status"] = 10  # put one ad online
+            return response
+        return {"result": {"count": 71, "items": []}}
+
+
+def _order(order_id: str, status: int, *, side: int = SIDE_SELL, created: int = 1, **extra):
+    return {
+        "id": order_id,
+        "status": status,
+        "side": side,
+        "tokenId": "USDT",
+        "notifyTokenQuantity": "100.0000",
+        "createDate": str(SNAPSHOT_MS + created),
+        **extra,
+    }
+
+
+def _tracker(*, wallet: str = "704.1029") -> tuple[BalanceTracker, FakeManager]:
+    manager = FakeManager()
+    manager.balance["result"]["balance"][0]["walletBalance"] = wallet
+    tracker = BalanceTracker.for_account(manager, "main")
+    tracker.reconcile()
+    return tracker, manager
+
+
+def test_reconcile_loads_balance_and_exposure() -> None:
+    tracker, manager = _tracker()
+    assert tracker.available("USDT") == pytest.approx(704.1029)
+    assert tracker.frozen("USDT") == 0
+    assert tracker.snapshot_ms == SNAPSHOT_MS
+    assert [params["page"] for method, params in manager.calls[1:]] == ["1", "2"]
+    assert len(tracker.ads) == 10
+    assert tracker.committed("USDT") == pytest.approx(269.267) == tracker.ad_committed(AD_ID)
+    assert tracker.ad_committed("1858878605040185344") == 0  # offline
+    assert tracker.committed("USDT", SIDE_BUY) == 0
+    assert tracker.headroom("USDT") == pytest.approx(704.1029 - 269.267)
+
+
+def test_sell_orders_freeze_and_return_quantity() -> None:
+    tracker, _ = _tracker()
+    tracker.apply_order(_order("1", 10, itemId=AD_ID))
+    assert tracker.available("USDT") == pytest.approx(604.1029)
+    assert tracker.frozen("USDT") == pytest.approx(100)
+    assert tracker.ad_committed(AD_ID) == pytest.approx(169.267)
+    assert tracker.committed("USDT") == pytest.approx(169.267)
+
+    tracker.apply_order(_order("1", 20))  # paid: nothing moves
+    tracker.apply_order(_order("1", 40))
+    assert tracker.available("USDT") == pytest.approx(704.1029)
+    assert tracker.frozen("USDT") == pytest.approx(0)
+    assert tracker.ad_committed(AD_ID) == pytest.approx(269.267)
+
+    tracker.apply_orders([_order("2", 10), _order("2", 20), _order("2", 50), _order("2", 50)])
+    assert tracker.available("USDT") == pytest.approx(604.1029)
+    assert tracker.frozen("USDT") == pytest.approx(0)
+
+
+def test_buy_orders_and_orders_in_the_snapshot() -> None:
+    tracker, _ = _tracker(wallet="804.1029")
+    assert tracker.frozen("USDT") == pytest.approx(100)
+    tracker.apply_orders([_order("3", 10, side=SIDE_BUY), _order("3", 50, side=SIDE_BUY)])
+    assert tracker.available("USDT") == pytest.approx(804.1029)
+
+    tracker.apply_order(_order("4", 10, created=-1))  # already frozen in the snapshot
+    assert tracker.available("USDT") == pytest.approx(804.1029)
+    tracker.apply_order(_order("4", 50))
+    assert tracker.frozen("USDT") == pytest.approx(0)
+
+    tracker.apply_order(_order("5", 50))  # finished before we saw it
+    assert tracker.available("USDT") == pytest.approx(804.1029)
+
+
+def test_ad_updates_and_drift() -> None:
+    tracker, _manager = _tracker()
+    ad = _response("my_ads/SELL/UAH/response.json")["result"]["items"][3]
+    tracker.apply_ad(ad | {"status": 10, "lastQuantity": "50"})
+    assert tracker.committed("USDT") == pytest.approx(319.267)
+    tracker.apply_ad(ad | {"status": 10, "lastQuantity": "20"})
+    assert tracker.committed("USDT") == pytest.approx(289.267)
+    tracker.remove_ad(AD_ID)
+    assert tracker.committed("USDT") == pytest.approx(20)
+
+    tracker.apply_orders([_order("6", 10, side=SIDE_BUY), _order("6", 50, side=SIDE_BUY)])
+    tracker.reconcile()  # the API has not seen the buy
+    assert tracker.drift == {"USDT": pytest.approx(-100)}
+    assert tracker.available("USDT") == pytest.approx(704.1029)
+
+
+def test_reads_are_local() -> None:
+    tracker, manager = _tracker()
+    calls = len(manager.calls)
+    start = time.perf_counter()
+    for _ in range(10_000):
+        tracker.headroom("USDT")
+    assert (time.perf_counter() - start) / 10_000 < 50e-6
+    assert len(manager.calls) == calls
@@ -0,0 +1,171 @@
+"""Tests for the chat keyword scanner and outbox."""
+
+import json
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app.chat import ChatOutbox, ChatScanner, UploadCache, message_uuid
+
+EXAMPLE = (
+    Path(__file__).resolve().parents[1] / "examples/chat_messages/SELL/UAH/1951398674599923712.json"
+)
+
+
+def _categories(scanner: ChatScanner, text: str) -> set[str]:
+    return {category for category, _ in scanner.match_text(text)}
+
+
+def test_multilingual_rules() -> None:
+    scanner = ChatScanner()
+    assert _categories(scanner, "Добрий день, оплатив, перевірте") == {"payment_sent"}
+    assert _categories(scanner, "Zapłaciłem przelewem") == {"payment_sent"}
+    assert _categories(scanner, "Прошу повернути кошти") == {"refund_or_cancel"}
+    assert _categories(scanner, "czy mogę z innego konta?") == {"third_party"}
+    assert _categories(scanner, "пишіть у Telegram +380 67 123 4567") == {
+        "off_platform",
+        "phone_number",
+    }
+    assert not _categories(scanner, "the order is still unpaid")
+
+
+def test_scan_is_incremental_and_skips_system_and_self() -> None:
+    messages = json.loads(EXAMPLE.read_text(encoding="utf-8"))["response"]["result"]["result"]
+    order_id = messages[0]["orderId"]
+    scanner = ChatScanner({"released": ("released",), "testing": ("testing",)})
+    hits = scanner.scan(order_id, messages)
+    assert {hit.category for hit in hits} == {"testing"}  # the release notice is a sys message
+    assert scanner.scan(order_id, messages) == []
+
+    newer = {"id": str(int(messages[0]["id"]) + 1), "message": "released?", "userId": "1"}
+    assert [hit.category for hit in scanner.scan(order_id, [newer] + messages)] == ["released"]
+
+    own = ChatScanner({"testing": ("testing",)}, self_user_id=messages[0]["userId"])
+    assert own.scan(order_id, messages) == []
+
+
+ORDER_DETAILS = (
+    Path(__file__).resolve().parents[1] / "examples/order_details/SELL/UAH/1951398674599923712.json"
+)
+
+
+class ChatManager:
+    """Record sends; ``delay`` makes each call slow and ``fail`` the first few fail."""
+
+    def __init__(self, *, delay: float = 0.0, fail: int = 0) -> None:
+        self.delay = delay
+        self.fail = fail
+        self.calls: list[tuple[str, dict]] = []
+        self.lock = threading.Lock()
+        self.in_flight = self.peak = 0
+
+    def call(self, account: str, method: str, /, **params) -> dict:
+        with self.lock:
+            self.calls.append((method, params))
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if method == "upload_chat_file":
+                return {"result": {"url": f"https://files/{len(self.calls)}", "type": "pic"}}
+            with self.lock:
+                if self.fail:
+                    self.fail -= 1
+                    raise ConnectionError("reset")
+            return {"ret_code": 0, "result": {}}
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def cached_call(self, account: str, method: str, /, *, ttl: float, **params) -> dict:
+        self.calls.append((method, params))
+        return json.loads(ORDER_DETAILS.read_text(encoding="utf-8"))["response"]
+
+
+def _sent(manager: ChatManager) -> list[dict]:
+    return [params for method, params in manager.calls if method == "send_chat_message"]
+
+
+def test_outbox_dedupes_and_renders_templates() -> None:
+    manager = ChatManager()
+    with ChatOutbox(manager, "main") as outbox:
+        first = outbox.send_template("1951398674599923712", "greeting")
+        assert outbox.send_template("1951398674599923712", "greeting") is None
+        assert outbox.send("1951398674599923712", "paid?") == message_uuid(
+            "1951398674599923712", "paid?"
+        )
+        assert outbox.flush(5)
+    greeting, text = _sent(manager)
+    assert greeting["msgUuid"] == first and len(first) == 32
+    assert greeting["message"] == (
+        "Hi ПродамСарай! Order 1951398674599923712: 3000.0000 USDT for 134910.00 UAH."
+    )
+    assert text["message"] == "paid?" and text["contentType"] == "str"
+    assert outbox.sent == 2 and outbox.duplicates == 1
+
+
+def test_orders_are_sent_concurrently_in_order_per_order() -> None:
+    manager = ChatManager(delay=0.02)
+    outbox = ChatOutbox(manager, "main", workers=4)
+    start = time.perf_counter()
+    for order in range(4):
+        for index in range(3):
+            outbox.send(str(order), f"message {index}")
+    assert time.perf_counter() - start < 0.02  # queueing does not wait on the API
+    outbox.close()
+    assert manager.peak == 4
+    for order in range(4):
+        messages = [p["message"] for p in _sent(manager) if p["orderId"] == str(order)]
+        assert messages == ["message 0", "message 1", "message 2"]
+
+
+def test_retries_keep_the_message_uuid(caplog: pytest.LogCaptureFixture) -> None:
+    manager = ChatManager(fail=2)
+    with ChatOutbox(manager, "main", retries=2, backoff=0) as outbox:
+        msg_uuid = outbox.send("1", "hello")
+    assert {p["msgUuid"] for p in _sent(manager)} == {msg_uuid}
+    assert len(_sent(manager)) == 3 and outbox.sent == 1
+
+    manager = ChatManager(fail=5)
+    with ChatOutbox(manager, "main", retries=1, backoff=0) as outbox:
+        outbox.send("1", "hello")
+        outbox.flush(5)
+        assert outbox.failed == 1
+        assert outbox.send("1", "hello") is not None  # a failed message may be queued again
+    assert "failed" in caplog.text
+
+
+def test_files_are_uploaded_once_per_content(tmp_path: Path) -> None:
+    receipt, copy = tmp_path / "receipt.png", tmp_path / "copy.png"
+    receipt.write_bytes(b"\x89PNG receipt")
+    copy.write_bytes(b"\x89PNG receipt")
+    manager = ChatManager()
+    with ChatOutbox(manager, "main") as outbox:
+        outbox.send_file("1", receipt)
+        outbox.send_file("2", copy)
+        assert outbox.send_file("2", receipt) is None  # same content, same order
+        with pytest.raises(ValueError):
+            outbox.send_file("1", tmp_path / "notes.txt")
+    uploads = [p for method, p in manager.calls if method == "upload_chat_file"]
+    assert len(uploads) == 1
+    assert {p["message"] for p in _sent(manager)} == {"https://files/1"}
+    assert {p["contentType"] for p in _sent(manager)} == {"pic"}
+
+
+def test_upload_cache_keeps_the_most_recent_contents(tmp_path: Path) -> None:
+    uploaded = []
+    cache = UploadCache(lambda path: uploaded.append(path) or {"url": path}, maxsize=2)
+    paths = []
+    for name in "abc":
+        paths.append(tmp_path / name)
+        paths[-1].write_bytes(name.encode())
+    cache.get(paths[0])
+    cache.get(paths[1])
+    cache.get(paths[0])  # most recently used again
+    cache.get(paths[2])  # evicts b
+    cache.get(paths[0])
+    cache.get(paths[1])
+    assert len(cache) == 2
+    assert uploaded == [str(p) for p in (paths[0], paths[1], paths[2], paths[1])]
@@ -0,0 +1,151 @@
+"""Tests for the NDJSON command-line tool."""
+
+import io
+import json
+from concurrent.futures import Future
+from pathlib import Path
+
+import pytest
+
+from app import cli
+from app.accounts import AccountManager
+from app.cache import TTLCache
+
+EXAMPLES = Path(__file__).resolve().parents[1] / "examples"
+
+
+def _response(relative: str) -> dict:
+    return json.loads((EXAMPLES / relative).read_text(encoding="utf-8"))["response"]
+
+
+class FakeManager:
+    """Answer calls from the recorded examples."""
+
+    accounts = {"main": None}
+
+    cached_call = AccountManager.cached_call
+    invalidate = AccountManager.invalidate
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, dict]] = []
+        self.pending: list[list[dict]] = []
+        self.cache = TTLCache()
+
+    def call(self, account: str, method: str, /, **params) -> dict:
+        self.calls.append((method, params))
+        if method == "get_online_ads":
+            side = "BUY" if params["side"] == "0" else "SELL"
+            return _response(f"competitor_ads/{side}/{params['currencyId']}/response.json")
+        if method == "get_ad_details":
+            return _response("ad_details/SELL/UAH/1951393103796514816.json")
+        if method == "get_orders":
+            return _response("orders/SELL/UAH/all_orders.json")
+        if method == "get_pending_orders":
+            items = self.pending.pop(0)
+            return {"result": {"count": len(items), "items": items}}
+        if method == "get_chat_messages":
+            return _response("chat_messages/SELL/UAH/1951398674599923712.json")
+        if method == "get_user_payment_types":
+            return _response("payment_methods/payment_methods.json")
+        return {"result": {}}
+
+    def submit(self, account: str, method: str, /, **params) -> Future:
+        future: Future = Future()
+        future.set_result(self.call(account, method, **params))
+        return future
+
+    def close(self) -> None:
+        pass
+
+
+def _run(argv: list[str], capsys: pytest.CaptureFixture) -> tuple[FakeManager, list[dict]]:
+    args = cli.build_parser().parse_args(argv)
+    runtime = cli.Runtime()
+    runtime._manager = FakeManager()
+    args.handler(runtime, args)
+    lines = capsys.readouterr().out.splitlines()
+    return runtime._manager, [json.loads(line) for line in lines]
+
+
+def test_scan_emits_market_summaries(capsys: pytest.CaptureFixture) -> None:
+    _, records = _run(["scan", "--currency", "UAH", "--size", "10", "--pages", "1"], capsys)
+    assert records == [
+        {"market": "USDT/UAH/0", "ads": 10, "best": 42.5},
+        {"market": "USDT/UAH/1", "ads": 10, "best": 41.4},
+    ]
+
+
+def test_reprice_dry_run_and_apply(capsys: pytest.CaptureFixture) -> None:
+    manager, [plan] = _run(["reprice", "1951393103796514816", "--pages", "1"], capsys)
+    assert plan["target"] == 41.39 and plan["applied"] is False
+    assert "update_ad" not in [method for method, _ in manager.calls]
+
+    manager, [plan] = _run(["reprice", "1951393103796514816", "--pages", "1", "--apply"], capsys)
+    method, params = manager.calls[-1]
+    assert method == "update_ad" and params["price"] == "41.39"
+    assert params["paymentIds"] == ["12980554"]
+
+
+def test_lookups_are_cached_across_shell_commands(capsys, monkeypatch) -> None:
+    commands = "reprice 1951393103796514816 --pages 1\n" * 2 + "payments\npayments\n"
+    monkeypatch.setattr("sys.stdin", io.StringIO(commands))
+    manager, records = _run(["shell"], capsys)
+    methods = [method for method, _ in manager.calls]
+    assert methods.count("get_ad_details") == 1
+    assert methods.count("get_user_payment_types") == 1
+    assert records[0] == records[1]
+    payments = records[2:]
+    assert payments[: len(payments) // 2] == payments[len(payments) // 2 :]
+    assert {"id": "-1", "type": "416", "name": "Balance"}.items() <= payments[0].items()
+
+    commands = "reprice 1951393103796514816 --pages 1 --apply\n" * 2
+    monkeypatch.setattr("sys.stdin", io.StringIO(commands))
+    manager, _ = _run(["shell"], capsys)
+    methods = [method for method, _ in manager.calls]
+    assert methods.count("get_ad_details") == 2  # an applied update drops the cached ad
+
+
+def test_tail_chat_is_oldest_first(capsys: pytest.CaptureFixture) -> None:
+    _, messages = _run(["tail-chat", "1951398674599923712", "--count", "1"], capsys)
+    ids = [int(message["id"]) for message in messages]
+    assert ids == sorted(ids) and len(ids) > 1
+
+
+def test_adaptive_watch_orders(capsys: pytest.CaptureFixture, monkeypatch) -> None:
+    sleeps: list[float] = []
+    monkeypatch.setattr(cli.time, "sleep", sleeps.append)
+    order = _response("orders/SELL/UAH/all_orders.json")["result"]["items"][0]
+    waiting = order | {"status": 10, "transferLastSeconds": "600"}
+    runtime = cli.Runtime()
+    runtime._manager = FakeManager()
+    runtime._manager.pending = [[waiting], [waiting], [waiting | {"unreadMsgCount": "1"}], []]
+    args = cli.build_parser().parse_args(["watch-orders", "--adaptive", "--count", "4"])
+    args.handler(runtime, args)
+    events = [json.loads(line)["event"] for line in capsys.readouterr().out.splitlines()]
+    assert events == ["new", "unread", "gone"]
+    assert sleeps[0] == pytest.approx(0.5, abs=0.01)
+    assert sleeps[1] > sleeps[0] and sleeps[2] == pytest.approx(0.5, abs=0.01)
+
+
+def test_shell_reuses_runtime(capsys: pytest.CaptureFixture, monkeypatch) -> None:
+    monkeypatch.setattr("sys.stdin", io.StringIO("backfill --size 10\nnope\n"))
+    _, records = _run(["shell"], capsys)
+    assert len(records) == 10 * 6 + 1  # 52 orders over 6 pages of the same fixture
+    assert records[-1]["error"] == "invalid command"
+
+
+def test_scan_changes_skips_unchanged_markets(capsys: pytest.CaptureFixture, monkeypatch) -> None:
+    monkeypatch.setattr(cli.time, "sleep", lambda seconds: None)
+    argv = ["scan", "--currency", "UAH", "--side", "1", "--size", "10", "--pages", "1"]
+    _, records = _run(argv + ["--changes", "--count", "2"], capsys)
+    assert records == [
+        {"market": "USDT/UAH/1", "ads": 10, "best": 41.4},
+        {
+            "market": "USDT/UAH/1",
+            "added": 0,
+            "changed": 0,
+            "removed": 0,
+            "unchanged_pages": 1,
+            "pages": 1,
+        },
+    ]
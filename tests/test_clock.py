@@ -0,0 +1,59 @@
+"""Tests for server clock synchronisation."""
+
+import time
+
+import pytest
+from bybit_p2p._exceptions import FailedRequestError
+
+from app.client.clock import ServerClock
+from app.client.compiler import CompiledP2P
+
+
+def test_sync_keeps_lowest_rtt_midpoint() -> None:
+    delays = iter([0.02, 0.001, 0.02])
+
+    def fetch() -> float:
+        delay = next(delays)
+        time.sleep(delay / 2)
+        server = time.time() * 1e3 + 1500  # server runs 1.5s ahead
+        time.sleep(delay / 2)
+        return server
+
+    clock = ServerClock(fetch, samples=3)
+    offset = clock.sync()
+    assert abs(offset - 1500) < 5
+    assert clock.rtt_ms < 10
+    assert abs(clock.now_ms() - (time.time() * 1e3 + 1500)) < 5
+
+
+def test_background_resync_on_request() -> None:
+    calls = []
+    clock = ServerClock(lambda: calls.append(1) or time.time() * 1e3, samples=1, interval=60)
+    clock.start()
+    clock.request_sync()
+    deadline = time.monotonic() + 2
+    while len(calls) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    clock.stop()
+    assert len(calls) == 2
+
+
+class Rejected:
+    status_code = 200
+    headers: dict = {}
+
+    def json(self) -> dict:
+        return {"retCode": 10002, "retMsg": "invalid request, please check your server timestamp"}
+
+
+def test_client_stamps_with_clock_and_resyncs_on_rejection() -> None:
+    clock = ServerClock(lambda: 0.0)
+    clock.offset_ms = -3_600_000
+    api = CompiledP2P(testnet=True, api_key="key", api_secret="secret", clock=clock)
+    sent = []
+    api.client.send = lambda request, **kwargs: sent.append(request) or Rejected()
+    with pytest.raises(FailedRequestError):
+        api.get_account_information()
+    stamp = int(sent[0].headers["X-BAPI-TIMESTAMP"])
+    assert abs(stamp - (time.time() * 1e3 - 3_600_000)) < 1000
+    assert clock._wake.is_set()
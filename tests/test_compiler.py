@@ -0,0 +1,57 @@
+"""Parity tests between compiled request plans and ``bybit_p2p``."""
+
+import copy
+
+import pytest
+from bybit_p2p import P2P
+from bybit_p2p._exceptions import FailedRequestError
+
+from app.client.compiler import CompiledP2P
+from tests.helpers import AD, Response, capture
+
+CALLS = [
+    ("get_current_balance", {"accountType": "FUND", "coin": None}),
+    ("get_account_information", {}),
+    ("get_online_ads", {"tokenId": "USDT", "currencyId": "UAH", "side": 1, "page": 1}),
+    ("get_orders", {"page": 1, "size": 30, "beginTime": 1754000000000, "status": 50}),
+    ("get_chat_messages", {"orderId": "1", "size": "100", "startMessageId": 0}),
+    ("update_ad", AD),
+]
+
+
+@pytest.mark.parametrize("name,params", CALLS)
+def test_requests_match_library(name: str, params: dict, monkeypatch) -> None:
+    monkeypatch.setattr("time.time", lambda: 1755113471.413)
+    reference = P2P(testnet=False, api_key="key", api_secret="secret", recv_window=5000)
+    compiled = CompiledP2P(testnet=False, api_key="key", api_secret="secret", recv_window=5000)
+    expected, actual = capture(reference), capture(compiled)
+    original = copy.deepcopy(params)
+
+    getattr(reference, name)(**copy.deepcopy(params))
+    getattr(compiled, name)(**params)
+
+    assert params == original  # caller input untouched
+    assert actual[0].method == expected[0].method
+    assert actual[0].url == expected[0].url
+    assert actual[0].body == expected[0].body
+    assert dict(actual[0].headers) == dict(expected[0].headers)
+
+
+def test_missing_params_and_api_errors() -> None:
+    api = CompiledP2P(testnet=True, api_key="key", api_secret="secret")
+    with pytest.raises(ValueError, match="orderId, paymentType"):
+        api.mark_as_paid(paymentId="1")
+    capture(api, {"retCode": 10001, "retMsg": "bad"})
+    with pytest.raises(FailedRequestError) as info:
+        api.get_account_information()
+    assert info.value.status_code == 10001
+
+
+def test_request_raw_returns_undecoded_body() -> None:
+    api = CompiledP2P(testnet=True, api_key="key", api_secret="secret")
+    response = Response({})
+    response.content = b'{"ret_code": 0}'
+    sent = []
+    api.client.send = lambda request, **kwargs: sent.append(request) or response
+    assert api.request_raw("get_orders", page=1, size=10) == b'{"ret_code": 0}'
+    assert sent[0].url.endswith("/v5/p2p/order/simplifyList")
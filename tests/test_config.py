@@ -0,0 +1,78 @@
+"""Tests for typed settings, profiles and reloading."""
+
+import os
+
+import pytest
+
+from app.accounts import AccountManager
+from app.config import load_accounts
+from app.settings import PROFILES, Settings, SettingsWatcher
+
+
+def test_profiles_are_valid_settings() -> None:
+    for name in PROFILES:
+        assert Settings.load(profile=name, environ={}).profile == name
+    fast = Settings.load(profile="low-latency", environ={})
+    assert fast.sync_clock and fast.recv_window == 5000 and fast.timeout == 3.0
+    assert Settings.load(environ={}) == Settings()
+
+
+def test_env_overrides_file_overrides_profile(tmp_path) -> None:
+    path = tmp_path / "settings.toml"
+    path.write_text('[settings]\nprofile = "bulk-backfill"\nworkers = 6\ntimeout = 20\n')
+    settings = Settings.load(environ={"BYBIT_CONFIG_FILE": str(path), "BYBIT_WORKERS": "12"})
+    assert settings.profile == "bulk-backfill"
+    assert settings.workers == 12  # environment
+    assert settings.timeout == 20.0  # file, an int in TOML
+    assert settings.rate_limit == 5.0  # profile
+    assert Settings.load(profile="test", path=path, environ={}).profile == "test"
+
+
+@pytest.mark.parametrize(
+    "environ",
+    [
+        {"BYBIT_WORKERS": "0"},
+        {"BYBIT_TIMEOUT": "soon"},
+        {"BYBIT_TESTNET": "maybe"},
+        {"BYBIT_PROFILE": "fastest"},
+        {"BYBIT_POLL_INTERVAL": "30"},  # above poll_max_interval
+    ],
+)
+def test_invalid_settings_are_rejected(environ: dict) -> None:
+    with pytest.raises(ValueError):
+        Settings.load(environ=environ)
+
+
+def test_credentials_and_repr() -> None:
+    with pytest.raises(RuntimeError):
+        Settings.from_env(environ={})
+    settings = Settings.from_env(environ={"BYBIT_API_KEY": "k", "BYBIT_API_SECRET": "secret"})
+    assert settings.api_key == "k" and "secret" not in repr(settings)
+    assert load_accounts(settings)["default"]["rate_limit"] == 10.0
+
+
+def test_reload_applies_to_a_running_manager(tmp_path, caplog) -> None:
+    path = tmp_path / "settings.toml"
+    path.write_text('[settings]\nprofile = "test"\nrate_limit = 50\n')
+    watcher = SettingsWatcher(path, environ={})
+    manager = AccountManager.from_settings(watcher.current)
+    watcher.subscribe(manager.apply_settings)
+    try:
+        assert manager["default"].limiter.rate == 50.0
+        assert manager.transport.timeout == 1.0 and manager.max_workers == 2
+        assert not watcher.check()
+
+        path.write_text('[settings]\nprofile = "test"\nrate_limit = 0\n')  # invalid: kept
+        os.utime(path, ns=(1, 1))
+        assert not watcher.check() and watcher.current.rate_limit == 50.0
+
+        path.write_text('[settings]\nprofile = "test"\nrate_limit = 7\ntimeout = 4\npool_size = 3')
+        os.utime(path, ns=(2, 2))
+        caplog.clear()
+        with caplog.at_level("INFO", logger="app.accounts"):
+            assert watcher.check()
+        assert manager["default"].limiter.rate == 7.0
+        assert manager.transport.timeout == 4.0
+        assert [r.getMessage() for r in caplog.records] == ["pool_size=3 applies after a restart"]
+    finally:
+        manager.close()
@@ -0,0 +1,60 @@
+"""Tests for the counterparty cache and risk scoring."""
+
+import json
+from pathlib import Path
+
+from app.counterparty import CounterpartyStore
+
+EXAMPLE = (
+    Path(__file__).resolve().parents[1]
+    / "examples/counterparty_info/SELL/UAH/1951398674599923712.json"
+)
+ORDER = {"id": "1951398674599923712", "targetUserId": "428191399", "status": 10}
+
+
+def _fetcher(calls: list):
+    result = json.loads(EXAMPLE.read_text(encoding="utf-8"))["response"]["result"]
+
+    def fetch(uid: str, order_id: str) -> dict:
+        calls.append((uid, order_id))
+        return result
+
+    return fetch
+
+
+def test_prefetch_then_score_without_round_trip(tmp_path: Path) -> None:
+    calls: list = []
+    store = CounterpartyStore(_fetcher(calls), path=tmp_path / "cp.json")
+    assert store.assess(ORDER) is None  # unknown: refresh scheduled, nothing blocks
+    for future in store.prefetch([ORDER]):
+        future.result()
+    first = store.assess(ORDER)
+    assert 0 <= first < 0.2  # seasoned, high completion rate
+    assert len(calls) == 1
+
+    store.record_order(ORDER | {"status": 50})
+    store.record_order(ORDER | {"status": 50})  # the same order is only counted once
+    assert store.score("428191399") == first * 0.8
+    store.close()
+
+    reopened = CounterpartyStore(_fetcher(calls), path=tmp_path / "cp.json")
+    assert reopened.assess(ORDER) == first * 0.8
+    assert not reopened.prefetch([ORDER])
+    assert len(calls) == 1
+    reopened.close()
+
+
+def test_expired_profiles_are_served_while_refreshing() -> None:
+    calls: list = []
+    store = CounterpartyStore(_fetcher(calls), ttl=0)
+    store.refresh("428191399", ORDER["id"]).result()
+    assert store.get("428191399", ORDER["id"]) is not None
+    store.close()
+    assert len(calls) == 2
+
+
+def test_appeals_raise_risk() -> None:
+    store = CounterpartyStore(_fetcher([]))
+    store.record_order(ORDER | {"status": 30})
+    assert store.score("428191399") == 0.8
+    store.close()
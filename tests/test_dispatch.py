@@ -0,0 +1,90 @@
+"""Tests for the priority dispatcher."""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.accounts import Account
+from app.client.ratelimit import TokenBucket
+from app.dispatch import BACKGROUND, Dispatcher
+
+
+class FakeApi:
+    """Every method takes ``delay`` seconds and records its name."""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.done: list[str] = []
+
+    def __getattr__(self, method: str):
+        def call(**params) -> dict:
+            time.sleep(self.delay)
+            self.done.append(method)
+            return {"method": method, "params": params}
+
+        return call
+
+
+def _manager(api: FakeApi, rate: float, burst: float) -> SimpleNamespace:
+    return SimpleNamespace(accounts={"main": Account("main", api, TokenBucket(rate, burst))})
+
+
+def test_critical_calls_overtake_a_running_scan() -> None:
+    api = FakeApi(0.005)
+    with Dispatcher(_manager(api, rate=200, burst=5), workers=4) as dispatcher:
+        scan = [dispatcher.submit("main", "get_online_ads", page=page) for page in range(400)]
+        latencies = []
+        for _ in range(20):
+            time.sleep(0.01)
+            start = time.monotonic()
+            response = dispatcher.call("main", "release_assets", orderId="1")
+            latencies.append(time.monotonic() - start)
+            assert response["method"] == "release_assets"
+        assert dispatcher.pending()["background"] > 0  # the scan was still queued throughout
+        assert max(latencies) < 0.1  # a FIFO queue would make these wait ~2s
+        assert dispatcher.stats()["critical"]["count"] == 20
+    assert all(future.done() for future in scan)
+
+
+def test_weighted_fair_share_between_classes() -> None:
+    api = FakeApi(0.0)
+    dispatcher = Dispatcher(
+        _manager(api, rate=1e6, burst=1e6), workers=1, background_slots=1, reserve_tokens=0
+    )
+    with dispatcher._condition:  # queue everything before the first pick
+        for _ in range(100):
+            dispatcher.submit("main", "get_orders")
+            dispatcher.submit("main", "get_chat_messages", orderId="1")
+    dispatcher.close(cancel=False)
+    first = api.done[:50]
+    assert 38 <= first.count("get_chat_messages") <= 42  # weights 4:1
+
+
+def test_throttled_account_does_not_block_others() -> None:
+    slow, fast = FakeApi(0.0), FakeApi(0.0)
+    manager = SimpleNamespace(
+        accounts={
+            "slow": Account("slow", slow, TokenBucket(1, 1)),
+            "fast": Account("fast", fast, TokenBucket(1e6, 1e6)),
+        }
+    )
+    with Dispatcher(manager, workers=2) as dispatcher:
+        with dispatcher._condition:  # the throttled account's calls are at the head
+            throttled = [dispatcher.submit("slow", "release_assets", orderId=i) for i in range(3)]
+            others = [dispatcher.submit("fast", "release_assets", orderId=i) for i in range(3)]
+        start = time.monotonic()
+        for future in others:
+            future.result(timeout=1)
+        assert time.monotonic() - start < 0.5  # not behind the slow account's 1 call/s
+        assert not throttled[-1].done()
+
+
+def test_explicit_priority_and_errors() -> None:
+    api = FakeApi(0.0)
+    with Dispatcher(_manager(api, rate=1e6, burst=1e6)) as dispatcher:
+        future = dispatcher.submit("main", "get_ads_list", priority=BACKGROUND)
+        assert future.result()["method"] == "get_ads_list"
+        assert dispatcher.stats()["background"]["count"] == 1
+        with pytest.raises(KeyError):
+            dispatcher.submit("other", "get_ads_list")
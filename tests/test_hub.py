@@ -0,0 +1,132 @@
+"""Tests for the poller hub."""
+
+import asyncio
+from collections import Counter
+
+from app.hub import PollerHub, Resource, chat, online_ads, pending_orders
+from app.polling import PollController
+from app.scanner import Market
+
+
+class FakeApi:
+    def __init__(self) -> None:
+        self.calls: Counter[str] = Counter()
+        self.orders = [{"id": "1", "status": 10, "unreadMsgCount": "0"}]
+        self.messages: list[dict] = []
+
+    async def fetch(self, method: str, params: dict) -> dict:
+        self.calls[method] += 1
+        await asyncio.sleep(0)
+        if method == "get_pending_orders":
+            items = [dict(order) for order in self.orders]
+            return {"result": {"count": len(items), "items": items}}
+        if method == "get_chat_messages":
+            return {"result": {"result": list(self.messages)}}
+        return {"result": {"count": 0, "items": []}}
+
+
+def _hub(api: FakeApi) -> PollerHub:
+    controller = PollController(min_interval=0.01, max_interval=0.02, backoff=2)
+    return PollerHub(api.fetch, controller=controller)
+
+
+def test_resources_compare_by_value() -> None:
+    assert pending_orders() == pending_orders()
+    assert chat("7") == chat(7) != chat("8")
+    assert online_ads(Market("USDT", "UAH", 0)) == Resource.of(
+        "get_online_ads", tokenId="USDT", currencyId="UAH", side="0", page="1", size="50"
+    )
+
+
+def test_one_poller_per_resource_and_fan_out() -> None:
+    async def scenario(api: FakeApi) -> tuple[list, int]:
+        hub = _hub(api)
+        consumers = [hub.subscribe(pending_orders()) for _ in range(5)]
+        first = [await asyncio.wait_for(sub.get(), 1) for sub in consumers]
+        await asyncio.sleep(0.2)
+        polls = api.calls["get_pending_orders"]
+        late = hub.subscribe(pending_orders())
+        assert (await asyncio.wait_for(late.get(), 1)).response is first[0].response
+        await hub.aclose()
+        return first, polls
+
+    api = FakeApi()
+    first, polls = asyncio.run(scenario(api))
+    assert len({id(update) for update in first}) == 1  # one response, shared
+    assert polls < 25  # about 0.2 s / 0.02 s, not multiplied by five consumers
+
+
+def test_changes_only_and_duplicate_queue_delivered_once() -> None:
+    async def scenario(api: FakeApi) -> list:
+        hub = _hub(api)
+        queue: asyncio.Queue = asyncio.Queue()
+        a, b = hub.subscribe(chat("1"), queue), hub.subscribe(chat("1"), queue)
+        assert hub.subscribers(chat("1")) == 1
+        await asyncio.sleep(0.1)
+        api.messages.append({"id": "1", "message": "hi"})
+        await asyncio.sleep(0.1)
+        a.close()
+        assert chat("1") in hub  # still held by b
+        b.close()
+        assert chat("1") not in hub and len(hub) == 0
+        await hub.aclose()
+        return [queue.get_nowait() for _ in range(queue.qsize())]
+
+    updates = asyncio.run(scenario(FakeApi()))
+    assert [update.response["result"]["result"] for update in updates] == [
+        [],
+        [{"id": "1", "message": "hi"}],
+    ]
+
+
+def test_unsubscribed_resources_stop_polling() -> None:
+    async def scenario(api: FakeApi) -> int:
+        hub = _hub(api)
+        with hub.subscribe(online_ads(Market("USDT", "UAH", 1))):
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.02)
+        stopped_at = api.calls["get_online_ads"]
+        await asyncio.sleep(0.1)
+        assert api.calls["get_online_ads"] == stopped_at
+        await hub.aclose()
+        return stopped_at
+
+    assert asyncio.run(scenario(FakeApi())) >= 1
+
+
+def test_unread_counters_poke_the_chat_poller() -> None:
+    async def scenario(api: FakeApi) -> tuple[int, int]:
+        controller = PollController(min_interval=0.01, max_interval=5, backoff=100)
+        hub = PollerHub(api.fetch, controller=controller)
+        hub.subscribe(chat("1"))
+        hub.subscribe(pending_orders())
+        await asyncio.sleep(0.1)  # both backed off to seconds
+        before = api.calls["get_chat_messages"]
+        api.orders[0]["unreadMsgCount"] = "1"
+        hub.poke(pending_orders())
+        await asyncio.sleep(0.1)
+        after = api.calls["get_chat_messages"]
+        await hub.aclose()
+        return before, after
+
+    before, after = asyncio.run(scenario(FakeApi()))
+    assert after > before
+
+
+def test_bad_response_does_not_stop_polling() -> None:
+    async def scenario(api: FakeApi) -> list:
+        hub = _hub(api)
+        subscription = hub.subscribe(pending_orders())
+        await asyncio.sleep(0.05)  # polls of an item without ``id`` fail to publish
+        api.orders = [{"id": "2", "status": 20, "unreadMsgCount": "0"}]
+        updates = []
+        while not updates or updates[-1].response["result"]["items"][0].get("id") != "2":
+            updates.append(await asyncio.wait_for(subscription.get(), 1))
+        await hub.aclose()
+        return updates
+
+    api = FakeApi()
+    api.orders = [{"status": 10}]
+    updates = asyncio.run(scenario(api))
+    assert updates[-1].response["result"]["items"][0]["id"] == "2"
+    assert api.calls["get_pending_orders"] >= 2
@@ -0,0 +1,79 @@
+"""Tests for process-pool ingestion."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from app.client.ratelimit import TokenBucket
+from app.ingest import (
+    OrderBatch,
+    backfill_orders,
+    chunked,
+    decode_ad_pages,
+    decode_order_lines,
+    decode_order_pages,
+    ingest,
+    read_blocks,
+)
+
+EXAMPLES = Path(__file__).resolve().parents[1] / "examples"
+ORDERS = json.loads((EXAMPLES / "orders/SELL/UAH/all_orders.json").read_text("utf-8"))
+TEMPLATE = ORDERS["response"]["result"]["items"][0]
+
+
+def _page(first: int, count: int, total: int) -> bytes:
+    items = [TEMPLATE | {"id": str(first + i)} for i in range(count)]
+    return json.dumps({"ret_code": 0, "result": {"count": total, "items": items}}).encode()
+
+
+def test_pool_results_come_back_in_order() -> None:
+    pages = [_page(page * 10, 10, 400) for page in range(40)]
+    batches = list(ingest(chunked(pages, 3), decode_order_pages, workers=2, max_pending=3))
+    merged = OrderBatch.concat(batches)
+    assert merged.order_id.tolist() == list(range(400))
+    assert merged.currency_id[0] == "UAH" and merged.price[0] == 44.97
+    assert merged.create_date[0] == 1754084675000
+
+
+def test_worker_errors_propagate() -> None:
+    failed = json.dumps({"ret_code": 10006, "ret_msg": "Too many visits"}).encode()
+    with pytest.raises(RuntimeError, match="10006"):
+        list(ingest([[_page(0, 1, 1)], [failed]], decode_order_pages, workers=2))
+
+
+def test_ndjson_blocks_split_at_newlines(tmp_path: Path) -> None:
+    path = tmp_path / "orders.ndjson"
+    path.write_text("".join(json.dumps(TEMPLATE | {"id": str(i)}) + "\n" for i in range(50)))
+    blocks = list(read_blocks(path, block_size=1000))
+    assert len(blocks) > 1 and all(block.endswith(b"\n") for block in blocks)
+    merged = OrderBatch.concat(ingest(blocks, decode_order_lines, workers=1))
+    assert merged.order_id.tolist() == list(range(50))
+
+
+def test_ad_pages_decode_to_book() -> None:
+    body = (EXAMPLES / "competitor_ads/BUY/UAH/response.json").read_text("utf-8")
+    page = json.dumps(json.loads(body)["response"]).encode()
+    assert len(decode_ad_pages([page, page])) == 2 * len(json.loads(page)["result"]["items"])
+
+
+def test_backfill_fetches_every_page() -> None:
+    class FakeApi:
+        def __init__(self) -> None:
+            self.pages: list[int] = []
+
+        def request_raw(self, name: str, /, **params) -> bytes:
+            assert name == "get_orders"
+            self.pages.append(params["page"])
+            first = (params["page"] - 1) * params["size"]
+            return _page(first, min(params["size"], 23 - first), 23)
+
+    api = FakeApi()
+    batch = backfill_orders(api, size=5, chunk_pages=2, workers=1, status=50)
+    assert api.pages == [1, 2, 3, 4, 5]
+    assert batch.order_id.tolist() == list(range(23))
+
+    limiter = TokenBucket(rate=1e-3, burst=7)  # effectively no refill during the test
+    backfill_orders(FakeApi(), size=5, chunk_pages=2, workers=1, limiter=limiter)
+    assert limiter.try_acquire(2) == 0  # five pages took five tokens
+    assert limiter.try_acquire() > 0
@@ -0,0 +1,181 @@
+"""Tests for the write-ahead journal."""
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from bybit_p2p._exceptions import FailedRequestError
+
+from app.journal import APPLIED, NOT_APPLIED, Journal
+
+
+class FakeManager:
+    """Records calls; order details report ``statuses``, other calls raise ``fail`` if set."""
+
+    def __init__(self, statuses: dict[str, int] | None = None) -> None:
+        self.statuses = statuses or {}
+        self.calls: list[tuple[str, dict]] = []
+        self.fail: Exception | None = None
+
+    def call(self, account: str, method: str, **params) -> dict:
+        self.calls.append((method, params))
+        if method == "get_order_details":
+            return {"retCode": 0, "result": {"status": self.statuses[params["orderId"]]}}
+        if self.fail is not None:
+            raise self.fail
+        return {"retCode": 0, "result": {"method": method}}
+
+
+PAYMENT = {"paymentType": "14", "paymentId": "7"}
+
+
+def _failure(code: int) -> FailedRequestError:
+    return FailedRequestError(
+        request="release", message="failed", status_code=code, time="now", resp_headers={}
+    )
+
+
+def test_completed_key_is_not_called_again_after_reopen(tmp_path: Path) -> None:
+    path = tmp_path / "p2p.journal"
+    manager = FakeManager()
+    with Journal(path, fsync=False) as journal:
+        first = journal.call(manager, "main", "release_assets", orderId="1")
+        assert journal.call(manager, "main", "release_assets", orderId="1") == first
+    with Journal(path, fsync=False) as journal:
+        assert journal.call(manager, "main", "release_assets", orderId="1") == first
+        journal.call(manager, "main", "release_assets", orderId="2")
+        assert journal.in_flight() == []
+    assert [params["orderId"] for _, params in manager.calls] == ["1", "2"]
+
+
+def test_unknown_outcome_is_reconciled_after_restart(tmp_path: Path) -> None:
+    path = tmp_path / "p2p.journal"
+    manager = FakeManager({"1": 50, "2": 20, "3": 10})
+    manager.fail = TimeoutError("read timed out")
+    with Journal(path, fsync=False) as journal:
+        for order_id in ("1", "2"):
+            with pytest.raises(TimeoutError):
+                journal.call(manager, "main", "release_assets", orderId=order_id)
+        with pytest.raises(TimeoutError):
+            journal.call(manager, "main", "mark_as_paid", orderId="3", **PAYMENT)
+        with pytest.raises(RuntimeError, match="in flight"):
+            journal.call(manager, "main", "release_assets", orderId="1")
+        manager.fail = _failure(10_001)  # refused by the API: certainly not applied
+        with pytest.raises(FailedRequestError):
+            journal.call(manager, "main", "release_assets", orderId="4")
+
+    with Journal(path, fsync=False) as journal:
+        assert [entry.key for entry in journal.in_flight()] == [
+            "release_assets:1",
+            "release_assets:2",
+            "mark_as_paid:3",
+        ]
+        manager.calls.clear()
+        assert journal.reconcile(manager) == {APPLIED: 1, NOT_APPLIED: 2}
+        assert [method for method, _ in manager.calls] == ["get_order_details"] * 3
+        assert journal.completed("release_assets:1")
+        manager.fail = None
+        journal.call(manager, "main", "release_assets", orderId="2")
+        journal.call(manager, "main", "release_assets", orderId="4")
+        assert journal.call(manager, "main", "release_assets", orderId="1") is None
+    with Journal(path, fsync=False) as journal:
+        assert journal.in_flight() == []
+
+
+@pytest.mark.parametrize("code", [500, 10_000, 10_016])
+def test_server_errors_leave_the_key_blocked(tmp_path: Path, code: int) -> None:
+    manager = FakeManager({"1": 50})
+    manager.fail = _failure(code)  # the release may or may not have happened
+    with Journal(tmp_path / "p2p.journal", fsync=False) as journal:
+        with pytest.raises(FailedRequestError):
+            journal.call(manager, "main", "release_assets", orderId="1")
+        with pytest.raises(RuntimeError, match="in flight"):
+            journal.call(manager, "main", "release_assets", orderId="1")
+        assert journal.reconcile(manager) == {APPLIED: 1, NOT_APPLIED: 0}
+    assert [method for method, _ in manager.calls] == ["release_assets", "get_order_details"]
+
+
+def test_invalid_call_is_not_journaled(tmp_path: Path) -> None:
+    manager = FakeManager()
+    with Journal(tmp_path / "p2p.journal", fsync=False) as journal:
+        with pytest.raises(ValueError, match="paymentType"):
+            journal.call(manager, "main", "mark_as_paid", orderId="1")
+        assert journal.in_flight() == []
+        journal.call(manager, "main", "mark_as_paid", orderId="1", **PAYMENT)
+        assert journal.completed("mark_as_paid:1")
+    assert [method for method, _ in manager.calls] == ["mark_as_paid"]
+
+
+def test_unwritable_journal_neither_blocks_keys_nor_hides_calls(tmp_path: Path) -> None:
+    manager = FakeManager()
+    journal = Journal(tmp_path / "p2p.journal", fsync=False)
+    seq = journal.begin("main", "release_assets", {"orderId": "1"})
+    journal.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        journal.begin("main", "release_assets", {"orderId": "2"})
+    assert [entry.key for entry in journal.in_flight()] == ["release_assets:1"]
+
+    journal._finish(seq, APPLIED, {"retCode": 0})  # the API succeeded after the close
+    assert journal.completed("release_assets:1")
+    with pytest.raises(RuntimeError, match="closed"):
+        journal.call(manager, "main", "release_assets", orderId="2")
+    assert journal.in_flight() == [] and manager.calls == []
+
+    class ClosingManager:  # the journal is closed while the call is on the wire
+        def call(self, account: str, method: str, **params) -> dict:
+            journal.close()
+            return {"retCode": 0, "result": {}}
+
+    journal = Journal(tmp_path / "other.journal", fsync=False)
+    response = journal.call(ClosingManager(), "main", "release_assets", orderId="3")
+    assert response == {"retCode": 0, "result": {}}
+    assert journal.completed("release_assets:3")
+
+
+def test_torn_tail_is_dropped(tmp_path: Path) -> None:
+    path = tmp_path / "p2p.journal"
+    manager = FakeManager()
+    with Journal(path, fsync=False) as journal:
+        journal.call(manager, "main", "release_assets", orderId="1")
+        journal.begin("main", "release_assets", {"orderId": "2"})
+    intact = path.stat().st_size
+    with path.open("ab") as file:
+        file.write(b'\x40\x00\x00\x00\x00\x00\x00\x00{"s":9')
+    with Journal(path, fsync=False) as journal:
+        assert path.stat().st_size == intact
+        assert [entry.key for entry in journal.in_flight()] == ["release_assets:2"]
+        assert journal.completed("release_assets:1")
+
+
+def test_concurrent_intents_share_fsyncs(tmp_path: Path) -> None:
+    manager = FakeManager()
+    n_threads, per_thread = 8, 25
+    with Journal(tmp_path / "p2p.journal") as journal:
+
+        def release(worker: int) -> None:
+            for i in range(per_thread):
+                journal.call(manager, "main", "release_assets", orderId=f"{worker}-{i}")
+
+        threads = [threading.Thread(target=release, args=(w,)) for w in range(n_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    # Every intent was durable before its call, yet fsyncs were shared.
+    assert len(manager.calls) == n_threads * per_thread
+    assert journal.syncs < 2 * n_threads * per_thread
+
+
+def test_recovery_reads_only_the_log(tmp_path: Path) -> None:
+    path = tmp_path / "p2p.journal"
+    manager = FakeManager()
+    with Journal(path, fsync=False) as journal:
+        for i in range(5_000):
+            journal.call(manager, "main", "release_assets", orderId=str(i))
+    start = time.perf_counter()
+    journal = Journal(path, fsync=False)
+    elapsed = time.perf_counter() - start
+    journal.close()
+    assert journal.completed("release_assets:4999")
+    assert elapsed < 1.0
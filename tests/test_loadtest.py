@@ -0,0 +1,16 @@
+"""Tests for the end-to-end load scenario."""
+
+from app.loadtest import run
+
+
+def test_every_order_is_released_once() -> None:
+    report = run(40, ramp=0.2, pay_delay=(0.05, 0.1), latency=0, workers=4, timeout=30)
+    assert report["released"] == 40
+    calls = report["calls"]
+    assert calls["release_assets"] == 40
+    assert calls["send_chat_message"] == 80  # greeting and thanks
+    assert calls["get_chat_messages"] <= 40  # only when unread counters move
+    assert calls["get_online_ads"] > 0 and calls["update_ad"] > 0
+    assert report["api_errors"] == {} and report["failures"] == {}
+    assert 0 < report["release_p50_ms"] <= report["release_p99_ms"]
+    assert report["cpu_s"] > 0 and report["max_rss_mb"] > 0
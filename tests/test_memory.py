@@ -0,0 +1,96 @@
+"""Steady-state memory of a polling loop against a mock server."""
+
+import gc
+import json
+import sys
+from collections import deque
+from pathlib import Path
+
+from bybit_p2p._exceptions import FailedRequestError
+from requests import Response
+
+from app.chat import ChatScanner
+from app.client.compiler import CompiledP2P
+from app.counterparty import CounterpartyStore
+from app.memory import MemoryMonitor, OrderRegistry
+
+EXAMPLES = Path(__file__).resolve().parents[1] / "examples"
+# A leak of one block per poll after warm-up would exceed the 2 000-block budget ninefold.
+POLLS = 20_000
+WARMUP = 2_000
+
+
+class MockServer:
+    """Answer ``get_pending_orders`` with a rotating set of orders, every 10th call failing."""
+
+    def __init__(self) -> None:
+        orders = json.loads((EXAMPLES / "orders/SELL/UAH/all_orders.json").read_text("utf-8"))
+        self.template = orders["response"]["result"]["items"][0]
+        self.calls = 0
+
+    def send(self, request, **kwargs) -> Response:
+        self.calls += 1
+        n = self.calls
+        if n % 10 == 0:
+            body = {"ret_code": 912100027, "ret_msg": "rate limited " + "x" * 2000, "result": {}}
+        else:
+            items = [
+                self.template | {"id": str(n // 50 * 3 + k), "status": 10 if n % 50 < 40 else 50}
+                for k in range(3)
+            ]
+            body = {"ret_code": 0, "ret_msg": "SUCCESS", "result": {"count": 3, "items": items}}
+        response = Response()
+        response.status_code = 200
+        response._content = json.dumps(body).encode()
+        response.headers["X-Bapi-Limit-Status"] = "9"
+        response.headers["X-Padding"] = "y" * 4096
+        return response
+
+
+def test_memory_is_flat_over_many_polls() -> None:
+    api = CompiledP2P(testnet=True, api_key="key", api_secret="secret")
+    api.logger.disabled = True
+    api.client = MockServer()
+    registry = OrderRegistry()
+    scanner = ChatScanner(max_orders=100)
+    store = CounterpartyStore(lambda uid, order_id: {}, maxsize=100)
+    errors: deque = deque(maxlen=100)
+
+    def poll() -> None:
+        try:
+            items = api.get_pending_orders(page=1, size=10)["result"]["items"]
+        except FailedRequestError as exc:
+            errors.append(exc)
+            return
+        for order in registry.update_many(items):
+            scanner.scan(order.id, [{"id": "1", "message": "paid"}])
+            if order.finished:
+                store.record_order(order.data | {"targetUserId": order.id})
+                scanner.forget(order.id)
+
+    for _ in range(WARMUP):
+        poll()
+    gc.collect()
+    baseline = sys.getallocatedblocks()
+    for _ in range(POLLS - WARMUP):
+        poll()
+    gc.collect()
+    store.close()
+
+    assert sys.getallocatedblocks() - baseline < 2_000
+    assert len(registry.active()) <= 3
+    assert len(registry) <= 6
+    assert all(len(exc.request) < 1024 and len(exc.resp_headers) == 1 for exc in errors)
+
+
+def test_monitor_reports_growth_by_line() -> None:
+    monitor = MemoryMonitor(top=3)
+    monitor.begin()
+    leak = [bytes(1000) for _ in range(1000)]
+    try:
+        report = monitor.report()
+    finally:
+        monitor.stop()
+    assert report["growth_bytes"] >= 1_000_000
+    assert __file__ in report["top_growth"][0]["where"]
+    assert len(leak) == len(monitor.reports) * 1000
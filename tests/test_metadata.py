@@ -0,0 +1,54 @@
+"""Tests for the shared metadata registry."""
+
+import json
+import time
+from pathlib import Path
+
+from app.metadata import MetadataRegistry
+
+EXAMPLES = Path(__file__).resolve().parents[1] / "examples"
+
+
+def _result(relative: str):
+    return json.loads((EXAMPLES / relative).read_text(encoding="utf-8"))["response"]["result"]
+
+
+def test_payment_methods_are_indexed_by_id() -> None:
+    registry = MetadataRegistry()
+    registry.load_payment_types(_result("payment_methods/payment_methods.json"))
+    method = registry.methods["12980554"]
+    assert method.type.name == "Unex Bank"
+    assert method.type is registry.payment_type(624)
+    assert registry.payment_type("46").name == "Oschadbank"
+    assert registry.payment_type("99999").name == ""
+
+
+def test_ads_share_symbol_and_payment_objects() -> None:
+    registry = MetadataRegistry()
+    registry.load_payment_types(_result("payment_methods/payment_methods.json"))
+    items = _result("competitor_ads/BUY/UAH/response.json")["items"]
+    ads = registry.ads(json.loads(json.dumps(items)) + json.loads(json.dumps(items)))
+    assert len({id(ad.symbol) for ad in ads}) == 1
+    assert ads[0].symbol is registry.symbol_for("USDT", "UAH")
+    assert ads[0].symbol.currency_scale == 2 and ads[0].symbol.order_auto_cancel_minute == 15
+    assert ads[0].payments[0] is registry.payment_type(items[0]["payments"][0])
+
+    changed = items[0]["symbolInfo"] | {"currencyMaxQuote": "2000000"}
+    replaced = registry.symbol(changed)
+    assert replaced is not ads[0].symbol and replaced.currency_max_quote == 2_000_000
+    assert ads[0].symbol.currency_max_quote == 1_800_000  # earlier objects are unchanged
+
+
+def test_background_refresh() -> None:
+    calls = []
+
+    def fetch() -> list[dict]:
+        calls.append(1)
+        return _result("payment_methods/payment_methods.json")
+
+    registry = MetadataRegistry(fetch, interval=0.01).start()
+    deadline = time.monotonic() + 2
+    while len(calls) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    registry.stop()
+    assert len(calls) >= 3 and len(registry.methods) == 44
@@ -0,0 +1,66 @@
+"""Tests for adaptive poll intervals."""
+
+import json
+from pathlib import Path
+
+from app.bench import bench_polling
+from app.polling import PollController, chat_hints, payment_deadline, pending_pace
+
+EXAMPLE = Path(__file__).resolve().parents[1] / "examples/orders/SELL/UAH/all_orders.json"
+ORDER = json.loads(EXAMPLE.read_text("utf-8"))["response"]["result"]["items"][0]
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _controller(clock: Clock) -> PollController:
+    return PollController(min_interval=1, max_interval=60, backoff=2, clock=clock, wall=clock)
+
+
+def test_idle_keys_back_off_and_activity_resets() -> None:
+    clock = Clock()
+    controller = _controller(clock)
+    controller.track("chat")
+    assert controller.due() == ["chat"]
+    intervals = [controller.observe("chat", changed=False) for _ in range(8)]
+    assert intervals == [2, 4, 8, 16, 32, 60, 60, 60]
+    assert controller.observe("chat", changed=True) == 1
+    controller.observe("chat", changed=False)
+    controller.poke("chat")
+    clock.now += 1
+    assert controller.due() == ["chat"]
+
+
+def test_status_and_deadline_cap_the_interval() -> None:
+    clock = Clock()
+    controller = _controller(clock)
+    controller.track("order", status=10, deadline=clock.now + 900)
+    assert controller.ceiling("order") == 1.5
+    controller.track("order", status=None, deadline=clock.now + 100)
+    assert controller.ceiling("order") == 10  # a tenth of the time left
+    controller.track("order", status=50)
+    controller.observe("order", changed=True)
+    assert "order" not in controller and controller.next_delay() is None
+
+
+def test_pending_orders_pace_and_chat_hints() -> None:
+    waiting = ORDER | {"id": "1", "status": 10, "transferLastSeconds": "600"}
+    paid = ORDER | {"id": "2", "status": 20}
+    assert payment_deadline(waiting, now=0) == 600
+    expired = ORDER | {"status": 10, "transferLastSeconds": "0"}
+    assert payment_deadline(expired, payment_period=15) == int(ORDER["createDate"]) / 1e3 + 900
+    assert pending_pace([waiting, paid], now=0) == (20, 600)
+    previous = {"1": waiting, "2": paid}
+    current = {"1": waiting | {"unreadMsgCount": "1"}, "2": paid, "3": paid}
+    assert chat_hints(previous, current) == {"1", "3"}
+
+
+def test_adaptive_polling_is_faster_and_cheaper() -> None:
+    result = bench_polling(100)
+    assert result["adaptive_requests"] < result["fixed_requests"] / 2
+    assert result["adaptive_mean_latency_s"] < result["fixed_mean_latency_s"]
@@ -0,0 +1,79 @@
+"""Tests for live profiling."""
+
+import json
+import os
+import signal
+import threading
+import time
+
+from app import profiling
+from app.client.compiler import CompiledP2P
+from app.client.transport import MemoryTransport
+from app.profiling import Sampler, annotate
+
+
+def test_annotate_nests_and_restores() -> None:
+    assert profiling.current() == (None, None)
+    with annotate(stage="fetch"):
+        with annotate(method="get_online_ads"):
+            assert profiling.current() == ("get_online_ads", "fetch")
+        assert profiling.current() == (None, "fetch")
+    assert profiling.current() == (None, None)
+
+
+def test_sampler_roots_stacks_at_stage_and_method() -> None:
+    stopped = threading.Event()
+
+    def work() -> None:
+        with annotate(stage="scan", method="get_online_ads"):
+            stopped.wait()
+
+    worker = threading.Thread(target=work, name="worker")
+    worker.start()
+    try:
+        time.sleep(0.05)
+        sampler = Sampler()
+        sampler.sample()
+        sampler.sample()
+    finally:
+        stopped.set()
+        worker.join()
+    stacks = [line for line in sampler.folded().splitlines() if line.startswith("thread:worker;")]
+    assert len(stacks) == 1
+    stack, count = stacks[0].rsplit(" ", 1)
+    assert count == "2"
+    assert stack.startswith("thread:worker;stage:scan;method:get_online_ads;threading:")
+    assert "test_profiling:test_sampler_roots_stacks_at_stage_and_method.<locals>.work" in stack
+    assert sampler.contexts()["scan/get_online_ads"] == 2
+
+
+def test_client_calls_are_annotated() -> None:
+    seen = []
+    transport = MemoryTransport.from_examples()
+    send = transport.send
+    transport.send = lambda request, **kwargs: seen.append(profiling.current()) or send(request)
+    client = CompiledP2P(testnet=False, api_key="k", api_secret="s", transport=transport)
+    client.get_pending_orders(page=1, size=10)
+    assert seen == [("get_pending_orders", None)]
+    assert profiling.current() == (None, None)
+
+
+def test_signal_writes_annotated_sample(tmp_path) -> None:
+    previous = signal.getsignal(signal.SIGUSR1), signal.getsignal(signal.SIGUSR2)
+    try:
+        profiling.install(tmp_path, duration=0.2, interval=0.002)
+        with annotate(stage="watch"):
+            assert profiling.main([str(os.getpid())]) == 0
+            deadline = time.monotonic() + 5
+            while not list(tmp_path.glob("*.json")) and time.monotonic() < deadline:
+                time.sleep(0.01)
+        time.sleep(0.05)
+    finally:
+        signal.signal(signal.SIGUSR1, previous[0])
+        signal.signal(signal.SIGUSR2, previous[1])
+    [folded] = tmp_path.glob("*-sample.folded")
+    [summary] = tmp_path.glob("*-sample.json")
+    assert "thread:MainThread;stage:watch;method:-;" in folded.read_text(encoding="utf-8")
+    data = json.loads(summary.read_text(encoding="utf-8"))
+    assert data["mode"] == "sample" and data["samples"] > 0
+    assert data["contexts"]["watch/-"] > 0
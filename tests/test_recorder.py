@@ -0,0 +1,59 @@
+"""Tests for the snapshot recorder."""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from app.analytics import AdBook
+from app.recorder import Recorder, replay
+
+EXAMPLES = Path(__file__).resolve().parents[1] / "examples" / "competitor_ads"
+
+
+def _books() -> list[tuple[str, AdBook, int]]:
+    books = []
+    for path in sorted(EXAMPLES.glob("*/*/response.json")):
+        items = json.loads(path.read_text(encoding="utf-8"))["response"]["result"]["items"]
+        books.append((f"USDT/{path.parent.name}", AdBook.from_items(items), path.stat().st_size))
+    return books
+
+
+def test_round_trip_and_reopen(tmp_path: Path) -> None:
+    path = tmp_path / "scan.p2prec"
+    books = _books()
+    with Recorder(path) as recorder:
+        for timestamp, (market, book, _) in enumerate(books):
+            recorder.append(book, market=market, timestamp_ms=timestamp)
+    with Recorder(path) as recorder:
+        recorder.append(books[0][1], market=books[0][0], timestamp_ms=99)
+
+    snapshots = list(replay(path))
+    assert [s.timestamp_ms for s in snapshots] == [0, 1, 2, 3, 99]
+
+    def decode(book: AdBook) -> list[str]:
+        return [book.payment_ids[code] for code in book.payment_code]
+
+    for snapshot, (market, book, _) in zip(snapshots, books + books[:1]):
+        assert snapshot.market == market
+        np.testing.assert_array_equal(snapshot.book.price, book.price)
+        np.testing.assert_array_equal(snapshot.book.item_id, book.item_id)
+        assert snapshot.book.nick_name.tolist() == book.nick_name.tolist()
+        assert decode(snapshot.book) == decode(book)
+        np.testing.assert_array_equal(snapshot.book.payment_ptr, book.payment_ptr)
+
+
+def test_compact_and_ignores_torn_tail(tmp_path: Path) -> None:
+    path = tmp_path / "scan.p2prec"
+    books = _books()
+    with Recorder(path) as recorder:
+        for market, book, _ in books:
+            recorder.append(book, market=market)
+    assert sum(size for *_, size in books) > 10 * path.stat().st_size
+
+    size = path.stat().st_size
+    with path.open("ab") as handle:
+        handle.write(b"\x40\0\0\0partial")
+    assert len(list(replay(path))) == len(books)
+    Recorder(path).close()
+    assert path.stat().st_size == size
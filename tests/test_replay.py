@@ -0,0 +1,32 @@
+"""Tests for the examples replay harness."""
+
+import json
+from pathlib import Path
+
+from app import replay
+from app.client.compiler import CompiledP2P
+
+
+def test_compiled_client_matches_library_on_every_fixture() -> None:
+    results = replay.replay(repeat=1)
+    assert len(results) == len(replay.load_fixtures())
+    assert [r["fixture"] for r in results if not r["identical"]] == []
+    assert any(r["outcome"].get("error", {}).get("type") == "ConnectionError" for r in results)
+    assert any(r["outcome"].get("error", {}).get("status_code") == 41200 for r in results)
+
+
+def test_differences_are_reported() -> None:
+    def candidate() -> CompiledP2P:
+        return CompiledP2P(**replay.CREDENTIALS, recv_window=9999)
+
+    results = replay.replay(repeat=1, candidate=candidate)
+    sent = [r for r in results if "headers" in r["outcome"]]
+    assert sent and all(r["differences"] == ["headers"] for r in sent)
+
+
+def test_save_and_compare_with_baseline(tmp_path: Path, capsys) -> None:
+    path = tmp_path / "baseline.json"
+    assert replay.main(["--repeat", "1", "--save", str(path)]) == 0
+    assert replay.main(["--repeat", "1", "--baseline", str(path)]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert all(json.loads(line)["identical"] for line in lines)
@@ -0,0 +1,53 @@
+"""Tests for the ad change detector."""
+
+import copy
+import json
+from pathlib import Path
+
+from app.scanner import ChangeDetector, Market
+
+EXAMPLES = Path(__file__).resolve().parents[1] / "examples"
+MARKET = Market("USDT", "UAH", 1)
+
+
+def _pages() -> list[list[dict]]:
+    path = EXAMPLES / "competitor_ads/SELL/UAH/response.json"
+    items = json.loads(path.read_text(encoding="utf-8"))["response"]["result"]["items"]
+    return [items[:5], items[5:]]
+
+
+def test_first_scan_adds_everything_and_rescans_skip_unchanged_pages() -> None:
+    detector = ChangeDetector()
+    pages = _pages()
+    first = detector.diff(MARKET, pages)
+    assert len(first.added) == 10 and not first.changed and not first.removed
+    assert first.unchanged_pages == 0
+
+    again = detector.diff(MARKET, copy.deepcopy(pages))
+    assert not again and again.unchanged_pages == again.pages == 2
+
+
+def test_changes_additions_and_removals_are_reported() -> None:
+    detector = ChangeDetector()
+    pages = _pages()
+    detector.diff(MARKET, pages)
+
+    moved = copy.deepcopy(pages)
+    moved[1][0]["price"] = "99.99"
+    moved[1][1]["recentOrderNum"] = 12345  # not part of the fingerprint
+    gone = moved[1].pop()
+    moved[1].append(pages[0][0] | {"id": "1"})
+    diff = detector.diff(MARKET, moved)
+    assert diff.unchanged_pages == 1
+    assert [item["id"] for item in diff.changed] == [moved[1][0]["id"]]
+    assert [item["id"] for item in diff.added] == ["1"]
+    assert diff.removed == [gone["id"]]
+
+
+def test_ads_moving_between_pages_are_not_changes() -> None:
+    detector = ChangeDetector()
+    pages = _pages()
+    detector.diff(MARKET, pages)
+    shifted = [pages[0][1:], [pages[0][0]] + pages[1]]
+    diff = detector.diff(MARKET, shifted)
+    assert not diff and diff.unchanged_pages == 0
@@ -1,8 +1,35 @@
 """Smoke tests for the sample application."""
 
+import subprocess
+import sys
+from pathlib import Path
+
 import main
 
 
 def test_main_callable() -> None:
     """Ensure main function is callable."""
     assert callable(main.main)
+
+
+def test_main_import_is_lazy() -> None:
+    """Importing the entry point must not load the HTTP client stack."""
+    check = (
+        "import sys, main; "
+        "heavy = {'bybit_p2p', 'requests', 'Crypto', 'dotenv'} & set(sys.modules); "
+        "sys.exit(sorted(heavy) or 0)"
+    )
+    root = Path(__file__).resolve().parents[1]
+    subprocess.run([sys.executable, "-c", check], cwd=root, check=True)
+
+
+def test_main_import_skips_settings() -> None:
+    """The entry point loads no settings machinery; ``app.bench startup`` times the import."""
+    check = (
+        "import sys; before = set(sys.modules); import main; "
+        "loaded = {'logging', 'threading', 'dataclasses', 'app.settings'} "
+        "& (set(sys.modules) - before); "
+        "sys.exit(sorted(loaded) or 0)"
+    )
+    root = Path(__file__).resolve().parents[1]
+    subprocess.run([sys.executable, "-c", check], cwd=root, check=True)
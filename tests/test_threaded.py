@@ -0,0 +1,90 @@
+"""Tests for the client shared between threads."""
+
+import copy
+import json
+import threading
+import time
+
+import pytest
+
+from app.client.bybit import get_api
+from app.client.compiler import CompiledP2P
+from app.client.threaded import ThreadedP2P
+from tests.helpers import AD, Response, capture
+
+
+def _api(**kwargs) -> ThreadedP2P:
+    return get_api(api_key="key", api_secret="secret", testnet=False, recv_window=5000, **kwargs)
+
+
+def test_pool_is_sized_for_the_threads() -> None:
+    with _api(threads=12) as api:
+        adapter = api.client.get_adapter("https://api.bybit.com")
+        assert isinstance(api, ThreadedP2P)
+        assert adapter._pool_maxsize == 12 and adapter._pool_block
+    assert type(_api()) is CompiledP2P
+
+
+def test_concurrent_calls_share_inputs_without_corrupting_them(monkeypatch) -> None:
+    monkeypatch.setattr("time.time", lambda: 1755113471.413)
+    serial = CompiledP2P(testnet=False, api_key="key", api_secret="secret", recv_window=5000)
+    expected = capture(serial)
+    serial.update_ad(**AD)
+
+    api = _api(threads=8)
+    sent = capture(api)
+    ad = AD | {"tradingPreferenceSet": dict(AD["tradingPreferenceSet"])}
+    original = copy.deepcopy(ad)
+    barrier = threading.Barrier(8)
+
+    def worker() -> None:
+        barrier.wait()
+        for _ in range(50):
+            api.update_ad(**ad)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    api.close()
+    assert ad == original
+    assert len(sent) == 400
+    assert {request.body for request in sent} == {expected[0].body}
+    assert {request.headers["X-BAPI-SIGN"] for request in sent} == {
+        expected[0].headers["X-BAPI-SIGN"]
+    }
+
+
+def test_map_and_submit_keep_order() -> None:
+    with _api(threads=4) as api:
+
+        def send(request, **kwargs):
+            page = json.loads(request.body)["page"]
+            time.sleep(0.001 * (page % 3))  # finish out of order
+            return Response({"ret_code": 0, "ret_msg": "SUCCESS", "result": {"page": page}})
+
+        api.client.send = send
+        pages = [
+            {"tokenId": "USDT", "currencyId": "UAH", "side": 1, "page": page}
+            for page in range(1, 21)
+        ]
+        responses = api.map("get_online_ads", pages)
+        assert [response["result"]["page"] for response in responses] == list(range(1, 21))
+        assert pages[0]["page"] == 1
+        assert api.submit("get_online_ads", **pages[4]).result()["result"]["page"] == 5
+
+
+def test_map_timeout_covers_the_whole_map() -> None:
+    with _api(threads=1) as api:
+
+        def send(request, **kwargs):
+            time.sleep(0.2)
+            return Response({"ret_code": 0, "ret_msg": "SUCCESS", "result": {}})
+
+        api.client.send = send
+        pages = [{"tokenId": "USDT", "currencyId": "UAH", "side": 1, "page": p} for p in range(4)]
+        start = time.monotonic()
+        with pytest.raises(TimeoutError):
+            list(api.map("get_online_ads", pages, timeout=0.3))
+        assert time.monotonic() - start < 0.45
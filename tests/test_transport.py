@@ -0,0 +1,118 @@
+"""Tests for the pluggable transports."""
+
+import asyncio
+import json
+import sys
+
+import pytest
+import requests
+from bybit_p2p._exceptions import FailedRequestError
+
+from app.client.bybit import new_session
+from app.client.compiler import CompiledP2P
+from app.client.transport import AsyncTransport, MemoryTransport, RequestsTransport
+
+
+@pytest.fixture(scope="module")
+def memory() -> MemoryTransport:
+    return MemoryTransport.from_examples()
+
+
+def _api(transport) -> CompiledP2P:
+    api = CompiledP2P(testnet=True, api_key="key", api_secret="secret", transport=transport)
+    api.logger.disabled = True
+    return api
+
+
+def test_memory_transport_answers_from_examples(memory: MemoryTransport) -> None:
+    api = _api(memory)
+    balance = api.get_current_balance(accountType="FUND")
+    assert balance["result"]["balance"][0]["walletBalance"] == "704.1029"
+
+    params = {"tokenId": "USDT", "currencyId": "UAH", "side": "1", "page": "1", "size": "10"}
+    sell = api.get_online_ads(**params)["result"]["items"]
+    buy = api.get_online_ads(**params | {"side": "0"})["result"]["items"]
+    assert {ad["side"] for ad in sell} == {1} and {ad["side"] for ad in buy} == {0}
+    assert api.get_online_ads(**params | {"page": "7"})["result"]["items"]  # path default
+
+    with pytest.raises(requests.ConnectionError):
+        api.get_chat_messages(orderId="0", startMessageId=0, size=100)
+    with pytest.raises(FailedRequestError) as info:
+        api.mark_as_paid(orderId="1", paymentType="46", paymentId="1")
+    assert info.value.status_code == 404
+    assert memory.calls["/v5/p2p/item/online"] >= 3
+
+
+def test_request_async_on_memory_and_sync_transports(memory: MemoryTransport) -> None:
+    async def scan(api: CompiledP2P) -> list[dict]:
+        ads = {"tokenId": "USDT", "currencyId": "PLN", "side": "0"}
+        calls = [api.request_async("get_online_ads", **ads, page=page) for page in range(1, 51)]
+        return await asyncio.gather(*calls)
+
+    responses = asyncio.run(scan(_api(memory)))
+    assert len(responses) == 50 and all(r["ret_code"] == 0 for r in responses)
+
+    class Synchronous:
+        def __init__(self) -> None:
+            self.sent = []
+
+        def send(self, request, **kwargs):
+            self.sent.append(request)
+            return memory.send(request)
+
+    transport = Synchronous()
+    asyncio.run(scan(_api(transport)))
+    assert len(transport.sent) == 50
+
+
+def test_requests_transport_settings() -> None:
+    transport = RequestsTransport(pool_size=3, timeout=2.5, retries=2)
+    adapter = transport.session.get_adapter("https://api.bybit.com")
+    assert adapter._pool_maxsize == 3 and adapter.max_retries.connect == 2
+    sent = []
+    transport.session.send = lambda request, **kwargs: sent.append(kwargs) or None
+    transport.send(requests.Request("GET", "https://api.bybit.com").prepare())
+    assert sent == [{"timeout": 2.5}]
+
+
+def test_requests_transport_retries_on_a_given_session() -> None:
+    session = new_session(pool_size=5)
+    default = session.get_adapter("https://api.bybit.com").max_retries
+    assert RequestsTransport(session).session.get_adapter("https://").max_retries is default
+    transport = RequestsTransport(session, retries=3)
+    for url in ("https://api.bybit.com", "http://localhost"):
+        adapter = transport.session.get_adapter(url)
+        assert adapter._pool_maxsize == 5 and adapter.max_retries.connect == 3
+
+
+def test_async_transport_sends_through_httpx() -> None:
+    httpx = pytest.importorskip("httpx")
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        if json.loads(request.content)["page"] == 2:
+            return httpx.Response(200, json={"retCode": 10001, "retMsg": "bad page"})
+        return httpx.Response(200, json={"ret_code": 0, "ret_msg": "OK", "result": {"items": []}})
+
+    async def scan() -> None:
+        transport = AsyncTransport(transport=httpx.MockTransport(handler))
+        api = _api(transport)
+        ads = {"tokenId": "USDT", "currencyId": "UAH", "side": "1"}
+        assert (await api.request_async("get_online_ads", **ads, page=1))["result"]["items"] == []
+        with pytest.raises(FailedRequestError):
+            await api.request_async("get_online_ads", **ads, page=2)
+        with pytest.raises(TypeError, match="asynchronous"):
+            api.get_online_ads(**ads, page=1)
+        await transport.aclose()
+
+    asyncio.run(scan())
+    assert [request.method for request in seen] == ["POST", "POST"]
+    assert seen[0].url == "https://api-testnet.bybit.com/v5/p2p/item/online"
+    assert seen[0].headers["X-BAPI-API-KEY"] == "key" and "X-BAPI-SIGN" in seen[0].headers
+
+
+def test_async_transport_needs_httpx(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(sys.modules, "httpx", None)
+    with pytest.raises(RuntimeError, match="pip install httpx"):
+        AsyncTransport()